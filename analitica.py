@@ -0,0 +1,198 @@
+"""Indicadores de desempenho por série e da escola inteira
+
+Todas as agregações são feitas no banco (GROUP BY), em poucas consultas, em
+vez de uma consulta por aluno. Os indicadores por aluno (resumo, frequência,
+ranking, séries) leem a tabela ResumoAlunos, mantida a cada gravação de
+notas; só os indicadores por disciplina precisam percorrer Notas. Tudo se
+refere ao ano letivo corrente.
+"""
+from database import ANO_ATUAL
+
+STATUS = ('Aprovado', 'Recuperação', 'Reprovado')
+
+STATUS_FINAL = STATUS + ('Sem notas',)
+
+# Faixas de frequência (limite inferior inclusivo, limite superior exclusivo)
+FAIXAS_FREQUENCIA = (
+    ('0-50', 0, 50),
+    ('50-75', 50, 75),
+    ('75-90', 75, 90),
+    ('90-100', 90, 100.0001),
+)
+
+
+def _arredondar(valor, casas=2):
+    return round(float(valor), casas) if valor is not None else None
+
+
+def _contagens_status(coluna='n.status'):
+    return ', '.join(
+        f"SUM(CASE WHEN {coluna} = '{status}' THEN 1 ELSE 0 END)" for status in STATUS
+    )
+
+
+# Médias ponderadas pelo número de disciplinas: iguais às médias sobre as notas
+_AGREGADOS_RESUMO = '''
+    SUM(r.total_disciplinas),
+    SUM(r.media_geral * r.total_disciplinas) / NULLIF(SUM(r.total_disciplinas), 0),
+    SUM(r.frequencia_media * r.total_disciplinas) / NULLIF(SUM(r.total_disciplinas), 0),
+    SUM(r.total_disciplinas) - SUM(r.disciplinas_recuperacao) - SUM(r.disciplinas_reprovadas),
+    SUM(r.disciplinas_recuperacao),
+    SUM(r.disciplinas_reprovadas)
+'''
+
+
+def _situacao_alunos():
+    return ', '.join(
+        f"SUM(CASE WHEN r.status_final = '{status}' THEN 1 ELSE 0 END)" for status in STATUS_FINAL
+    )
+
+
+def _taxas(total, contagens):
+    return {
+        status: {
+            'quantidade': int(quantidade or 0),
+            'taxa': round((quantidade or 0) / total, 4) if total else 0.0,
+        }
+        for status, quantidade in zip(STATUS, contagens)
+    }
+
+
+class Analitica:
+    def __init__(self, db):
+        self.db = db
+
+    def _filtro(self, serie):
+        if not serie:
+            return '', []
+        marcador = '%s' if self.db.is_postgres else '?'
+        return f'WHERE a.serie = {marcador}', [serie]
+
+    def _consultar(self, cursor, sql, parametros):
+        cursor.execute(sql, parametros)
+        return cursor.fetchall()
+
+    def por_disciplina(self, cursor, serie=None):
+        where, parametros = self._filtro(serie)
+        linhas = self._consultar(cursor, f'''
+            SELECT n.disciplina, COUNT(*), AVG(n.media_final), AVG(n.frequencia_percentual),
+                   MIN(n.media_final), MAX(n.media_final), {_contagens_status()}
+            FROM Notas n JOIN Alunos a ON a.id = n.aluno_id AND n.ano_letivo = {ANO_ATUAL}
+            {where}
+            GROUP BY n.disciplina
+            ORDER BY n.disciplina
+        ''', parametros)
+        return [{
+            'disciplina': disciplina,
+            'notas': total,
+            'media': _arredondar(media),
+            'frequencia_media': _arredondar(frequencia),
+            'menor_media': _arredondar(menor),
+            'maior_media': _arredondar(maior),
+            'status': _taxas(total, contagens),
+        } for disciplina, total, media, frequencia, menor, maior, *contagens in linhas]
+
+    def resumo_status(self, cursor, serie=None):
+        where, parametros = self._filtro(serie)
+        alunos, notas, media, frequencia, *contagens = self._consultar(cursor, f'''
+            SELECT COUNT(*), {_AGREGADOS_RESUMO}, {_situacao_alunos()}
+            FROM ResumoAlunos r JOIN Alunos a ON a.id = r.aluno_id
+            {where}
+        ''', parametros)[0]
+        notas = int(notas or 0)
+        return {
+            'alunos': alunos,
+            'notas': notas,
+            'media': _arredondar(media),
+            'frequencia_media': _arredondar(frequencia),
+            'status': _taxas(notas, contagens[:len(STATUS)]),
+            'situacao_alunos': {
+                status: int(quantidade or 0)
+                for status, quantidade in zip(STATUS_FINAL, contagens[len(STATUS):])
+            },
+        }
+
+    def distribuicao_frequencia(self, cursor, serie=None):
+        """Quantidade de alunos em cada faixa de frequência média"""
+        where, parametros = self._filtro(serie)
+        filtro = f'{where} AND' if where else 'WHERE'
+        faixa = 'CASE ' + ' '.join(
+            f"WHEN r.frequencia_media < {fim} THEN '{nome}'" for nome, _, fim in FAIXAS_FREQUENCIA
+        ) + " ELSE 'outras' END"
+        linhas = dict(self._consultar(cursor, f'''
+            SELECT {faixa} AS faixa, COUNT(*)
+            FROM ResumoAlunos r JOIN Alunos a ON a.id = r.aluno_id
+            {filtro} r.total_disciplinas > 0
+            GROUP BY faixa
+        ''', parametros))
+        return [{'faixa': nome, 'quantidade': int(linhas.get(nome, 0))} for nome, _, _ in FAIXAS_FREQUENCIA]
+
+    def por_serie(self, cursor):
+        linhas = self._consultar(cursor, f'''
+            SELECT a.serie, COUNT(*), {_AGREGADOS_RESUMO}
+            FROM ResumoAlunos r JOIN Alunos a ON a.id = r.aluno_id
+            GROUP BY a.serie
+            ORDER BY a.serie
+        ''', [])
+        return [{
+            'serie': serie,
+            'alunos': alunos,
+            'notas': int(notas or 0),
+            'media': _arredondar(media),
+            'frequencia_media': _arredondar(frequencia),
+            'status': _taxas(int(notas or 0), contagens),
+        } for serie, alunos, notas, media, frequencia, *contagens in linhas]
+
+    def ranking(self, cursor, serie=None, limite=10):
+        where, parametros = self._filtro(serie)
+        filtro = f'{where} AND' if where else 'WHERE'
+        marcador = '%s' if self.db.is_postgres else '?'
+        linhas = self._consultar(cursor, f'''
+            SELECT a.matricula, a.nome_completo, a.serie, r.media_geral, r.frequencia_media
+            FROM ResumoAlunos r JOIN Alunos a ON a.id = r.aluno_id
+            {filtro} r.total_disciplinas > 0
+            ORDER BY r.media_geral DESC, a.nome_completo
+            LIMIT {marcador}
+        ''', parametros + [limite])
+        return [{
+            'posicao': posicao,
+            'matricula': matricula,
+            'nome_completo': nome,
+            'serie': serie_aluno,
+            'media': _arredondar(media),
+            'frequencia_media': _arredondar(frequencia),
+        } for posicao, (matricula, nome, serie_aluno, media, frequencia) in enumerate(linhas, start=1)]
+
+    def painel(self, serie=None, limite_ranking=10):
+        """Todos os indicadores do escopo (uma série ou, sem série, a escola)"""
+        with self.db.conexao() as conn:
+            cursor = conn.cursor()
+            painel = {
+                'escopo': {'serie': serie} if serie else {'escola': True},
+                'resumo': self.resumo_status(cursor, serie),
+                'disciplinas': self.por_disciplina(cursor, serie),
+                'frequencia': self.distribuicao_frequencia(cursor, serie),
+                'ranking': self.ranking(cursor, serie, limite_ranking),
+            }
+            if not serie:
+                painel['series'] = self.por_serie(cursor)
+        return painel
+
+    def secao(self, nome, serie=None, limite_ranking=10):
+        """Um único indicador do painel, pelo nome"""
+        with self.db.conexao() as conn:
+            cursor = conn.cursor()
+            if nome == 'resumo':
+                return self.resumo_status(cursor, serie)
+            if nome == 'disciplinas':
+                return self.por_disciplina(cursor, serie)
+            if nome == 'frequencia':
+                return self.distribuicao_frequencia(cursor, serie)
+            if nome == 'ranking':
+                return self.ranking(cursor, serie, limite_ranking)
+            if nome == 'series':
+                return self.por_serie(cursor)
+        raise KeyError(nome)
+
+
+SECOES = ('resumo', 'disciplinas', 'frequencia', 'ranking', 'series')
@@ -0,0 +1,39 @@
+"""Cadastro dos anos letivos e escolha do ano corrente
+
+Uso pela linha de comando:
+
+    python anos_letivos.py                          # lista os anos cadastrados
+    python anos_letivos.py --criar 2026 --periodos 4
+    python anos_letivos.py --atual 2026             # passa a gravar e exibir 2026
+"""
+import argparse
+
+from database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Anos letivos')
+    parser.add_argument('--criar', type=int, metavar='ANO', help='cadastra um ano letivo')
+    parser.add_argument('--periodos', type=int, default=2, help='períodos de avaliação do ano criado')
+    parser.add_argument('--atual', type=int, metavar='ANO', help='define o ano letivo corrente')
+    args = parser.parse_args()
+
+    db = Database()
+    db.init_db()
+    try:
+        if args.criar:
+            db.criar_ano_letivo(args.criar, args.periodos)
+            print(f"✅ Ano letivo {args.criar} cadastrado com {args.periodos} períodos")
+        if args.atual:
+            total = db.definir_ano_atual(args.atual)
+            print(f"✅ {args.atual} é o ano letivo corrente (resumo recalculado para {total} alunos)")
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    for ano in db.listar_anos_letivos():
+        print(f"{'📅' if ano.atual else '  '} {ano.ano}: {ano.periodos} períodos{' (corrente)' if ano.atual else ''}")
+
+
+if __name__ == '__main__':
+    main()
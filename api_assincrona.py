@@ -0,0 +1,270 @@
+"""API assíncrona (ASGI) para as rotas consultadas a cada tecla digitada
+
+/sistema/api/buscar_alunos e /sistema/api/verificar_matricula/<matricula>
+são chamadas pelo front-end enquanto o usuário digita. Sob o gunicorn com
+workers gthread cada uma ocupa uma thread durante a ida ao banco; aqui elas
+são atendidas no laço de eventos, com um driver assíncrono (asyncpg no
+PostgreSQL, aiosqlite no SQLite) e um pool de ASGI_CONEXOES conexões de
+leitura por processo.
+
+Consultas iguais em andamento são agrupadas: se dez requisições pedem a mesma
+busca ao mesmo tempo, o banco é consultado uma vez e todas recebem a mesma
+resposta (já serializada). O cookie de sessão é o mesmo das rotas Flask, e
+as demais rotas continuam no Flask, chamado em threads pelo asgiref.
+
+    WEB_WORKER_CLASS=uvicorn_worker.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+
+Sem o driver assíncrono instalado as consultas rodam em threads pelo
+Database de sempre, ainda com o agrupamento.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from urllib.parse import parse_qs, quote
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import parse_cookie
+from werkzeug.utils import redirect
+
+import main
+import metricas
+from database import consulta_pagina_alunos, pagina_alunos
+
+log = logging.getLogger(__name__)
+
+ROTA_BUSCA = '/sistema/api/buscar_alunos'
+ROTA_MATRICULA = re.compile(r'/sistema/api/verificar_matricula/([^/]+)')
+
+def _marcadores_numerados(sql):
+    """Troca os marcadores %s do psycopg2 pelos $1, $2... do asyncpg"""
+    numeros = itertools.count(1)
+    return re.sub(r'%s', lambda _: f'${next(numeros)}', sql)
+
+def _json(dados):
+    # Mesmo formato do jsonify do Flask
+    return json.dumps(dados, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+class BancoAssincrono:
+    """Conexões de leitura assíncronas para o mesmo banco do Database"""
+
+    def __init__(self, db, tamanho=4):
+        self.db = db
+        self.tamanho = tamanho
+        self.driver = None
+        self._pool = None
+        self._livres = None
+        self._abertura = None
+
+    async def abrir(self):
+        if self._abertura is None:
+            self._abertura = asyncio.Lock()
+        async with self._abertura:
+            if self.driver:
+                return
+            try:
+                if self.db.is_postgres:
+                    import asyncpg
+                    self._pool = await asyncpg.create_pool(self.db.db_url, min_size=1, max_size=self.tamanho)
+                    self.driver = 'asyncpg'
+                else:
+                    import aiosqlite
+                    self._livres = asyncio.Queue()
+                    for _ in range(self.tamanho):
+                        conn = await aiosqlite.connect(self.db.sqlite_path)
+                        await conn.execute('PRAGMA query_only = 1')
+                        self._livres.put_nowait(conn)
+                    self.driver = 'aiosqlite'
+            except ImportError as e:
+                log.warning("Driver assíncrono não disponível, consultas em threads", extra={'erro': str(e)})
+                self.driver = 'threads'
+            log.info("Conexões assíncronas abertas", extra={'driver': self.driver, 'conexoes': self.tamanho})
+
+    async def fechar(self):
+        if self.driver == 'asyncpg':
+            await self._pool.close()
+        elif self.driver == 'aiosqlite':
+            while not self._livres.empty():
+                await self._livres.get_nowait().close()
+        self.driver = None
+
+    def _consultar_em_thread(self, sql, parametros):
+        with self.db.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, parametros)
+            return cursor.fetchall()
+
+    async def consultar(self, sql, parametros):
+        """Executa uma consulta de leitura e retorna as linhas como tuplas"""
+        if not self.driver:
+            await self.abrir()
+        if self.driver == 'asyncpg':
+            async with self._pool.acquire() as conn:
+                linhas = await conn.fetch(_marcadores_numerados(sql), *parametros)
+            return [tuple(linha) for linha in linhas]
+        if self.driver == 'aiosqlite':
+            conn = await self._livres.get()
+            try:
+                async with conn.execute(sql, parametros) as cursor:
+                    return await cursor.fetchall()
+            finally:
+                self._livres.put_nowait(conn)
+        return await asyncio.to_thread(self._consultar_em_thread, sql, parametros)
+
+    def estatisticas(self):
+        return {
+            'conexoes': self.tamanho,
+            'livres': self._livres.qsize() if self._livres is not None else 0,
+        }
+
+
+class Agrupador:
+    """Faz chamadas iguais em andamento compartilharem um único resultado"""
+
+    def __init__(self):
+        self._em_andamento = {}
+        self.executadas = 0
+        self.compartilhadas = 0
+
+    async def executar(self, chave, funcao):
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is not None:
+            self.compartilhadas += 1
+        else:
+            self.executadas += 1
+            tarefa = asyncio.ensure_future(funcao())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._em_andamento.pop(chave, None))
+        # shield: um cliente que desiste não cancela a consulta dos outros
+        return await asyncio.shield(tarefa)
+
+    def estatisticas(self):
+        return {
+            'executadas': self.executadas,
+            'compartilhadas': self.compartilhadas,
+            'em_andamento': len(self._em_andamento),
+        }
+
+
+class AppAssincrona:
+    """Aplicação ASGI: as rotas de busca no laço de eventos, o resto no Flask"""
+
+    def __init__(self, app_flask, conexoes=None):
+        self.flask = WsgiToAsgi(app_flask)
+        self.banco = BancoAssincrono(main.db, conexoes or int(os.environ.get('ASGI_CONEXOES', 4)))
+        self.agrupador = Agrupador()
+        metricas.estatisticas('boletim_asgi', 'API assíncrona de busca', self.estatisticas)
+
+    def estatisticas(self):
+        return dict(self.banco.estatisticas(), **self.agrupador.estatisticas())
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._ciclo_de_vida(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            caminho = scope['path']
+            if caminho == ROTA_BUSCA:
+                return await self._atender(scope, send, ROTA_BUSCA, self._buscar_alunos)
+            encontrada = ROTA_MATRICULA.fullmatch(caminho)
+            if encontrada:
+                return await self._atender(scope, send, '/sistema/api/verificar_matricula/<matricula>',
+                                           self._verificar_matricula, encontrada.group(1))
+        await self.flask(scope, receive, send)
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await self.banco.abrir()
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await self.banco.fechar()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _atender(self, scope, send, regra, rota, *argumentos):
+        inicio = time.perf_counter()
+        cabecalhos = dict(scope['headers'])
+        try:
+            destino = await self._verificar_sessao(parse_cookie(cabecalhos.get(b'cookie', b'').decode('latin-1')))
+            if destino:
+                # Location codificada como o gunicorn faz com a resposta do Flask
+                resposta = redirect(quote(destino, safe='/?=&'))
+                status, corpo = resposta.status_code, resposta.get_data()
+                extras = [(nome.lower(), valor) for nome, valor in resposta.headers.to_wsgi_list()
+                          if nome.lower() not in ('content-length', 'content-type')]
+                tipo = resposta.content_type
+            else:
+                consulta = parse_qs(scope['query_string'].decode('latin-1'), keep_blank_values=True)
+                parametros = {nome: valores[0] for nome, valores in consulta.items()}
+                status, corpo = await rota(parametros, *argumentos)
+                extras, tipo = [], 'application/json'
+        except Exception:
+            log.exception("Erro na API assíncrona", extra={'rota': regra})
+            status, corpo, extras, tipo = 500, _json({'success': False, 'message': 'Erro interno'}), [], 'application/json'
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', tipo.encode('latin-1')),
+                        (b'content-length', str(len(corpo)).encode('latin-1'))]
+                       + [(nome.encode('latin-1'), valor.encode('latin-1')) for nome, valor in extras],
+        })
+        await send({'type': 'http.response.body', 'body': corpo})
+        main.DURACAO_REQUISICOES.observar(time.perf_counter() - inicio, regra, 'GET', str(status))
+
+    async def _verificar_sessao(self, cookies):
+        """Mesmas regras de login_required; retorna a página para redirecionar ou None"""
+        payload, destino = main.verificar_token(cookies.get('token'))
+        if destino:
+            return destino
+        email = payload.get('email')
+        usuario = main.usuarios.em_cache(email)
+        if usuario is None:
+            usuario = await asyncio.to_thread(main.usuarios.obter, email)
+        if not usuario or not usuario.ativo:
+            return main.USUARIO_INATIVO
+        return None
+
+    async def _buscar_alunos(self, parametros):
+        termo = parametros.get('busca', '')
+        try:
+            limite = int(parametros.get('limite', main.TAMANHO_PAGINA_PADRAO))
+        except ValueError:
+            limite = main.TAMANHO_PAGINA_PADRAO
+        limite = max(1, min(limite, main.TAMANHO_PAGINA_MAXIMO))
+        cursor = parametros.get('cursor') or None
+        incluir_total = parametros.get('incluir_total') == '1'
+
+        async def consultar():
+            try:
+                consulta = consulta_pagina_alunos(termo, limite, cursor, main.db.is_postgres)
+            except ValueError as e:
+                return 400, _json({'success': False, 'message': str(e)})
+            linhas = await self.banco.consultar(*consulta)
+            alunos, proximo_cursor = pagina_alunos(linhas, termo, limite)
+            resposta = {'alunos': alunos, 'proximo_cursor': proximo_cursor}
+            if incluir_total:
+                # A contagem tem cache próprio no Database, invalidado nas gravações
+                resposta['total'] = await asyncio.to_thread(main.db.contar_alunos, termo)
+            return 200, _json(resposta)
+
+        return await self.agrupador.executar(('busca', termo, limite, cursor, incluir_total), consultar)
+
+    async def _verificar_matricula(self, parametros, matricula):
+        marcador = '%s' if main.db.is_postgres else '?'
+
+        async def consultar():
+            linhas = await self.banco.consultar(f'SELECT 1 FROM Alunos WHERE matricula = {marcador}', [matricula])
+            return 200, _json({'existe': bool(linhas)})
+
+        return await self.agrupador.executar(('matricula', matricula), consultar)
+
+
+def criar_app_asgi(app_flask, conexoes=None):
+    """Envolve a aplicação de main.create_app com a API assíncrona"""
+    return AppAssincrona(app_flask, conexoes)
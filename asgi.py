@@ -0,0 +1,12 @@
+"""Ponto de entrada ASGI: a API assíncrona de busca na frente do Flask
+
+    WEB_WORKER_CLASS=uvicorn_worker.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+
+As rotas de busca de alunos e verificação de matrícula são atendidas no laço
+de eventos (ver api_assincrona); as demais seguem para a aplicação Flask, a
+mesma de wsgi.py.
+"""
+from api_assincrona import criar_app_asgi
+from main import create_app
+
+app = criar_app_asgi(create_app(iniciar_workers=False))
@@ -0,0 +1,197 @@
+"""Verificação de tokens JWT, senhas e consulta de usuários
+
+Toda rota protegida valida o token do cookie e confere o usuário. As duas
+coisas ficam em caches LRU: o token já verificado vale até o seu ``exp`` (ou
+até o TTL do cache, o que vier antes) e o usuário é lido do banco no máximo
+uma vez por TTL. No logout o token sai do cache e fica revogado neste
+processo até expirar.
+
+As senhas usam PBKDF2 com o número de iterações de SENHA_ITERACOES. Hashes
+gravados com outro custo são refeitos no próximo login bem-sucedido. Como
+cada verificação (ou novo hash) ocupa uma CPU por uma fração de segundo, no
+máximo SENHA_VERIFICACOES_SIMULTANEAS rodam ao mesmo tempo; as demais esperam
+até SENHA_TEMPO_ESPERA segundos e então recebem SenhasOcupadasError.
+
+Uso pela linha de comando:
+
+    python autenticacao.py adicionar professor@escola.com "Nome" professor
+    python autenticacao.py desativar professor@escola.com
+"""
+import argparse
+import getpass
+import os
+import threading
+import time
+
+import jwt
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from cache_lru import CacheLRU
+
+ALGORITMO = 'HS256'
+
+TIPOS_USUARIO = ('professor', 'secretaria')
+
+ITERACOES_PADRAO = 600000
+
+
+class SenhasOcupadasError(Exception):
+    """Verificações de senha demais em andamento; tente de novo em instantes"""
+
+
+def metodo_hash():
+    """Método do werkzeug para novos hashes, com o custo configurado"""
+    return f"pbkdf2:sha256:{int(os.environ.get('SENHA_ITERACOES') or ITERACOES_PADRAO)}"
+
+
+def gerar_hash_senha(senha):
+    return generate_password_hash(senha, method=metodo_hash())
+
+
+def precisa_rehash(senha_hash):
+    """True se o hash foi gerado com outro método ou custo"""
+    return senha_hash.split('$', 1)[0] != metodo_hash()
+
+
+class VerificadorSenhas:
+    """Limita quantas verificações e gerações de hash (caras de propósito) rodam ao mesmo tempo"""
+
+    def __init__(self, maximo_simultaneas=None, tempo_espera=5.0):
+        self._semaforo = threading.BoundedSemaphore(maximo_simultaneas or os.cpu_count() or 1)
+        self.tempo_espera = tempo_espera
+
+    def _limitado(self, funcao, *argumentos):
+        if not self._semaforo.acquire(timeout=self.tempo_espera):
+            raise SenhasOcupadasError()
+        try:
+            return funcao(*argumentos)
+        finally:
+            self._semaforo.release()
+
+    def verificar(self, senha_hash, senha):
+        return self._limitado(check_password_hash, senha_hash, senha)
+
+    def gerar(self, senha):
+        """Hash da senha com o custo atual, dentro do mesmo limite"""
+        return self._limitado(gerar_hash_senha, senha)
+
+
+class CacheTokens:
+    def __init__(self, chave_secreta, tamanho_maximo=1024, ttl_maximo=300.0):
+        self.chave_secreta = chave_secreta
+        self._tokens = CacheLRU(tamanho_maximo, ttl_maximo)
+        self._revogados = CacheLRU(tamanho_maximo, ttl_maximo)
+
+    def _decodificar(self, token):
+        return jwt.decode(token, self.chave_secreta, algorithms=[ALGORITMO])
+
+    def verificar(self, token):
+        """Retorna o payload do token; lança jwt.InvalidTokenError se ele não valer"""
+        if self._revogados.obter(token) is not None:
+            raise jwt.InvalidTokenError("Token revogado")
+        payload = self._tokens.obter(token)
+        if payload is not None:
+            return payload
+
+        payload = self._decodificar(token)
+        restante = payload['exp'] - time.time() if 'exp' in payload else self._tokens.ttl
+        if restante > 0:
+            self._tokens.guardar(token, payload, ttl=min(self._tokens.ttl, restante))
+        return payload
+
+    def revogar(self, token):
+        """Remove o token do cache e o recusa até expirar"""
+        self._tokens.remover(token)
+        try:
+            payload = self._decodificar(token)
+        except jwt.InvalidTokenError:
+            return
+        restante = payload['exp'] - time.time() if 'exp' in payload else self._revogados.ttl
+        if restante > 0:
+            self._revogados.guardar(token, True, ttl=restante)
+
+    def estatisticas(self):
+        return self._tokens.estatisticas()
+
+
+class RepositorioUsuarios:
+    """Usuários da tabela Usuarios, guardados em cache por e-mail"""
+
+    def __init__(self, db, tamanho_maximo=256, ttl=60.0, verificador=None):
+        self.db = db
+        self.verificador = verificador or VerificadorSenhas()
+        self._usuarios = CacheLRU(tamanho_maximo, ttl)
+
+    def obter(self, email):
+        usuario = self._usuarios.obter(email)
+        if usuario is None:
+            usuario = self.db.buscar_usuario_por_email(email)
+            if usuario is not None:
+                self._usuarios.guardar(email, usuario)
+        return usuario
+
+    def em_cache(self, email):
+        """O usuário se já estiver em cache, sem consultar o banco (ou None)"""
+        return self._usuarios.obter(email)
+
+    def autenticar(self, email, senha):
+        """Retorna o usuário ativo se a senha confere, ou None
+
+        Se o hash gravado usa outro custo, ele é refeito com o atual (ou no
+        próximo login, se as verificações estiverem ocupadas).
+        Lança SenhasOcupadasError se a verificação não puder começar a tempo.
+        """
+        usuario = self.obter(email)
+        if not usuario or not usuario.ativo:
+            return None
+        if not self.verificador.verificar(usuario.senha_hash, senha):
+            return None
+        if precisa_rehash(usuario.senha_hash):
+            try:
+                senha_hash = self.verificador.gerar(senha)
+            except SenhasOcupadasError:
+                # A senha já conferiu; o login não espera de novo pelo rehash
+                return usuario
+            self.db.atualizar_senha_hash(usuario.id, senha_hash)
+            self.invalidar(email)
+        return usuario
+
+    def invalidar(self, email):
+        self._usuarios.remover(email)
+
+    def estatisticas(self):
+        return self._usuarios.estatisticas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerencia os usuários do sistema')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    adicionar = comandos.add_parser('adicionar', help='cria um usuário (ou troca a senha de um existente)')
+    adicionar.add_argument('email')
+    adicionar.add_argument('nome')
+    adicionar.add_argument('tipo', choices=TIPOS_USUARIO)
+    desativar = comandos.add_parser('desativar', help='bloqueia o acesso de um usuário')
+    desativar.add_argument('email')
+    args = parser.parse_args()
+
+    from database import Database
+    db = Database()
+    db.init_db()
+    email = args.email.strip().lower()
+
+    if args.comando == 'adicionar':
+        senha = getpass.getpass('Senha: ')
+        if not senha or senha != getpass.getpass('Confirme a senha: '):
+            print("❌ As senhas não conferem")
+            raise SystemExit(1)
+        db.salvar_usuario(email, args.nome, args.tipo, gerar_hash_senha(senha))
+        print(f"✅ Usuário {email} salvo")
+    elif not db.definir_usuario_ativo(email, False):
+        print(f"❌ Usuário {email} não encontrado")
+        raise SystemExit(1)
+    else:
+        print(f"✅ Usuário {email} desativado")
+
+
+if __name__ == '__main__':
+    main()
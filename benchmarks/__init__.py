@@ -0,0 +1 @@
+"""Scripts de benchmark (execute da raiz do projeto com ``python -m benchmarks.<nome>``)"""
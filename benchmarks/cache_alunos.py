@@ -0,0 +1,85 @@
+"""Leituras de aluno com e sem o cache de alunos do Database
+
+Cria um banco SQLite temporário com ``--alunos`` alunos e mede
+buscar_aluno_por_matricula sobre um conjunto quente de ``--quentes``
+matrículas (como numa semana de lançamento de notas), com o cache desligado
+(CACHE_ALUNOS_MAX=0) e ligado. Depois confere a invalidação entre processos:
+uma segunda instância de Database, com o seu próprio cache, grava notas e a
+primeira precisa enxergá-las na leitura seguinte.
+
+Uso (da raiz do projeto):
+
+    python -m benchmarks.cache_alunos --alunos 20000 --quentes 300
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def _leituras_por_segundo(db, matriculas, leituras, rodadas=5):
+    aleatorio = random.Random(0)
+    sorteadas = [aleatorio.choice(matriculas) for _ in range(leituras)]
+    for matricula in matriculas:
+        db.buscar_aluno_por_matricula(matricula)
+    tempos = []
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        for matricula in sorteadas:
+            db.buscar_aluno_por_matricula(matricula)
+        tempos.append(time.perf_counter() - inicio)
+    return leituras / statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do cache de alunos')
+    parser.add_argument('--alunos', type=int, default=20000)
+    parser.add_argument('--quentes', type=int, default=300, help='alunos consultados repetidamente')
+    parser.add_argument('--leituras', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.environ['SQLITE_PATH'] = os.path.join(diretorio, 'cache.db')
+        os.environ.setdefault('LOG_NIVEL', 'WARNING')
+        os.environ.pop('DATABASE_URL', None)
+        from database import Database
+        from init_data import popular_banco_dados
+
+        db = Database()
+        db.init_db()
+        popular_banco_dados(db, args.alunos, 1)
+        quentes = [f"S{numero:06d}" for numero in random.Random(1).sample(range(1, args.alunos + 1), args.quentes)]
+
+        os.environ['CACHE_ALUNOS_MAX'] = '0'
+        sem_cache = _leituras_por_segundo(Database(), quentes, args.leituras)
+        os.environ['CACHE_ALUNOS_MAX'] = str(max(1024, args.quentes))
+        leitor = Database()
+        com_cache = _leituras_por_segundo(leitor, quentes, args.leituras)
+
+        # Outra instância (como outro worker) grava; o leitor precisa ver a mudança
+        escritor = Database()
+        matricula = quentes[0]
+        disciplina = leitor.buscar_aluno_por_matricula(matricula)[1][0].disciplina
+        escritor.atualizar_notas([(matricula, disciplina, 1.0, 2.0, 50.0)])
+        nota = next(n for n in leitor.buscar_aluno_por_matricula(matricula)[1] if n.disciplina == disciplina)
+        visivel = (nota.nota_1_bimestre, nota.nota_2_bimestre) == (1.0, 2.0)
+        escritor.remover_aluno(matricula)
+        removido = leitor.buscar_aluno_por_matricula(matricula)[0] is None
+        estatisticas = leitor.estatisticas_cache_alunos()
+        for instancia in (leitor, escritor):
+            instancia.fechar()
+
+    print(f"📊 {args.quentes} alunos quentes de {args.alunos}, {args.leituras} leituras por rodada")
+    print(f"   sem cache  {sem_cache:10.0f} leituras/s")
+    print(f"   com cache  {com_cache:10.0f} leituras/s  ({com_cache / sem_cache:.1f}x, "
+          f"taxa de acerto {estatisticas['taxa_acerto']})")
+    if not (visivel and removido):
+        print("❌ O cache devolveu dados gravados por outra instância desatualizados")
+        raise SystemExit(1)
+    print("✅ Gravação e remoção feitas por outra instância vistas na leitura seguinte")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Teste de carga local contra um servidor em execução
+
+Receita para comparar o servidor de desenvolvimento com o gunicorn:
+
+    # 1) servidor de desenvolvimento (um processo)
+    python main.py                                   # porta 5000
+    python -m benchmarks.carga --url http://localhost:5000
+
+    # 2) gunicorn (vários processos e threads)
+    gunicorn -c gunicorn.conf.py wsgi:app            # porta 8000
+    python -m benchmarks.carga --url http://localhost:8000
+
+    # 3) gunicorn com a API assíncrona de busca (asgi.py)
+    WEB_WORKER_CLASS=uvicorn_worker.UvicornWorker gunicorn -c gunicorn.conf.py asgi:app
+    python -m benchmarks.carga --url http://localhost:8000 --boletins 0
+
+Os clientes (threads) usam o token de um único login (a verificação de senha
+é cara de propósito), mantêm a conexão aberta e repetem uma mistura
+de rotas leves (busca de alunos, verificação de matrícula) com uma fração de
+boletins em PDF. O relatório mostra requisições por segundo e latências
+p50/p95/p99 por rota; --boletins controla a fração de PDFs.
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+
+def _percentil(valores, fracao):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fracao))]
+
+
+class Cliente:
+    def __init__(self, url, cabecalhos=None):
+        partes = urlsplit(url)
+        self.conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=60)
+        self.cabecalhos = cabecalhos
+
+    def login(self, email, senha, tipo):
+        corpo = json.dumps({'email': email, 'password': senha, 'user_type': tipo})
+        self.conexao.request('POST', '/api/auth/login', corpo, {'Content-Type': 'application/json'})
+        resposta = self.conexao.getresponse()
+        resposta.read()
+        if resposta.status != 200:
+            raise RuntimeError(f"Login falhou: {resposta.status}")
+        cookie = resposta.getheader('Set-Cookie', '')
+        self.cabecalhos = {'Cookie': cookie.split(';', 1)[0]}
+
+    def get(self, caminho):
+        self.conexao.request('GET', caminho, headers=self.cabecalhos)
+        resposta = self.conexao.getresponse()
+        resposta.read()
+        return resposta.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga local')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concorrencia', type=int, default=16, help='clientes simultâneos')
+    parser.add_argument('--duracao', type=float, default=20.0, help='segundos de carga')
+    parser.add_argument('--boletins', type=float, default=0.05, help='fração das requisições que pedem PDF')
+    parser.add_argument('--email', default='secretaria@escola.com')
+    parser.add_argument('--senha', default='123456')
+    parser.add_argument('--tipo', default='secretaria')
+    args = parser.parse_args()
+
+    inicial = Cliente(args.url)
+    inicial.login(args.email, args.senha, args.tipo)
+    inicial.conexao.request('GET', '/sistema/api/buscar_alunos?limite=200', headers=inicial.cabecalhos)
+    matriculas = [aluno[5] for aluno in json.loads(inicial.conexao.getresponse().read())['alunos']]
+    if not matriculas:
+        raise SystemExit("❌ Nenhum aluno no banco do servidor")
+    termos = ['a', 'ma', 'jo', 'sil', 'an', 'pe']
+
+    latencias = {}
+    erros = {}
+    lock = threading.Lock()
+    fim = time.monotonic() + args.duracao
+
+    def trabalhar(numero):
+        cliente = Cliente(args.url, inicial.cabecalhos)
+        aleatorio = random.Random(numero)
+        while time.monotonic() < fim:
+            sorteio = aleatorio.random()
+            if sorteio < args.boletins:
+                rota, caminho = 'boletim', f"/sistema/gerar_boletim/{quote(aleatorio.choice(matriculas))}"
+            elif sorteio < 0.75:
+                rota, caminho = 'buscar_alunos', f"/sistema/api/buscar_alunos?busca={aleatorio.choice(termos)}"
+            else:
+                rota, caminho = 'verificar_matricula', f"/sistema/api/verificar_matricula/{quote(aleatorio.choice(matriculas))}"
+            inicio = time.perf_counter()
+            try:
+                status = cliente.get(caminho)
+            except (OSError, http.client.HTTPException):
+                status = 0
+                cliente = Cliente(args.url, inicial.cabecalhos)
+            duracao = time.perf_counter() - inicio
+            with lock:
+                if status == 200:
+                    latencias.setdefault(rota, []).append(duracao)
+                else:
+                    erros[rota] = erros.get(rota, 0) + 1
+
+    inicio = time.monotonic()
+    clientes = [threading.Thread(target=trabalhar, args=(numero,)) for numero in range(args.concorrencia)]
+    for cliente in clientes:
+        cliente.start()
+    for cliente in clientes:
+        cliente.join()
+    decorrido = time.monotonic() - inicio
+
+    total = sum(len(valores) for valores in latencias.values())
+    print(f"📊 {args.url}: {total} requisições em {decorrido:.1f}s = {total / decorrido:.1f} req/s "
+          f"({args.concorrencia} clientes, {sum(erros.values())} erros)")
+    for rota, valores in sorted(latencias.items()):
+        print(f"   {rota:20s} {len(valores):7d}  p50 {statistics.median(valores) * 1000:7.1f} ms"
+              f"  p95 {_percentil(valores, 0.95) * 1000:7.1f} ms  p99 {_percentil(valores, 0.99) * 1000:7.1f} ms"
+              f"  erros {erros.get(rota, 0)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Vazão da correção de notas de uma turma inteira
+
+Cria um banco SQLite temporário com ``--turmas`` turmas de ``--alunos``
+alunos (8 disciplinas cada) e mede a correção de todas as notas de uma turma:
+com Database.atualizar_notas (um único upsert) e, para comparação, com um
+UPDATE por nota avaliando a regra em Python.
+
+Uso (da raiz do projeto):
+
+    python -m benchmarks.correcao_notas --alunos 40 --turmas 25 --repeticoes 5
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def _popular(db, turmas, alunos_por_turma, disciplinas):
+    lotes = []
+    for turma in range(turmas):
+        alunos, notas = [], []
+        for numero in range(alunos_por_turma):
+            matricula = f"T{turma:03d}A{numero:04d}"
+            alunos.append((f"Aluno {turma}-{numero}", '2010-01-01', f"Turma {turma}", 'Responsável', matricula))
+            notas.extend((matricula, disciplina, 6.0, 6.0, 80.0) for disciplina in disciplinas)
+        lotes.append((alunos, notas))
+    db.importar_lotes(lotes)
+
+
+def _correcoes(turma, alunos_por_turma, disciplinas, rodada):
+    aleatorio = random.Random(rodada)
+    return [
+        (f"T{turma:03d}A{numero:04d}", disciplina,
+         round(aleatorio.uniform(0, 10), 1), round(aleatorio.uniform(0, 10), 1), round(aleatorio.uniform(50, 100), 1))
+        for numero in range(alunos_por_turma) for disciplina in disciplinas
+    ]
+
+
+def _corrigir_linha_a_linha(db, correcoes):
+    avaliar = db.regras.padrao.avaliar
+    with db.conexao() as conn:
+        cursor = conn.cursor()
+        for matricula, disciplina, nota_1, nota_2, frequencia in correcoes:
+            media_final, status = avaliar(nota_1, nota_2, frequencia)
+            cursor.execute('''
+                UPDATE Notas SET nota_1_bimestre = ?, nota_2_bimestre = ?, media_final = ?,
+                                 frequencia_percentual = ?, status = ?
+                WHERE aluno_id = (SELECT id FROM Alunos WHERE matricula = ?) AND disciplina = ?
+                  AND ano_letivo = (SELECT ano FROM AnosLetivos WHERE atual)
+            ''', (nota_1, nota_2, media_final, frequencia, status, matricula, disciplina))
+            aluno_id = cursor.execute('SELECT id FROM Alunos WHERE matricula = ?', (matricula,)).fetchone()[0]
+            db._atualizar_resumo(cursor, 'id', [aluno_id])
+        conn.commit()
+
+
+def _medir(funcao, repeticoes):
+    tempos = []
+    for rodada in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(rodada)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da correção de notas de uma turma')
+    parser.add_argument('--alunos', type=int, default=40, help='alunos por turma')
+    parser.add_argument('--turmas', type=int, default=25, help='turmas no banco')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.environ['SQLITE_PATH'] = os.path.join(diretorio, 'benchmark.db')
+        os.environ.pop('DATABASE_URL', None)
+        from database import Database
+        db = Database()
+        db.init_db()
+        disciplinas = db.get_disciplinas_padrao()
+        _popular(db, args.turmas, args.alunos, disciplinas)
+        notas_turma = args.alunos * len(disciplinas)
+
+        # Rodadas com sementes diferentes para que toda correção altere as notas
+        tempo_upsert = _medir(
+            lambda rodada: db.atualizar_notas(_correcoes(0, args.alunos, disciplinas, rodada)),
+            args.repeticoes
+        )
+        tempo_linhas = _medir(
+            lambda rodada: _corrigir_linha_a_linha(db, _correcoes(1, args.alunos, disciplinas, 1000 + rodada)),
+            args.repeticoes
+        )
+        divergentes = db.verificar_resumo()
+        db.fechar()
+
+    print(f"📊 Turma de {args.alunos} alunos ({notas_turma} notas), banco com {args.turmas} turmas")
+    print(f"   atualizar_notas (upsert único): {tempo_upsert * 1000:8.1f} ms  "
+          f"{notas_turma / tempo_upsert:10.0f} notas/s")
+    print(f"   UPDATE por nota:                {tempo_linhas * 1000:8.1f} ms  "
+          f"{notas_turma / tempo_linhas:10.0f} notas/s")
+    print(f"   ganho: {tempo_linhas / tempo_upsert:.1f}x")
+    if divergentes:
+        print(f"❌ Resumo divergente em {len(divergentes)} alunos")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Tempo de inicialização: do import de main até a primeira resposta
+
+Cada rodada é um processo Python novo (como um contêiner recém-criado) que
+importa main, chama create_app() e responde a GET /health. Falha (código 1)
+se a mediana passar do orçamento ou se fpdf/psycopg2 forem carregados antes
+da primeira resposta.
+
+Uso (da raiz do projeto):
+
+    python -m benchmarks.inicializacao --rodadas 5 --orcamento 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Executado em cada processo filho
+_PROGRAMA = '''
+import json, sys, time
+inicio = time.perf_counter()
+import main
+depois_import = time.perf_counter()
+app = main.create_app(iniciar_workers=False)
+depois_app = time.perf_counter()
+resposta = app.test_client().get('/health')
+fim = time.perf_counter()
+assert resposta.status_code == 200, resposta.status_code
+print(json.dumps({
+    'import': depois_import - inicio,
+    'create_app': depois_app - depois_import,
+    'primeira_resposta': fim - depois_app,
+    'total': fim - inicio,
+    'modulos_pesados': sorted(m for m in ('fpdf', 'psycopg2') if m in sys.modules),
+}))
+'''
+
+
+def _rodada(raiz, ambiente):
+    saida = subprocess.run(
+        [sys.executable, '-c', _PROGRAMA], cwd=raiz, env=ambiente,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização da aplicação')
+    parser.add_argument('--rodadas', type=int, default=5)
+    parser.add_argument('--orcamento', type=float, default=1.5,
+                        help='limite em segundos para a mediana do import até a primeira resposta')
+    args = parser.parse_args()
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as diretorio:
+        ambiente = dict(os.environ)
+        ambiente.update({
+            'PYTHONPATH': raiz,
+            'SQLITE_PATH': os.path.join(diretorio, 'inicializacao.db'),
+            'CACHE_PDF_DIR': os.path.join(diretorio, 'cache_pdf'),
+            'FILA_DB': os.path.join(diretorio, 'fila.db'),
+            'FILA_RESULTADOS_DIR': os.path.join(diretorio, 'resultados'),
+        })
+        ambiente.pop('DATABASE_URL', None)
+        # A primeira rodada aplica as migrações; fica de fora da mediana
+        _rodada(raiz, ambiente)
+        rodadas = [_rodada(raiz, ambiente) for _ in range(args.rodadas)]
+
+    for etapa in ('import', 'create_app', 'primeira_resposta', 'total'):
+        print(f"   {etapa:18s} {statistics.median(r[etapa] for r in rodadas) * 1000:8.1f} ms")
+    total = statistics.median(r['total'] for r in rodadas)
+    pesados = sorted({m for r in rodadas for m in r['modulos_pesados']})
+
+    falhou = False
+    if pesados:
+        print(f"❌ Módulos pesados carregados na inicialização: {', '.join(pesados)}")
+        falhou = True
+    if total > args.orcamento:
+        print(f"❌ Inicialização em {total:.3f}s passou do orçamento de {args.orcamento:.3f}s")
+        falhou = True
+    if falhou:
+        raise SystemExit(1)
+    print(f"✅ Inicialização em {total:.3f}s (orçamento {args.orcamento:.3f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Pico de memória por requisição de boletim em PDF
+
+Cria um banco temporário com um aluno comum (8 disciplinas) e um com
+histórico longo (``--disciplinas`` linhas, várias páginas) e pede o boletim
+de cada um pela rota /sistema/gerar_boletim, duas vezes: a primeira
+renderiza o PDF (cache vazio) e a segunda vem do cache em disco. O corpo da
+resposta é consumido em partes, como faria o servidor, e o pico de memória
+alocada no processo web durante a requisição é medido com tracemalloc (a
+renderização em si roda no pool de processos e não entra na conta).
+
+Uso (da raiz do projeto):
+
+    python -m benchmarks.memoria_pdf --disciplinas 2000
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+
+def _pedir(cliente, caminho):
+    """Faz a requisição consumindo o corpo em partes; retorna (bytes, Content-Length, pico)"""
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    resposta = cliente.get(caminho, buffered=False)
+    recebidos = 0
+    for parte in resposta.response:
+        recebidos += len(parte)
+    resposta.close()
+    pico = tracemalloc.get_traced_memory()[1] - base
+    if resposta.status_code != 200:
+        raise SystemExit(f"❌ {caminho}: status {resposta.status_code}")
+    return recebidos, resposta.headers.get('Content-Length'), pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pico de memória por requisição de boletim')
+    parser.add_argument('--disciplinas', type=int, default=2000, help='linhas do boletim com histórico longo')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.environ.update({
+            'SQLITE_PATH': os.path.join(diretorio, 'memoria.db'),
+            'CACHE_PDF_DIR': os.path.join(diretorio, 'cache_pdf'),
+            'FILA_DB': os.path.join(diretorio, 'fila.db'),
+            'FILA_RESULTADOS_DIR': os.path.join(diretorio, 'resultados'),
+        })
+        os.environ.setdefault('LOG_NIVEL', 'WARNING')
+        os.environ.pop('DATABASE_URL', None)
+
+        import main as aplicacao
+        app = aplicacao.create_app(iniciar_workers=False)
+        db = aplicacao.db
+        disciplinas = db.get_disciplinas_padrao()
+        casos = [
+            ('aquecimento', 'M0', [(d, 7.0, 8.0, 90.0) for d in disciplinas]),
+            ('comum', 'M1', [(d, 7.0, 8.0, 90.0) for d in disciplinas]),
+            ('historico_longo', 'M2', [(f"Disciplina {i:05d}", 6.5, 7.5, 85.0) for i in range(args.disciplinas)]),
+        ]
+        for _, matricula, notas in casos:
+            db.matricular_aluno(f"Aluno {matricula}", '2010-01-01', '9º Ano - Fundamental II', 'Responsável',
+                                matricula, notas)
+
+        cliente = app.test_client()
+        cliente.post('/api/auth/login', json={
+            'email': 'secretaria@escola.com', 'password': '123456', 'user_type': 'secretaria'
+        })
+
+        tracemalloc.start()
+        resultados = []
+        for nome, matricula, _ in casos:
+            renderizado = _pedir(cliente, f'/sistema/gerar_boletim/{matricula}')
+            do_cache = _pedir(cliente, f'/sistema/gerar_boletim/{matricula}')
+            resultados.append((nome, renderizado, do_cache))
+        tracemalloc.stop()
+        aplicacao.encerrar()
+
+    print("📊 Pico de memória no processo web por requisição (tracemalloc)")
+    for nome, (tamanho, comprimento, pico), (_, comprimento_cache, pico_cache) in resultados[1:]:
+        print(f"   {nome:16s} PDF {tamanho / 1024:8.1f} KiB | renderizado: pico {pico / 1024:8.1f} KiB "
+              f"({pico / tamanho:4.1f}x) | do cache: pico {pico_cache / 1024:8.1f} KiB ({pico_cache / tamanho:4.1f}x)"
+              f" | Content-Length {'ok' if comprimento == comprimento_cache == str(tamanho) else 'ausente'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Boletins por segundo renderizados por pdf_generator.ModeloBoletim
+
+Renderiza um conjunto de boletins sintéticos (8 disciplinas cada) com
+pdf_generator.gerar_boletim_bytes em um único processo (um núcleo). Falha
+(código 1) se a vazão ficar abaixo de ``--meta`` boletins/s, se dois boletins
+com a mesma entrada não saírem idênticos byte a byte ou se um nome longo não
+for quebrado dentro da largura da página.
+
+Uso (da raiz do projeto):
+
+    python -m benchmarks.pdf --boletins 500 --meta 1000
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+import zlib
+from datetime import datetime
+
+from modelos import Aluno, Nota
+
+DISCIPLINAS = ['Matemática', 'Língua Portuguesa', 'Ciências', 'História',
+               'Geografia', 'Inglês', 'Artes', 'Educação Física']
+
+
+def _boletins(quantidade):
+    aleatorio = random.Random(1)
+    boletins = []
+    for numero in range(quantidade):
+        aluno = Aluno(numero, f"Aluno Sintético {numero}", '2010-05-20', '9º Ano - Fundamental II',
+                      'Responsável Sintético', f"B{numero:06d}")
+        notas = []
+        for indice, disciplina in enumerate(DISCIPLINAS):
+            nota_1, nota_2 = round(aleatorio.uniform(0, 10), 1), round(aleatorio.uniform(0, 10), 1)
+            notas.append(Nota(indice, numero, disciplina, nota_1, nota_2, (nota_1 + nota_2) / 2,
+                              round(aleatorio.uniform(50, 100), 1), 'Aprovado'))
+        boletins.append((aluno, notas))
+    return boletins
+
+
+def _linhas_de_texto(pdf):
+    """Textos desenhados (operador Tj) nos fluxos de conteúdo do PDF"""
+    textos = []
+    for fluxo in re.findall(rb'stream\n(.*?)\nendstream', pdf, re.S):
+        textos.extend(re.findall(r'\((.*?)\) Tj', zlib.decompress(fluxo).decode('latin-1')))
+    return textos
+
+
+def _por_segundo(renderizar, boletins, rodadas):
+    tempos = []
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        for aluno, notas in boletins:
+            renderizar(aluno, notas)
+        tempos.append(time.perf_counter() - inicio)
+    return len(boletins) / statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark da renderização de boletins')
+    parser.add_argument('--boletins', type=int, default=300)
+    parser.add_argument('--rodadas', type=int, default=3)
+    parser.add_argument('--meta', type=float, default=1000.0, help='boletins/s mínimos')
+    args = parser.parse_args()
+
+    from pdf_generator import gerar_boletim_bytes, modelo_boletim, LARGURA_UTIL, RECUO, ESCALA
+
+    boletins = _boletins(args.boletins)
+    emitido_em = datetime(2024, 12, 20, 10, 30)
+
+    def modelo(aluno, notas):
+        return gerar_boletim_bytes(aluno, notas, emitido_em)
+
+    # Aquecimento: monta o modelo antes de medir
+    modelo(*boletins[0])
+    por_segundo = _por_segundo(modelo, boletins, args.rodadas)
+
+    estavel = all(modelo(aluno, notas) == modelo(aluno, notas) for aluno, notas in boletins[:20])
+    tamanho = statistics.mean(len(modelo(aluno, notas)) for aluno, notas in boletins[:20])
+
+    # Nome de ~180 caracteres: precisa continuar na linha seguinte, sem passar da margem
+    aluno, notas = boletins[0]
+    aluno = aluno._replace(nome_completo=' '.join(['Beatriz Cavalcanti de Albuquerque'] * 5) + ' Sintética')
+    textos = _linhas_de_texto(modelo(aluno, notas))
+    inicio = next(indice for indice, texto in enumerate(textos) if texto.startswith('Nome:'))
+    fim = next(indice for indice, texto in enumerate(textos) if texto.startswith('Matr'))
+    linhas_nome = textos[inicio:fim]
+    largura_maxima = max(modelo_boletim()._largura(linha, 'normal', 10) for linha in linhas_nome)
+    quebrado = len(linhas_nome) > 1 and largura_maxima <= (LARGURA_UTIL - 2 * RECUO) * ESCALA
+
+    print(f"📊 {args.boletins} boletins, {len(DISCIPLINAS)} disciplinas cada (um processo)")
+    print(f"   ModeloBoletim  {por_segundo:10.1f} boletins/s  ({tamanho:.0f} bytes em média)")
+    print(f"   nome longo em {len(linhas_nome)} linhas")
+    if not estavel:
+        print("❌ A mesma entrada gerou PDFs diferentes")
+        raise SystemExit(1)
+    if not quebrado:
+        print("❌ O nome longo passou da largura da página")
+        raise SystemExit(1)
+    if por_segundo < args.meta:
+        print(f"❌ Vazão abaixo da meta de {args.meta:.0f} boletins/s")
+        raise SystemExit(1)
+    print(f"✅ Saída estável, texto dentro da página e vazão acima de {args.meta:.0f} boletins/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""Suíte de benchmarks reprodutível sobre uma escola sintética
+
+Cria (ou reaproveita) um banco SQLite com ``--alunos`` alunos gerados por
+init_data.popular_banco_dados com semente fixa e mede:
+
+- busca: Database.buscar_alunos (termos seletivos) e buscar_alunos_pagina;
+- buscar_aluno_por_matricula (ano corrente) e buscar_historico (todos os
+  anos letivos, com ``--anos`` > 1);
+- matrícula de alunos novos com notas (matricular_aluno);
+- PDF: um boletim renderizado no próprio processo e um lote em ZIP no pool;
+- rotas de ponta a ponta pelo test client do Flask (após o login).
+
+Os resultados (mediana, p95 e operações por segundo de cada medida) são
+gravados em JSON junto com os dados do ambiente. Com ``--comparar`` o
+resultado é confrontado com o de uma execução anterior e o programa falha
+(código 1) se alguma mediana piorar além da tolerância.
+
+Uso (da raiz do projeto):
+
+    python -m benchmarks.suite --alunos 10000 --saida base.json
+    python -m benchmarks.suite --alunos 10000 --comparar base.json
+    python -m benchmarks.suite --alunos 100000 --banco /tmp/escola_100k.db   # reaproveita o banco
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TERMOS_SELETIVOS = ['Ana Silva', 'Pedro Costa', 'Helena Rocha', 'Thiago Nunes']
+TERMOS_COMUNS = ['ma', 'silva', 'jo', 'fer']
+
+TAMANHO_LOTE_PDF = 50
+
+
+def _estatisticas(tempos, operacoes):
+    ordenados = sorted(tempos)
+    mediana = statistics.median(ordenados)
+    return {
+        'amostras': len(ordenados),
+        'operacoes': operacoes,
+        'mediana_ms': round(mediana * 1000, 4),
+        'p95_ms': round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))] * 1000, 4),
+        'minimo_ms': round(ordenados[0] * 1000, 4),
+        'por_segundo': round(operacoes / mediana, 2) if mediana else None,
+    }
+
+
+def _medir(funcao, repeticoes, operacoes=1, aquecimento=1):
+    """Chama ``funcao(rodada)`` ``repeticoes`` vezes; ``operacoes`` é o trabalho de cada chamada"""
+    for rodada in range(aquecimento):
+        funcao(-1 - rodada)
+    tempos = []
+    for rodada in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(rodada)
+        tempos.append(time.perf_counter() - inicio)
+    return _estatisticas(tempos, operacoes)
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _medir_banco(db, matriculas, repeticoes):
+    aleatorio = random.Random(0)
+    resultados = {}
+
+    resultados['buscar_alunos'] = _medir(
+        lambda rodada: db.buscar_alunos(TERMOS_SELETIVOS[rodada % len(TERMOS_SELETIVOS)]), repeticoes)
+    resultados['buscar_alunos_pagina'] = _medir(
+        lambda rodada: db.buscar_alunos_pagina(TERMOS_COMUNS[rodada % len(TERMOS_COMUNS)], 50), repeticoes)
+    resultados['buscar_aluno_por_matricula'] = _medir(
+        lambda rodada: db.buscar_aluno_por_matricula(aleatorio.choice(matriculas)), repeticoes * 5)
+    resultados['buscar_historico'] = _medir(
+        lambda rodada: db.buscar_historico(aleatorio.choice(matriculas)), repeticoes * 5)
+
+    # Matrículas únicas por execução: o banco pode ser reaproveitado
+    prefixo = f"BENCH{int(time.time())}-"
+    notas = [(disciplina, 7.0, 8.0, 90.0) for disciplina in db.get_disciplinas_padrao()]
+    novas = []
+
+    def matricular(rodada):
+        matricula = f"{prefixo}{len(novas)}"
+        db.matricular_aluno('Aluno Benchmark', '2010-01-01', '9º Ano - Fundamental II', 'Responsável',
+                            matricula, notas)
+        novas.append(matricula)
+
+    resultados['matricular_aluno'] = _medir(matricular, repeticoes)
+    for matricula in novas:
+        db.remover_aluno(matricula)
+    return resultados
+
+
+def _medir_pdf(db, matriculas, repeticoes):
+    from lote_boletins import gerar_lote
+    from pdf_generator import gerar_boletim_bytes
+
+    aluno, notas = db.buscar_aluno_por_matricula(matriculas[0])
+    resultados = {
+        'pdf_individual': _medir(lambda rodada: gerar_boletim_bytes(aluno, notas), repeticoes),
+    }
+    alunos_notas = db.buscar_alunos_com_notas(matriculas=matriculas[:TAMANHO_LOTE_PDF])
+
+    def lote(rodada):
+        for _ in gerar_lote(alunos_notas, 'zip'):
+            pass
+
+    # O aquecimento cria o pool de processos
+    resultados['pdf_lote_zip'] = _medir(lote, max(3, repeticoes // 10), operacoes=len(alunos_notas))
+    return resultados
+
+
+def _medir_rotas(matriculas, repeticoes):
+    import main
+    app = main.create_app(iniciar_workers=False)
+    cliente = app.test_client()
+    resposta = cliente.post('/api/auth/login', json={
+        'email': 'secretaria@escola.com', 'password': '123456', 'user_type': 'secretaria'
+    })
+    if resposta.status_code != 200:
+        raise SystemExit(f"❌ Login falhou: {resposta.status_code}")
+
+    aleatorio = random.Random(1)
+    rotas = {
+        'rota_dashboard': lambda rodada: '/sistema',
+        'rota_buscar_alunos': lambda rodada: f"/sistema/api/buscar_alunos?busca={TERMOS_COMUNS[rodada % len(TERMOS_COMUNS)]}",
+        'rota_detalhes_aluno': lambda rodada: f"/sistema/aluno/{aleatorio.choice(matriculas)}",
+        'rota_verificar_matricula': lambda rodada: f"/sistema/api/verificar_matricula/{aleatorio.choice(matriculas)}",
+        # Poucos alunos: depois da primeira rodada os PDFs vêm do cache
+        'rota_gerar_boletim': lambda rodada: f"/sistema/gerar_boletim/{matriculas[rodada % 5]}",
+    }
+    resultados = {}
+    for nome, caminho in rotas.items():
+        def requisitar(rodada, caminho=caminho):
+            resposta = cliente.get(caminho(rodada))
+            if resposta.status_code != 200:
+                raise RuntimeError(f"{nome}: status {resposta.status_code}")
+        resultados[nome] = _medir(requisitar, repeticoes, aquecimento=5)
+    main.encerrar()
+    return resultados
+
+
+def comparar(atual, anterior, tolerancia):
+    """Imprime a comparação das medianas; retorna os nomes das medidas que pioraram"""
+    if atual['ambiente']['alunos'] != anterior['ambiente']['alunos']:
+        print(f"⚠️  Tamanhos diferentes: {atual['ambiente']['alunos']} alunos agora, "
+              f"{anterior['ambiente']['alunos']} antes")
+    pioraram = []
+    print(f"\n📊 Comparação com {anterior['ambiente'].get('commit') or '?'} de {anterior['ambiente']['data']}")
+    for nome, resultado in atual['resultados'].items():
+        base = anterior['resultados'].get(nome)
+        if not base:
+            print(f"   {nome:28s} (sem medida anterior)")
+            continue
+        razao = resultado['mediana_ms'] / base['mediana_ms'] if base['mediana_ms'] else 1.0
+        marca = '✅'
+        if razao > 1 + tolerancia:
+            marca = '❌'
+            pioraram.append(nome)
+        elif razao < 1 - tolerancia:
+            marca = '🚀'
+        print(f"   {marca} {nome:28s} {base['mediana_ms']:10.3f} ms -> {resultado['mediana_ms']:10.3f} ms  ({razao:.2f}x)")
+    return pioraram
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suíte de benchmarks sobre uma escola sintética')
+    parser.add_argument('--alunos', type=int, default=10000, help='tamanho da escola sintética')
+    parser.add_argument('--semente', type=int, default=1)
+    parser.add_argument('--anos', type=int, default=1, help='anos letivos com notas (histórico)')
+    parser.add_argument('--repeticoes', type=int, default=50)
+    parser.add_argument('--banco', help='arquivo SQLite a reaproveitar (criado e populado se não existir)')
+    parser.add_argument('--saida', help='arquivo JSON dos resultados (padrão: benchmarks/resultados/)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='piora relativa aceita na mediana antes de falhar (0.25 = 25%%)')
+    parser.add_argument('--sem-rotas', action='store_true', help='pula as medidas pelo test client')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_banco = args.banco or os.path.join(diretorio, 'suite.db')
+        novo = not os.path.exists(caminho_banco)
+        os.environ['SQLITE_PATH'] = caminho_banco
+        os.environ['CACHE_PDF_DIR'] = os.path.join(diretorio, 'cache_pdf')
+        os.environ['FILA_DB'] = os.path.join(diretorio, 'fila.db')
+        os.environ['FILA_RESULTADOS_DIR'] = os.path.join(diretorio, 'resultados')
+        os.environ.setdefault('LOG_NIVEL', 'WARNING')
+        os.environ.pop('DATABASE_URL', None)
+
+        from database import Database
+        from init_data import popular_banco_dados
+        from lote_boletins import encerrar_executor_pdf
+
+        db = Database()
+        db.init_db()
+        segundos_carga = None
+        if novo:
+            inicio = time.perf_counter()
+            popular_banco_dados(db, args.alunos, args.semente, anos=args.anos)
+            segundos_carga = round(time.perf_counter() - inicio, 3)
+        total_alunos = db.contar_alunos()
+        matriculas = [f"S{numero:06d}" for numero in random.Random(args.semente).sample(
+            range(1, total_alunos + 1), min(1000, total_alunos))]
+
+        resultados = {}
+        resultados.update(_medir_banco(db, matriculas, args.repeticoes))
+        resultados.update(_medir_pdf(db, matriculas, args.repeticoes))
+        if not args.sem_rotas:
+            resultados.update(_medir_rotas(matriculas, args.repeticoes))
+        encerrar_executor_pdf()
+        db.fechar()
+
+    relatorio = {
+        'ambiente': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'alunos': total_alunos,
+            'semente': args.semente,
+            'anos': args.anos,
+            'repeticoes': args.repeticoes,
+            'segundos_carga': segundos_carga,
+        },
+        'resultados': resultados,
+    }
+
+    print(f"📊 Escola com {total_alunos} alunos" + (f" (populada em {segundos_carga}s)" if segundos_carga else ''))
+    for nome, resultado in resultados.items():
+        print(f"   {nome:28s} mediana {resultado['mediana_ms']:10.3f} ms  p95 {resultado['p95_ms']:10.3f} ms"
+              f"  {resultado['por_segundo']:12.1f}/s")
+
+    saida = args.saida or os.path.join(
+        RAIZ, 'benchmarks', 'resultados', f"suite-{total_alunos}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados gravados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        pioraram = comparar(relatorio, anterior, args.tolerancia)
+        if pioraram:
+            print(f"❌ Pioraram mais de {args.tolerancia:.0%}: {', '.join(pioraram)}")
+            sys.exit(1)
+        print("✅ Nenhuma piora além da tolerância")
+
+
+if __name__ == '__main__':
+    main()
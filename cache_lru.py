@@ -0,0 +1,59 @@
+"""Cache em memória com limite de itens e tempo de expiração"""
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """Dicionário LRU limitado a ``tamanho_maximo`` itens, cada um válido por ``ttl`` segundos"""
+
+    def __init__(self, tamanho_maximo=1024, ttl=60.0):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self.acertos = 0
+        self.faltas = 0
+        self._itens = OrderedDict()  # chave -> (valor, expira_em)
+        self._lock = threading.Lock()
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            item = self._itens.get(chave, _AUSENTE)
+            if item is not _AUSENTE:
+                valor, expira_em = item
+                if time.monotonic() < expira_em:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._itens[chave]
+            self.faltas += 1
+            return padrao
+
+    def guardar(self, chave, valor, ttl=None):
+        """Guarda o valor; ``ttl`` substitui o tempo padrão para este item"""
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                'itens': len(self._itens),
+                'tamanho_maximo': self.tamanho_maximo,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None,
+            }
@@ -0,0 +1,146 @@
+"""Cache em disco dos boletins em PDF, endereçado pelo conteúdo
+
+A chave de cada PDF é o hash dos dados do aluno, das suas notas, da data de
+emissão impressa (a da última alteração desses dados) e da versão do
+template, de modo que qualquer alteração gera uma chave nova. Os arquivos
+ficam em ``<diretorio>/<aluno_id>/<chave>.pdf``; os menos usados recentemente
+são removidos quando o tamanho total passa do limite.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+
+def chave_boletim(aluno, notas, emitido_em):
+    """Hash do conteúdo que determina o boletim (também usado como ETag)"""
+    from pdf_generator import VERSAO_TEMPLATE
+    # Uma nota por vez: não monta o texto de todas as notas de uma só vez
+    resumo = hashlib.sha256(json.dumps([VERSAO_TEMPLATE, list(aluno), emitido_em],
+                                       default=str, ensure_ascii=False).encode('utf-8'))
+    for nota in notas:
+        resumo.update(json.dumps(list(nota), default=str, ensure_ascii=False).encode('utf-8'))
+    return resumo.hexdigest()
+
+
+class CachePDF:
+    def __init__(self, diretorio, tamanho_maximo):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self.acertos = 0
+        self.faltas = 0
+        self.remocoes = 0
+        self._lock = threading.Lock()
+        self._arquivos = OrderedDict()  # caminho -> tamanho, do menos para o mais recente
+        self._tamanho_total = 0
+        self._indice_carregado = False
+
+    def _carregar_indice(self):
+        """Lê os arquivos já existentes no primeiro uso (chamado com o lock)"""
+        if self._indice_carregado:
+            return
+        self._indice_carregado = True
+        encontrados = []
+        if os.path.isdir(self.diretorio):
+            for raiz, _, nomes in os.walk(self.diretorio):
+                for nome in nomes:
+                    if nome.endswith('.pdf'):
+                        caminho = os.path.join(raiz, nome)
+                        info = os.stat(caminho)
+                        encontrados.append((info.st_mtime, caminho, info.st_size))
+        for _, caminho, tamanho in sorted(encontrados):
+            self._arquivos[caminho] = tamanho
+            self._tamanho_total += tamanho
+
+    def _caminho(self, aluno_id, chave):
+        return os.path.join(self.diretorio, str(aluno_id), f"{chave}.pdf")
+
+    def _esquecer(self, caminho):
+        tamanho = self._arquivos.pop(caminho, None)
+        if tamanho is not None:
+            self._tamanho_total -= tamanho
+
+    def abrir(self, aluno_id, chave):
+        """Abre o PDF em cache para leitura binária ou retorna None
+
+        O arquivo aberto continua legível mesmo que seja removido do cache
+        logo em seguida; quem chama deve fechá-lo.
+        """
+        caminho = self._caminho(aluno_id, chave)
+        try:
+            arquivo = open(caminho, 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self._carregar_indice()
+                self.faltas += 1
+                self._esquecer(caminho)
+            return None
+        tamanho = os.fstat(arquivo.fileno()).st_size
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._carregar_indice()
+            self.acertos += 1
+            if caminho in self._arquivos:
+                self._arquivos.move_to_end(caminho)
+            else:
+                self._arquivos[caminho] = tamanho
+                self._tamanho_total += tamanho
+        return arquivo
+
+    def obter(self, aluno_id, chave):
+        """Retorna o conteúdo do PDF em cache ou None"""
+        arquivo = self.abrir(aluno_id, chave)
+        if arquivo is None:
+            return None
+        with arquivo:
+            return arquivo.read()
+
+    def guardar(self, aluno_id, chave, dados):
+        caminho = self._caminho(aluno_id, chave)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(dados)
+        os.replace(temporario, caminho)
+        with self._lock:
+            self._carregar_indice()
+            self._esquecer(caminho)
+            self._arquivos[caminho] = len(dados)
+            self._tamanho_total += len(dados)
+            removidos = []
+            while self._tamanho_total > self.tamanho_maximo and len(self._arquivos) > 1:
+                antigo, tamanho = self._arquivos.popitem(last=False)
+                self._tamanho_total -= tamanho
+                removidos.append(antigo)
+            self.remocoes += len(removidos)
+        for antigo in removidos:
+            try:
+                os.remove(antigo)
+            except FileNotFoundError:
+                pass
+
+    def invalidar(self, aluno_id):
+        """Remove todos os PDFs em cache de um aluno"""
+        pasta = os.path.join(self.diretorio, str(aluno_id))
+        with self._lock:
+            self._carregar_indice()
+            for caminho in [c for c in self._arquivos if os.path.dirname(c) == pasta]:
+                self._esquecer(caminho)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    def estatisticas(self):
+        with self._lock:
+            self._carregar_indice()
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'remocoes': self.remocoes,
+                'arquivos': len(self._arquivos),
+                'bytes': self._tamanho_total,
+                'bytes_maximo': self.tamanho_maximo,
+            }
@@ -1,13 +1,22 @@
+import base64
+import csv
+import io
+import json
+import logging
 import os
+import re
 import sys
+from datetime import datetime
 
-try:
-    import psycopg2
-    import psycopg2.extras
-    POSTGRES_AVAILABLE = True
-except ImportError:
-    POSTGRES_AVAILABLE = False
-    print("⚠️  psycopg2 não disponível, usando SQLite")
+import metricas
+from cache_lru import CacheLRU
+from modelos import Aluno, AnoLetivo, Nota, ResumoAluno, Usuario, colunas
+from pool import PoolConexoes, PoolConexoesPorThread
+from regras_avaliacao import carregar_regras
+
+# psycopg2 só é importado quando DATABASE_URL está definida (ver _carregar_psycopg2)
+psycopg2 = None
+POSTGRES_AVAILABLE = False
 
 try:
     import sqlite3
@@ -15,222 +24,1127 @@ try:
 except ImportError:
     SQLITE_AVAILABLE = False
 
+COLUNAS_ALUNO = colunas(Aluno)
+COLUNAS_ALUNO_A = colunas(Aluno, 'a.')
+COLUNAS_NOTA_N = colunas(Nota, 'n.')
+COLUNAS_RESUMO = colunas(ResumoAluno)
+COLUNAS_USUARIO = colunas(Usuario)
+COLUNAS_ANO_LETIVO = colunas(AnoLetivo)
+
+# RETURNING (gravação de notas em lote) existe a partir da 3.35; UPDATE ... FROM
+# e UPSERT, antes disso
+SQLITE_VERSAO_MINIMA = (3, 35, 0)
+
+# Ano letivo corrente; subconsulta constante, avaliada uma vez por comando
+ANO_ATUAL = '(SELECT ano FROM AnosLetivos WHERE atual)'
+
+# Resumo de cada aluno calculado a partir das notas do ano letivo corrente
+# (mesmas colunas de ResumoAlunos); o aluno sem notas fica com status_final
+# 'Sem notas'
+SELECT_RESUMO = f'''
+    SELECT a.id AS aluno_id,
+           COUNT(n.id) AS total_disciplinas,
+           AVG(n.media_final) AS media_geral,
+           AVG(n.frequencia_percentual) AS frequencia_media,
+           SUM(CASE WHEN n.status = 'Reprovado' THEN 1 ELSE 0 END) AS disciplinas_reprovadas,
+           SUM(CASE WHEN n.status = 'Recuperação' THEN 1 ELSE 0 END) AS disciplinas_recuperacao,
+           CASE WHEN COUNT(n.id) = 0 THEN 'Sem notas'
+                WHEN SUM(CASE WHEN n.status = 'Reprovado' THEN 1 ELSE 0 END) > 0 THEN 'Reprovado'
+                WHEN SUM(CASE WHEN n.status = 'Recuperação' THEN 1 ELSE 0 END) > 0 THEN 'Recuperação'
+                ELSE 'Aprovado' END AS status_final
+    FROM Alunos a LEFT JOIN Notas n ON n.aluno_id = a.id AND n.ano_letivo = {ANO_ATUAL}
+'''
+
+log = logging.getLogger(__name__)
+
+DURACAO_CONSULTAS = metricas.histograma(
+    'boletim_db_segundos', 'Duração das chamadas aos métodos de Database', ('metodo',))
+ERROS_CONSULTAS = metricas.contador(
+    'boletim_db_erros_total', 'Chamadas aos métodos de Database que lançaram exceção', ('metodo',))
+
+# Métodos de Database que não consultam o banco (ficam fora das métricas)
+NAO_MEDIDOS = {'conexao', 'estatisticas_pool', 'estatisticas_cache_alunos', 'registrar_ao_alterar_aluno', 'fechar',
+               'get_disciplinas_padrao'}
+
+class MatriculaDuplicadaError(Exception):
+    """A matrícula informada já pertence a outro aluno"""
+
+def _erros_integridade():
+    erros = (sqlite3.IntegrityError,) if SQLITE_AVAILABLE else ()
+    if POSTGRES_AVAILABLE:
+        erros += (psycopg2.IntegrityError,)
+    return erros
+
+# Constraint UNIQUE (matricula) de alunos no PostgreSQL (nome gerado pelo CREATE TABLE)
+CONSTRAINT_MATRICULA = 'alunos_matricula_key'
+
+def _matricula_duplicada(erro):
+    """Diz se o erro de integridade é a violação do UNIQUE da matrícula (e não, por exemplo, um NOT NULL)"""
+    if POSTGRES_AVAILABLE and isinstance(erro, psycopg2.IntegrityError):
+        return erro.pgcode == '23505' and erro.diag.constraint_name == CONSTRAINT_MATRICULA
+    return 'UNIQUE constraint failed: Alunos.matricula' in str(erro)
+
+def _buffer_csv(linhas):
+    """Serializa linhas em CSV para o COPY do PostgreSQL"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(linhas)
+    buffer.seek(0)
+    return buffer
+
+def codificar_cursor(valores):
+    """Gera o token opaco de paginação a partir da chave da última linha"""
+    return base64.urlsafe_b64encode(json.dumps(valores, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(token):
+    """Lê o token de paginação; lança ValueError se ele for inválido"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError("Cursor de paginação inválido")
+    if not isinstance(valores, list) or len(valores) != 2:
+        raise ValueError("Cursor de paginação inválido")
+    return valores
+
+def expressao_fts(termo):
+    """Converte o termo digitado em uma consulta FTS5 de prefixos ("joa"* "sil"*)"""
+    palavras = re.findall(r'\w+', termo or '')
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+def _padrao_contem(termo):
+    """Padrão LIKE que encontra o termo em qualquer posição, com os curingas escapados"""
+    return '%' + termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def consulta_busca(termo, is_postgres):
+    """Monta a consulta indexada de busca por nome ou matrícula
+
+    Retorna (sql, parametros) selecionando as colunas de Alunos mais uma
+    coluna ``relevancia`` (menor é melhor). No PostgreSQL, os índices
+    trigram sobre o nome sem acentos encontram o termo em qualquer posição.
+    No SQLite a tabela FTS5 alunos_busca encontra palavras que começam com
+    cada palavra do termo, sem acentos; se ela não encontrar nada, a busca
+    cai para um LIKE em qualquer posição do nome ou da matrícula ("ilva"
+    acha "Silva"), que diferencia acentos.
+    """
+    padrao = _padrao_contem(termo)
+    if is_postgres:
+        return f'''
+            SELECT {COLUNAS_ALUNO_A}, -GREATEST(
+                word_similarity(f_unaccent(lower(%s)), f_unaccent(lower(a.nome_completo))),
+                similarity(%s, a.matricula)
+            ) AS relevancia
+            FROM alunos a
+            WHERE f_unaccent(lower(a.nome_completo)) LIKE f_unaccent(lower(%s))
+               OR a.matricula LIKE %s
+        ''', [termo, termo, padrao, padrao]
+
+    contem = "(a.nome_completo LIKE ? ESCAPE '\\' OR a.matricula LIKE ? ESCAPE '\\')"
+    expressao = expressao_fts(termo)
+    if not expressao:
+        return f'SELECT {COLUNAS_ALUNO_A}, 0.0 AS relevancia FROM Alunos a WHERE {contem}', [padrao, padrao]
+    # CROSS JOIN fixa a ordem: sem resultado no FTS a subconsulta ``vazio``
+    # tem uma linha e Alunos é percorrida; com resultado, não é lida
+    return f'''
+        SELECT {COLUNAS_ALUNO_A}, bm25(alunos_busca) AS relevancia
+        FROM alunos_busca JOIN Alunos a ON a.id = alunos_busca.rowid
+        WHERE alunos_busca MATCH ?
+        UNION ALL
+        SELECT {COLUNAS_ALUNO_A}, 0.0 AS relevancia
+        FROM (SELECT 1 WHERE NOT EXISTS (SELECT 1 FROM alunos_busca WHERE alunos_busca MATCH ?)) vazio
+        CROSS JOIN Alunos a
+        WHERE {contem}
+    ''', [expressao, expressao, padrao, padrao]
+
+
+def consulta_pagina_alunos(termo, limite, cursor, is_postgres):
+    """Monta a consulta de uma página de alunos (ver Database.buscar_alunos_pagina)
+
+    Retorna (sql, parametros). Lança ValueError se o cursor for inválido.
+    """
+    marcador = '%s' if is_postgres else '?'
+    if termo:
+        sql, parametros = consulta_busca(termo, is_postgres)
+        ordem = 'relevancia'
+    else:
+        sql, parametros = f'SELECT {COLUNAS_ALUNO} FROM Alunos', []
+        ordem = 'nome_completo'
+
+    where = ''
+    if cursor:
+        where = f'WHERE ({ordem}, id) > ({marcador}, {marcador})'
+        parametros = parametros + decodificar_cursor(cursor)
+
+    # Uma linha a mais indica se existe próxima página
+    return f'''
+        SELECT * FROM ({sql}) pagina {where}
+        ORDER BY {ordem}, id
+        LIMIT {marcador}
+    ''', parametros + [limite + 1]
+
+def pagina_alunos(linhas, termo, limite):
+    """Converte as linhas de consulta_pagina_alunos em (alunos, proximo_cursor)"""
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        ultima = linhas[-1]
+        chave = ultima[-1] if termo else ultima[1]
+        proximo_cursor = codificar_cursor([chave, ultima[0]])
+    if termo:
+        linhas = [linha[:-1] for linha in linhas]
+    return [Aluno._make(linha) for linha in linhas], proximo_cursor
+
+def _carregar_psycopg2():
+    global psycopg2, POSTGRES_AVAILABLE
+    if psycopg2 is not None:
+        return
+    try:
+        import psycopg2.extras  # também define o global psycopg2
+    except ImportError:
+        psycopg2 = None
+        log.warning("psycopg2 não disponível, usando SQLite")
+        return
+    POSTGRES_AVAILABLE = True
+
+def _agora_iso():
+    return datetime.now().isoformat(timespec='seconds')
+
+def _env_numero(nome, padrao):
+    valor = os.environ.get(nome)
+    return type(padrao)(valor) if valor else padrao
+
+def _conexao_saudavel(conn):
+    """Confere se a conexão ainda responde antes de reutilizá-la"""
+    try:
+        if getattr(conn, 'closed', 0):
+            return False
+        cursor = conn.cursor()
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
 class Database:
     def __init__(self):
         self.db_url = os.environ.get('DATABASE_URL')
+        if self.db_url:
+            _carregar_psycopg2()
+        self.sqlite_path = os.environ.get('SQLITE_PATH', 'escola.db')
+        tempo_ocioso = _env_numero('DB_POOL_TEMPO_OCIOSO', 300.0)
+        intervalo_verificacao = _env_numero('DB_POOL_INTERVALO_VERIFICACAO', 30.0)
         if self.db_url and POSTGRES_AVAILABLE:
-            print("🔗 Conectando ao PostgreSQL (Produção)")
+            log.info("Conectando ao PostgreSQL", extra={'banco': 'postgresql'})
+            self.pool = PoolConexoes(
+                self._nova_conexao, _conexao_saudavel,
+                tamanho_minimo=_env_numero('DB_POOL_MIN', 1),
+                tamanho_maximo=_env_numero('DB_POOL_MAX', 10),
+                tempo_espera=_env_numero('DB_POOL_TEMPO_ESPERA', 30.0),
+                tempo_ocioso_maximo=tempo_ocioso,
+                intervalo_verificacao=intervalo_verificacao,
+            )
         else:
-            print("🔗 Conectando ao SQLite (Desenvolvimento)")
+            log.info("Conectando ao SQLite", extra={'banco': 'sqlite', 'arquivo': self.sqlite_path})
+            self.pool = PoolConexoesPorThread(
+                self._nova_conexao, _conexao_saudavel,
+                tamanho_maximo=_env_numero('DB_POOL_MAX', 32),
+                tempo_ocioso_maximo=tempo_ocioso,
+                intervalo_verificacao=intervalo_verificacao,
+            )
+        self._ao_alterar_aluno = []
+        self.regras = carregar_regras()
+        # Totais da listagem; expiram sozinhos para refletir outros processos
+        self._cache_contagem = CacheLRU(tamanho_maximo=256, ttl=_env_numero('CACHE_CONTAGEM_TTL', 30.0))
+        # Aluno e notas por matrícula, validados pela versão do aluno no banco
+        # a cada leitura (CACHE_ALUNOS_MAX=0 desliga)
+        self._cache_alunos = CacheLRU(tamanho_maximo=_env_numero('CACHE_ALUNOS_MAX', 1024),
+                                      ttl=_env_numero('CACHE_ALUNOS_TTL', 300.0))
         
-    def get_connection(self):
+    def _nova_conexao(self):
         if self.db_url and POSTGRES_AVAILABLE:
             # PostgreSQL em produção
             conn = psycopg2.connect(self.db_url)
             return conn
         else:
-            # SQLite em desenvolvimento
+            # SQLite em desenvolvimento; a conexão fica presa a uma thread
+            # pelo pool, mas pode ser fechada por outra ao ser descartada
             import sqlite3
-            return sqlite3.connect('escola.db')
+            return sqlite3.connect(self.sqlite_path, check_same_thread=False)
+
+    @property
+    def is_postgres(self):
+        return bool(self.db_url and POSTGRES_AVAILABLE)
+
+    def conexao(self):
+        """Empresta uma conexão do pool (use com ``with``)"""
+        return self.pool.conexao()
+
+    def estatisticas_pool(self):
+        """Retorna os contadores de uso do pool de conexões"""
+        return self.pool.como_dict()
+
+    def estatisticas_cache_alunos(self):
+        return self._cache_alunos.estatisticas()
+
+    def _invalidar_cache_alunos(self, matriculas):
+        """Invalidação imediata neste processo; os demais percebem pela versão do aluno"""
+        for matricula in matriculas:
+            self._cache_alunos.remover(matricula)
+
+    def registrar_ao_alterar_aluno(self, callback):
+        """Registra uma função chamada com o aluno_id após gravar dados do aluno"""
+        self._ao_alterar_aluno.append(callback)
+
+    def _notificar_alteracao(self, aluno_id):
+        for callback in self._ao_alterar_aluno:
+            callback(aluno_id)
+
+    def _ano_letivo(self, cursor, ano_letivo=None):
+        """Lê o ano letivo dado (ou o corrente) na transação do ``cursor``; retorna AnoLetivo
+
+        Lança ValueError se o ano não estiver cadastrado em AnosLetivos.
+        """
+        is_postgres = self.db_url and POSTGRES_AVAILABLE
+        if ano_letivo is None:
+            cursor.execute(f'SELECT {COLUNAS_ANO_LETIVO} FROM AnosLetivos WHERE atual')
+        else:
+            marcador = '%s' if is_postgres else '?'
+            cursor.execute(f'SELECT {COLUNAS_ANO_LETIVO} FROM AnosLetivos WHERE ano = {marcador}', (ano_letivo,))
+        linha = cursor.fetchone()
+        if not linha:
+            raise ValueError(f"Ano letivo {ano_letivo} não cadastrado" if ano_letivo is not None
+                             else "Nenhum ano letivo corrente definido")
+        return AnoLetivo(linha[0], linha[1], bool(linha[2]))
+
+    def _atualizar_resumo(self, cursor, coluna, valores):
+        """Recalcula o ResumoAlunos dos alunos dados, na transação do ``cursor``
+
+        ``coluna`` é 'id' ou 'matricula' e ``valores`` a lista correspondente.
+        Só as notas do ano corrente desses alunos são lidas (índice
+        uq_notas_aluno_ano_disciplina). Toda gravação dos dados de um aluno
+        passa por aqui, que também incrementa a versão dele (Alunos.versao)
+        usada pelo cache de alunos e grava a data da alteração
+        (Alunos.alterado_em, a data de emissão do boletim).
+        """
+        if not valores:
+            return
+        is_postgres = self.db_url and POSTGRES_AVAILABLE
+        if is_postgres:
+            filtro, parametro = f'{coluna} = ANY(%s)', list(valores)
+        else:
+            filtro, parametro = f'{coluna} IN (SELECT value FROM json_each(?))', json.dumps(list(valores))
+        marcador = '%s' if is_postgres else '?'
+        cursor.execute(f'UPDATE Alunos SET versao = versao + 1, alterado_em = {marcador} WHERE {filtro}',
+                       (_agora_iso(), parametro))
+        cursor.execute(f'''
+            INSERT INTO ResumoAlunos ({COLUNAS_RESUMO})
+            {SELECT_RESUMO}
+            WHERE a.{filtro}
+            GROUP BY a.id
+            ON CONFLICT (aluno_id) DO UPDATE SET
+                total_disciplinas = excluded.total_disciplinas,
+                media_geral = excluded.media_geral,
+                frequencia_media = excluded.frequencia_media,
+                disciplinas_reprovadas = excluded.disciplinas_reprovadas,
+                disciplinas_recuperacao = excluded.disciplinas_recuperacao,
+                status_final = excluded.status_final
+        ''', (parametro,))
+
+    def fechar(self):
+        """Fecha as conexões ociosas do pool"""
+        self.pool.fechar()
     
     def init_db(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Cria ou atualiza o esquema aplicando as migrações pendentes"""
+        from migracoes import aplicar_migracoes
         
-        # Detecta se é PostgreSQL
         is_postgres = self.db_url and POSTGRES_AVAILABLE
+        if not is_postgres and SQLITE_AVAILABLE and sqlite3.sqlite_version_info < SQLITE_VERSAO_MINIMA:
+            raise RuntimeError(
+                f"SQLite {sqlite3.sqlite_version} não é suportado: o sistema precisa do SQLite "
+                f"{'.'.join(map(str, SQLITE_VERSAO_MINIMA))} ou mais novo (RETURNING, UPDATE ... FROM). "
+                "Atualize a libsqlite3 do sistema ou use o PostgreSQL (DATABASE_URL)."
+            )
+        aplicar_migracoes(self.conexao, is_postgres)
+        log.info("Banco de dados inicializado")
+    
+    def inserir_aluno(self, nome_completo, data_nascimento, serie, nome_responsavel, matricula):
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        # Tabela Alunos
-        if is_postgres:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS alunos (
-                    id SERIAL PRIMARY KEY,
-                    nome_completo TEXT NOT NULL,
-                    data_nascimento TEXT NOT NULL,
-                    serie TEXT NOT NULL,
-                    nome_do_responsavel TEXT NOT NULL,
-                    matricula TEXT UNIQUE NOT NULL
-                )
-            ''')
-        else:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS Alunos (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nome_completo TEXT NOT NULL,
-                    data_nascimento TEXT NOT NULL,
-                    serie TEXT NOT NULL,
-                    nome_do_responsavel TEXT NOT NULL,
-                    matricula TEXT UNIQUE NOT NULL
-                )
-            ''')
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        # Tabela Notas
-        if is_postgres:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS notas (
-                    id SERIAL PRIMARY KEY,
-                    aluno_id INTEGER NOT NULL,
-                    disciplina TEXT NOT NULL,
-                    nota_1_bimestre REAL NOT NULL,
-                    nota_2_bimestre REAL NOT NULL,
-                    media_final REAL NOT NULL,
-                    frequencia_percentual REAL NOT NULL,
-                    status TEXT NOT NULL,
-                    FOREIGN KEY (aluno_id) REFERENCES alunos (id) ON DELETE CASCADE
-                )
-            ''')
-        else:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS Notas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    aluno_id INTEGER NOT NULL,
-                    disciplina TEXT NOT NULL,
-                    nota_1_bimestre REAL NOT NULL,
-                    nota_2_bimestre REAL NOT NULL,
-                    media_final REAL NOT NULL,
-                    frequencia_percentual REAL NOT NULL,
-                    status TEXT NOT NULL,
-                    FOREIGN KEY (aluno_id) REFERENCES Alunos (id)
-                )
-            ''')
+            if is_postgres:
+                cursor.execute('''
+                    INSERT INTO alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula)
+                    VALUES (%s, %s, %s, %s, %s) RETURNING id
+                ''', (nome_completo, data_nascimento, serie, nome_responsavel, matricula))
+                aluno_id = cursor.fetchone()[0]
+            else:
+                cursor.execute('''
+                    INSERT INTO Alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (nome_completo, data_nascimento, serie, nome_responsavel, matricula))
+                aluno_id = cursor.lastrowid
         
-        conn.commit()
-        conn.close()
-        print("✅ Banco de dados inicializado com sucesso!")
+            self._atualizar_resumo(cursor, 'id', [aluno_id])
+            conn.commit()
+            self._cache_contagem.limpar()
+            self._invalidar_cache_alunos([matricula])
+            return aluno_id
     
-    def inserir_aluno(self, nome_completo, data_nascimento, serie, nome_responsavel, matricula):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def matricular_aluno(self, nome_completo, data_nascimento, serie, nome_responsavel, matricula, notas):
+        """Insere o aluno e todas as suas notas em uma única transação
+
+        ``notas`` é uma lista de tuplas (disciplina, nota_1, nota_2, frequencia).
+        A unicidade da matrícula fica a cargo da constraint UNIQUE da tabela;
+        se ela for violada, nada é gravado e MatriculaDuplicadaError é lançada.
+        """
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        is_postgres = self.db_url and POSTGRES_AVAILABLE
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        if is_postgres:
-            cursor.execute('''
-                INSERT INTO alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula)
-                VALUES (%s, %s, %s, %s, %s) RETURNING id
-            ''', (nome_completo, data_nascimento, serie, nome_responsavel, matricula))
-            aluno_id = cursor.fetchone()[0]
-        else:
-            cursor.execute('''
-                INSERT INTO Alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (nome_completo, data_nascimento, serie, nome_responsavel, matricula))
-            aluno_id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
-        return aluno_id
+            try:
+                if is_postgres:
+                    cursor.execute('''
+                        INSERT INTO alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula)
+                        VALUES (%s, %s, %s, %s, %s) RETURNING id
+                    ''', (nome_completo, data_nascimento, serie, nome_responsavel, matricula))
+                    aluno_id = cursor.fetchone()[0]
+                else:
+                    cursor.execute('''
+                        INSERT INTO Alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (nome_completo, data_nascimento, serie, nome_responsavel, matricula))
+                    aluno_id = cursor.lastrowid
+            except _erros_integridade() as e:
+                conn.rollback()
+                if _matricula_duplicada(e):
+                    raise MatriculaDuplicadaError(matricula) from e
+                raise
+        
+            ano = self._ano_letivo(cursor).ano
+            regra = self.regras.para_serie(serie)
+            avaliacoes = regra.avaliar_lote([(nota_1, nota_2, frequencia) for _, nota_1, nota_2, frequencia in notas])
+            linhas = [
+                (aluno_id, disciplina, nota_1, nota_2, media_final, frequencia, status, ano)
+                for (disciplina, nota_1, nota_2, frequencia), (media_final, status) in zip(notas, avaliacoes)
+            ]
+        
+            if is_postgres:
+                psycopg2.extras.execute_values(cursor, '''
+                    INSERT INTO notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre, 
+                                     media_final, frequencia_percentual, status, ano_letivo)
+                    VALUES %s
+                ''', linhas)
+            else:
+                cursor.executemany('''
+                    INSERT INTO Notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre, 
+                                     media_final, frequencia_percentual, status, ano_letivo)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', linhas)
+        
+            self._atualizar_resumo(cursor, 'id', [aluno_id])
+            conn.commit()
+            self._cache_contagem.limpar()
+            return aluno_id
+    
+    def importar_lotes(self, lotes, ano_letivo=None):
+        """Grava lotes de importação em massa em uma única transação
+
+        ``lotes`` é um iterável de pares (alunos, notas): alunos são tuplas
+        (nome_completo, data_nascimento, serie, nome_responsavel, matricula) e
+        notas são tuplas (matricula, disciplina, nota_1, nota_2, frequencia),
+        gravadas no ``ano_letivo`` (padrão: o corrente). Alunos cuja matrícula
+        já existe no banco são ignorados junto com suas notas. Retorna
+        (alunos_inseridos, notas_inseridas, matriculas_existentes).
+        """
+        alunos_inseridos = 0
+        notas_inseridas = 0
+        existentes = set()
+        series = {}
+        
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            ano = self._ano_letivo(cursor, ano_letivo).ano
+        
+            if is_postgres:
+                cursor.execute('''
+                    CREATE TEMP TABLE importacao_notas (
+                        matricula TEXT, disciplina TEXT, nota_1_bimestre REAL, nota_2_bimestre REAL,
+                        media_final REAL, frequencia_percentual REAL, status TEXT
+                    ) ON COMMIT DROP
+                ''')
+        
+            for alunos, notas in lotes:
+                matriculas = [aluno[4] for aluno in alunos]
+                for inicio in range(0, len(matriculas), 500):
+                    parte = matriculas[inicio:inicio + 500]
+                    if is_postgres:
+                        cursor.execute('SELECT matricula FROM alunos WHERE matricula = ANY(%s)', (parte,))
+                    else:
+                        marcadores = ', '.join('?' * len(parte))
+                        cursor.execute(f'SELECT matricula FROM Alunos WHERE matricula IN ({marcadores})', parte)
+                    existentes.update(linha[0] for linha in cursor.fetchall())
+        
+                alunos = [aluno for aluno in alunos if aluno[4] not in existentes]
+                series.update((aluno[4], aluno[2]) for aluno in alunos)
+        
+                # Avalia as notas de cada série de uma vez, com a regra compilada dela
+                notas_por_serie = {}
+                for nota in notas:
+                    if nota[0] not in existentes:
+                        notas_por_serie.setdefault(series.get(nota[0]), []).append(nota)
+                linhas_notas = []
+                for serie, notas_serie in notas_por_serie.items():
+                    avaliacoes = self.regras.para_serie(serie).avaliar_lote([nota[2:] for nota in notas_serie])
+                    linhas_notas.extend(
+                        (matricula, disciplina, nota_1, nota_2, media_final, frequencia, status)
+                        for (matricula, disciplina, nota_1, nota_2, frequencia), (media_final, status)
+                        in zip(notas_serie, avaliacoes)
+                    )
+        
+                if is_postgres:
+                    cursor.copy_expert(
+                        'COPY alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula) '
+                        'FROM STDIN WITH (FORMAT csv)', _buffer_csv(alunos)
+                    )
+                    cursor.copy_expert(
+                        'COPY importacao_notas FROM STDIN WITH (FORMAT csv)', _buffer_csv(linhas_notas)
+                    )
+                    cursor.execute('''
+                        INSERT INTO notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre,
+                                           media_final, frequencia_percentual, status, ano_letivo)
+                        SELECT a.id, t.disciplina, t.nota_1_bimestre, t.nota_2_bimestre,
+                               t.media_final, t.frequencia_percentual, t.status, %s
+                        FROM importacao_notas t JOIN alunos a ON a.matricula = t.matricula
+                    ''', (ano,))
+                    cursor.execute('TRUNCATE importacao_notas')
+                else:
+                    cursor.executemany('''
+                        INSERT INTO Alunos (nome_completo, data_nascimento, serie, nome_do_responsavel, matricula)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', alunos)
+                    cursor.executemany('''
+                        INSERT INTO Notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre,
+                                           media_final, frequencia_percentual, status, ano_letivo)
+                        SELECT id, ?, ?, ?, ?, ?, ?, ? FROM Alunos WHERE matricula = ?
+                    ''', [linha[1:] + (ano,) + linha[:1] for linha in linhas_notas])
+        
+                # Inclui alunos de lotes anteriores que receberam notas neste
+                self._atualizar_resumo(cursor, 'matricula',
+                                       sorted({aluno[4] for aluno in alunos} | {linha[0] for linha in linhas_notas}))
+                alunos_inseridos += len(alunos)
+                notas_inseridas += len(linhas_notas)
+        
+            conn.commit()
+            self._cache_contagem.limpar()
+        
+        return alunos_inseridos, notas_inseridas, existentes
     
     def inserir_nota(self, aluno_id, disciplina, nota_1, nota_2, frequencia):
-        # Calcular média final
-        media_final = (nota_1 + nota_2) / 2
-        
-        # Determinar status
-        if media_final >= 7.0 and frequencia >= 75:
-            status = "Aprovado"
-        elif media_final >= 5.0 and frequencia >= 75:
-            status = "Recuperação"
-        else:
-            status = "Reprovado"
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        is_postgres = self.db_url and POSTGRES_AVAILABLE
+            if is_postgres:
+                cursor.execute('SELECT serie, matricula FROM alunos WHERE id = %s', (aluno_id,))
+            else:
+                cursor.execute('SELECT serie, matricula FROM Alunos WHERE id = ?', (aluno_id,))
+            aluno = cursor.fetchone()
+            regra = self.regras.para_serie(aluno[0] if aluno else None)
+            media_final, status = regra.avaliar(nota_1, nota_2, frequencia)
+            ano = self._ano_letivo(cursor).ano
         
-        if is_postgres:
-            cursor.execute('''
-                INSERT INTO notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre, 
-                                 media_final, frequencia_percentual, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ''', (aluno_id, disciplina, nota_1, nota_2, media_final, frequencia, status))
-        else:
-            cursor.execute('''
-                INSERT INTO Notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre, 
-                                 media_final, frequencia_percentual, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (aluno_id, disciplina, nota_1, nota_2, media_final, frequencia, status))
-        
-        conn.commit()
-        conn.close()
+            if is_postgres:
+                cursor.execute('''
+                    INSERT INTO notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre, 
+                                     media_final, frequencia_percentual, status, ano_letivo)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ''', (aluno_id, disciplina, nota_1, nota_2, media_final, frequencia, status, ano))
+            else:
+                cursor.execute('''
+                    INSERT INTO Notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre, 
+                                     media_final, frequencia_percentual, status, ano_letivo)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (aluno_id, disciplina, nota_1, nota_2, media_final, frequencia, status, ano))
+        
+            self._atualizar_resumo(cursor, 'id', [aluno_id])
+            conn.commit()
+        
+        if aluno:
+            self._invalidar_cache_alunos([aluno[1]])
+        self._notificar_alteracao(aluno_id)
     
     def buscar_alunos(self, termo=None):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Busca alunos por nome ou matrícula, ordenados por relevância (ou nome, sem termo)"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        is_postgres = self.db_url and POSTGRES_AVAILABLE
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        if is_postgres:
             if termo:
-                cursor.execute('''
-                    SELECT * FROM alunos 
-                    WHERE nome_completo ILIKE %s OR matricula ILIKE %s
-                    ORDER BY nome_completo
-                ''', (f'%{termo}%', f'%{termo}%'))
-            else:
-                cursor.execute('SELECT * FROM alunos ORDER BY nome_completo')
-        else:
+                sql, parametros = consulta_busca(termo, is_postgres)
+                cursor.execute(f'SELECT * FROM ({sql}) busca ORDER BY relevancia, id', parametros)
+                return [Aluno._make(linha[:-1]) for linha in cursor.fetchall()]
+        
+            cursor.execute(f'SELECT {COLUNAS_ALUNO} FROM Alunos ORDER BY nome_completo, id')
+            alunos = [Aluno._make(linha) for linha in cursor.fetchall()]
+            return alunos
+    
+    def buscar_alunos_pagina(self, termo=None, limite=50, cursor=None):
+        """Busca uma página de alunos
+
+        Sem termo, a ordem é (nome_completo, id); com termo, (relevancia, id).
+        Usa paginação por chave: ``cursor`` é o token devolvido pela página
+        anterior. Retorna (alunos, proximo_cursor); proximo_cursor é None na
+        última página.
+        """
+        is_postgres = self.db_url and POSTGRES_AVAILABLE
+        consulta = consulta_pagina_alunos(termo, limite, cursor, is_postgres)
+        
+        with self.conexao() as conn:
+            cur = conn.cursor()
+            cur.execute(*consulta)
+            linhas = cur.fetchall()
+        return pagina_alunos(linhas, termo, limite)
+    
+    def contar_alunos(self, termo=None):
+        """Conta os alunos (filtrados por termo), com o resultado guardado em cache"""
+        total = self._cache_contagem.obter(termo or '')
+        if total is not None:
+            return total
+        
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+        
             if termo:
-                cursor.execute('''
-                    SELECT * FROM Alunos 
-                    WHERE nome_completo LIKE ? OR matricula LIKE ?
-                    ORDER BY nome_completo
-                ''', (f'%{termo}%', f'%{termo}%'))
+                sql, parametros = consulta_busca(termo, is_postgres)
+                cursor.execute(f'SELECT COUNT(*) FROM ({sql}) busca', parametros)
+                total = cursor.fetchone()[0]
             else:
-                cursor.execute('SELECT * FROM Alunos ORDER BY nome_completo')
+                cursor.execute('SELECT COUNT(*) FROM Alunos')
+                total = cursor.fetchone()[0]
+        
+        self._cache_contagem.guardar(termo or '', total)
+        return total
+    
+    def _buscar_com_notas(self, cursor, where, parametros):
+        """Executa o JOIN Alunos/Notas do ano corrente e agrupa as linhas em [(Aluno, [Nota])]"""
+        cursor.execute(f'''
+            SELECT {COLUNAS_ALUNO_A}, {COLUNAS_NOTA_N}
+            FROM Alunos a
+            LEFT JOIN Notas n ON n.aluno_id = a.id AND n.ano_letivo = {ANO_ATUAL}
+            {where}
+            ORDER BY a.nome_completo, a.id, n.id
+        ''', parametros)
         
-        alunos = cursor.fetchall()
-        conn.close()
-        return alunos
+        campos_aluno = len(Aluno._fields)
+        resultado = []
+        # Linha a linha: sem a lista de todas as linhas (com os dados do aluno repetidos)
+        for linha in cursor:
+            if not resultado or resultado[-1][0].id != linha[0]:
+                resultado.append((Aluno._make(linha[:campos_aluno]), []))
+            if linha[campos_aluno] is not None:
+                resultado[-1][1].append(Nota._make(linha[campos_aluno:]))
+        return resultado
     
     def buscar_aluno_por_matricula(self, matricula):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Busca o aluno e suas notas do ano corrente; retorna (Aluno, [Nota])
+
+        Leitura pelo cache de alunos: a cada chamada só (id, versao) do aluno
+        é lido do banco, e o JOIN com as notas roda apenas se o aluno não está
+        no cache ou se a versão mudou (gravada por este ou outro processo).
+        """
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+        
+            versao = None
+            if self._cache_alunos.tamanho_maximo:
+                # A versão é lida antes das notas: se uma gravação acontecer no
+                # meio, o item fica com versão antiga e é relido na próxima vez
+                cursor.execute(f'SELECT id, versao FROM Alunos WHERE matricula = {marcador}', (matricula,))
+                versao = cursor.fetchone()
+                if not versao:
+                    self._cache_alunos.remover(matricula)
+                    return None, []
+                em_cache = self._cache_alunos.obter(matricula)
+                if em_cache and em_cache[0] == versao:
+                    aluno, notas = em_cache[1]
+                    return aluno, list(notas)
         
+            resultado = self._buscar_com_notas(cursor, f'WHERE a.matricula = {marcador}', (matricula,))
+        
+        if not resultado:
+            return None, []
+        aluno, notas = resultado[0]
+        if versao:
+            self._cache_alunos.guardar(matricula, (tuple(versao), (aluno, tuple(notas))))
+        return aluno, notas
+    
+    def buscar_alunos_com_notas(self, serie=None, matriculas=None):
+        """Busca alunos (de uma série ou lista de matrículas) com suas notas em uma só consulta
+
+        Retorna uma lista de pares (Aluno, [Nota]) ordenada pelo nome do
+        aluno, com as notas do ano letivo corrente.
+        """
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+        
+            filtros = []
+            parametros = []
+            if serie:
+                filtros.append(f'a.serie = {marcador}')
+                parametros.append(serie)
+            if matriculas:
+                if is_postgres:
+                    filtros.append('a.matricula = ANY(%s)')
+                    parametros.append(list(matriculas))
+                else:
+                    # Evita o limite de parâmetros do SQLite em listas grandes
+                    filtros.append('a.matricula IN (SELECT value FROM json_each(?))')
+                    parametros.append(json.dumps(list(matriculas)))
+            where = f"WHERE {' AND '.join(filtros)}" if filtros else ''
+        
+            return self._buscar_com_notas(cursor, where, parametros)
+    
+    def buscar_alunos_por_matriculas(self, matriculas):
+        """Busca N alunos e todas as suas notas em uma só ida ao banco
+
+        Retorna um dicionário matrícula -> (Aluno, [Nota]); matrículas
+        inexistentes ficam de fora.
+        """
+        if not matriculas:
+            return {}
+        return {aluno.matricula: (aluno, notas)
+                for aluno, notas in self.buscar_alunos_com_notas(matriculas=matriculas)}
+    
+    def buscar_historico(self, matricula, ano_inicial=None, ano_final=None):
+        """Busca o histórico do aluno, com a nota de cada período, em um intervalo de anos letivos
+
+        É uma única consulta por faixa de ano_letivo: no SQLite ela percorre o
+        trecho do aluno no índice (aluno_id, ano_letivo, disciplina); no
+        PostgreSQL só as partições dos anos pedidos são lidas. Retorna
+        (Aluno, {ano: [(Nota, avaliacoes)]}), em ordem de ano e disciplina,
+        com ``avaliacoes`` a tupla das notas do 1º, 2º, ... períodos; ou
+        (None, {}) se a matrícula não existir.
+        """
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+        
+            faixa, parametros = '', []
+            if ano_inicial is not None:
+                faixa += f' AND n.ano_letivo >= {marcador}'
+                parametros.append(ano_inicial)
+            if ano_final is not None:
+                faixa += f' AND n.ano_letivo <= {marcador}'
+                parametros.append(ano_final)
+            # No PostgreSQL o ano_letivo na junção limita avaliacoes às mesmas partições
+            mesma_particao = 'AND av.ano_letivo = n.ano_letivo' if is_postgres else ''
+            cursor.execute(f'''
+                SELECT {COLUNAS_ALUNO_A}, {COLUNAS_NOTA_N}, av.valor
+                FROM Alunos a
+                LEFT JOIN Notas n ON n.aluno_id = a.id {faixa}
+                LEFT JOIN Avaliacoes av ON av.nota_id = n.id {mesma_particao}
+                WHERE a.matricula = {marcador}
+                ORDER BY n.ano_letivo, n.disciplina, av.periodo
+            ''', parametros + [matricula])
+        
+            campos_aluno = len(Aluno._fields)
+            fim_nota = campos_aluno + len(Nota._fields)
+            aluno, historico, ultima = None, {}, None
+            for linha in cursor:
+                if aluno is None:
+                    aluno = Aluno._make(linha[:campos_aluno])
+                if linha[campos_aluno] is None:
+                    continue
+                if ultima is None or ultima[0].id != linha[campos_aluno]:
+                    ultima = (Nota._make(linha[campos_aluno:fim_nota]), [])
+                    historico.setdefault(ultima[0].ano_letivo, []).append(ultima)
+                if linha[fim_nota] is not None:
+                    ultima[1].append(linha[fim_nota])
+        
+        return aluno, {ano: [(nota, tuple(valores)) for nota, valores in notas]
+                       for ano, notas in historico.items()}
+    
+    def atualizar_notas(self, correcoes, ano_letivo=None):
+        """Grava correções de notas em massa (insere ou atualiza) em uma única transação
+
+        ``correcoes`` é uma lista de tuplas (matricula, disciplina, nota_1,
+        nota_2, frequencia) do ``ano_letivo`` (padrão: o corrente); para o
+        mesmo par (matricula, disciplina) vale a última. A média e o status
+        são recalculados no próprio banco, com a regra da série de cada aluno,
+        e só nas linhas cujos valores mudaram. Retorna (alunos_alterados,
+        notas_alteradas, matriculas_nao_encontradas).
+        """
+        ultimas = {}
+        for matricula, disciplina, nota_1, nota_2, frequencia in correcoes:
+            ultimas[(matricula, disciplina)] = (matricula, disciplina, nota_1, nota_2, frequencia)
+        linhas = list(ultimas.values())
+        if not linhas:
+            return set(), 0, set()
+        matriculas = {linha[0] for linha in linhas}
+        
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+            ano = self._ano_letivo(cursor, ano_letivo)
+            media, status = self.regras.expressoes_sql('c.nota_1', 'c.nota_2', 'c.frequencia', 'a.serie')
+        
+            if is_postgres:
+                origem = '''
+                    unnest(%s::text[], %s::text[], %s::real[], %s::real[], %s::real[])
+                        AS c (matricula, disciplina, nota_1, nota_2, frequencia)
+                '''
+                parametros = [list(coluna) for coluna in zip(*linhas)]
+                cursor.execute('SELECT matricula FROM alunos WHERE matricula = ANY(%s)', (list(matriculas),))
+            else:
+                origem = '''
+                    (SELECT json_extract(value, '$[0]') AS matricula, json_extract(value, '$[1]') AS disciplina,
+                            json_extract(value, '$[2]') AS nota_1, json_extract(value, '$[3]') AS nota_2,
+                            json_extract(value, '$[4]') AS frequencia
+                     FROM json_each(?)) c
+                '''
+                parametros = [json.dumps(linhas)]
+                cursor.execute('SELECT matricula FROM Alunos WHERE matricula IN (SELECT value FROM json_each(?))',
+                               (json.dumps(list(matriculas)),))
+            nao_encontradas = matriculas - {linha[0] for linha in cursor.fetchall()}
+        
+            # O WHERE do DO UPDATE pula as linhas sem mudança; RETURNING traz
+            # só as que foram de fato inseridas ou alteradas
+            cursor.execute(f'''
+                INSERT INTO Notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre,
+                                   media_final, frequencia_percentual, status, ano_letivo)
+                SELECT a.id, c.disciplina, c.nota_1, c.nota_2, {media}, c.frequencia, {status}, {marcador}
+                FROM {origem}
+                JOIN Alunos a ON a.matricula = c.matricula
+                WHERE true
+                ON CONFLICT (aluno_id, ano_letivo, disciplina) DO UPDATE SET
+                    nota_1_bimestre = excluded.nota_1_bimestre,
+                    nota_2_bimestre = excluded.nota_2_bimestre,
+                    media_final = excluded.media_final,
+                    frequencia_percentual = excluded.frequencia_percentual,
+                    status = excluded.status
+                WHERE Notas.nota_1_bimestre <> excluded.nota_1_bimestre
+                   OR Notas.nota_2_bimestre <> excluded.nota_2_bimestre
+                   OR Notas.frequencia_percentual <> excluded.frequencia_percentual
+                RETURNING id, aluno_id
+            ''', [ano.ano] + parametros)
+            alterados = cursor.fetchall()
+            alunos_alterados = {aluno_id for _, aluno_id in alterados}
+            if ano.periodos > 2:
+                # A média também depende dos períodos seguintes, já lançados em Avaliacoes
+                self._reavaliar_por_periodos(cursor, ano, notas=[nota_id for nota_id, _ in alterados])
+        
+            self._atualizar_resumo(cursor, 'id', list(alunos_alterados))
+            conn.commit()
+        
+        self._invalidar_cache_alunos(matriculas)
+        for aluno_id in alunos_alterados:
+            self._notificar_alteracao(aluno_id)
+        return alunos_alterados, len(alterados), nao_encontradas
+    
+    def reavaliar_notas(self, serie=None, ano_letivo=None):
+        """Recalcula média e status das notas de um ano letivo (ou de uma série) com as regras atuais
+
+        Usado depois de mudar uma regra de avaliação; sem ``ano_letivo``,
+        reavalia o ano corrente (os anteriores já estão fechados). É um único
+        UPDATE no banco, que só reescreve as notas cujo resultado mudou.
+        Retorna (alunos_alterados, notas_alteradas).
+        """
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+            ano = self._ano_letivo(cursor, ano_letivo)
+        
+            if ano.periodos > 2:
+                alterados = self._reavaliar_por_periodos(cursor, ano, serie=serie)
+            else:
+                # Com dois períodos, nota_1_bimestre e nota_2_bimestre são todas as avaliações
+                media, status = self.regras.expressoes_sql(
+                    'Notas.nota_1_bimestre', 'Notas.nota_2_bimestre', 'Notas.frequencia_percentual', 'a.serie'
+                )
+                filtro, parametros = (f'AND a.serie = {marcador}', [serie]) if serie else ('', [])
+                cursor.execute(f'''
+                    UPDATE Notas SET media_final = {media}, status = {status}
+                    FROM Alunos a
+                    WHERE a.id = Notas.aluno_id AND Notas.ano_letivo = {marcador} {filtro}
+                      AND (Notas.media_final <> {media} OR Notas.status <> {status})
+                    RETURNING Notas.aluno_id
+                ''', [ano.ano] + parametros)
+                alterados = [linha[0] for linha in cursor.fetchall()]
+            alunos_alterados = set(alterados)
+        
+            self._atualizar_resumo(cursor, 'id', list(alunos_alterados))
+            conn.commit()
+        
+        for aluno_id in alunos_alterados:
+            self._notificar_alteracao(aluno_id)
+        return alunos_alterados, len(alterados)
+    
+    def _reavaliar_por_periodos(self, cursor, ano, serie=None, notas=None):
+        """Recalcula média e status a partir de todos os períodos em Avaliacoes
+
+        Restrito ao ``ano`` (AnoLetivo) e, opcionalmente, a uma série ou a uma
+        lista de ids de Notas. A média é SUM(valor * peso) / SUM(peso) sobre
+        os períodos lançados, como em RegraAvaliacao.avaliar_periodos.
+        Retorna o aluno_id de cada nota alterada.
+        """
+        self.regras.verificar_periodos(ano.periodos)
         is_postgres = self.db_url and POSTGRES_AVAILABLE
+        marcador = '%s' if is_postgres else '?'
+        peso = self.regras.expressao_peso_sql('av.periodo', 'a.serie')
+        status = self.regras.expressao_status_sql('p.media', 'Notas.frequencia_percentual', 'p.serie')
         
-        if is_postgres:
-            cursor.execute('SELECT * FROM alunos WHERE matricula = %s', (matricula,))
-            aluno = cursor.fetchone()
-            
-            if aluno:
-                cursor.execute('SELECT * FROM notas WHERE aluno_id = %s', (aluno[0],))
-                notas = cursor.fetchall()
+        filtros, parametros = [f'n.ano_letivo = {marcador}'], [ano.ano]
+        if serie:
+            filtros.append(f'a.serie = {marcador}')
+            parametros.append(serie)
+        if notas is not None:
+            if not notas:
+                return []
+            if is_postgres:
+                filtros.append('n.id = ANY(%s)')
+                parametros.append(list(notas))
             else:
-                notas = []
-        else:
-            cursor.execute('SELECT * FROM Alunos WHERE matricula = ?', (matricula,))
+                filtros.append('n.id IN (SELECT value FROM json_each(?))')
+                parametros.append(json.dumps(list(notas)))
+        mesma_particao = 'AND av.ano_letivo = n.ano_letivo' if is_postgres else ''
+        
+        cursor.execute(f'''
+            UPDATE Notas SET media_final = p.media, status = {status}
+            FROM (
+                SELECT n.id AS nota_id, a.serie, SUM(av.valor * {peso}) / SUM({peso}) AS media
+                FROM Notas n
+                JOIN Alunos a ON a.id = n.aluno_id
+                JOIN Avaliacoes av ON av.nota_id = n.id {mesma_particao}
+                WHERE {' AND '.join(filtros)}
+                GROUP BY n.id, a.serie
+            ) p
+            WHERE Notas.id = p.nota_id AND Notas.ano_letivo = {marcador}
+              AND (ABS(Notas.media_final - p.media) > 1e-9 OR Notas.status <> {status})
+            RETURNING Notas.aluno_id
+        ''', parametros + [ano.ano])
+        return [linha[0] for linha in cursor.fetchall()]
+    
+    def gravar_avaliacoes(self, matricula, disciplina, valores, frequencia, ano_letivo=None):
+        """Grava as notas de todos os períodos já lançados de uma disciplina
+
+        ``valores`` são as notas do 1º, 2º, ... períodos do ``ano_letivo``
+        (padrão: o corrente): ao menos duas e no máximo uma por período do
+        ano. A média e o status saem da regra da série com todos os períodos.
+        Retorna o aluno_id, ou None se a matrícula não existir; lança
+        ValueError se a quantidade de notas não couber no ano letivo.
+        """
+        valores = [float(valor) for valor in valores]
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+            ano = self._ano_letivo(cursor, ano_letivo)
+            if not 2 <= len(valores) <= ano.periodos:
+                raise ValueError(f"O ano letivo {ano.ano} tem {ano.periodos} períodos: "
+                                 f"informe de 2 a {ano.periodos} notas")
+        
+            cursor.execute(f'SELECT id, serie FROM Alunos WHERE matricula = {marcador}', (matricula,))
             aluno = cursor.fetchone()
-            
-            if aluno:
-                cursor.execute('SELECT * FROM Notas WHERE aluno_id = ?', (aluno[0],))
-                notas = cursor.fetchall()
+            if not aluno:
+                return None
+            aluno_id, serie = aluno
+            media_final, status = self.regras.para_serie(serie).avaliar_periodos(valores, frequencia)
+        
+            marcadores = ', '.join([marcador] * 8)
+            cursor.execute(f'''
+                INSERT INTO Notas (aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre,
+                                   media_final, frequencia_percentual, status, ano_letivo)
+                VALUES ({marcadores})
+                ON CONFLICT (aluno_id, ano_letivo, disciplina) DO UPDATE SET
+                    nota_1_bimestre = excluded.nota_1_bimestre,
+                    nota_2_bimestre = excluded.nota_2_bimestre,
+                    media_final = excluded.media_final,
+                    frequencia_percentual = excluded.frequencia_percentual,
+                    status = excluded.status
+                RETURNING id
+            ''', (aluno_id, disciplina, valores[0], valores[1], media_final, frequencia, status, ano.ano))
+            nota_id = cursor.fetchone()[0]
+        
+            # O 1º e o 2º períodos são gravados em Avaliacoes pelo gatilho de Notas
+            seguintes = list(enumerate(valores[2:], 3))
+            if is_postgres:
+                if seguintes:
+                    psycopg2.extras.execute_values(cursor, '''
+                        INSERT INTO avaliacoes (nota_id, ano_letivo, periodo, valor) VALUES %s
+                        ON CONFLICT (nota_id, ano_letivo, periodo) DO UPDATE SET valor = excluded.valor
+                    ''', [(nota_id, ano.ano, periodo, valor) for periodo, valor in seguintes])
+                cursor.execute('DELETE FROM avaliacoes WHERE nota_id = %s AND ano_letivo = %s AND periodo > %s',
+                               (nota_id, ano.ano, len(valores)))
             else:
-                notas = []
+                cursor.executemany('''
+                    INSERT INTO Avaliacoes (nota_id, periodo, valor) VALUES (?, ?, ?)
+                    ON CONFLICT (nota_id, periodo) DO UPDATE SET valor = excluded.valor
+                ''', [(nota_id, periodo, valor) for periodo, valor in seguintes])
+                cursor.execute('DELETE FROM Avaliacoes WHERE nota_id = ? AND periodo > ?', (nota_id, len(valores)))
         
-        conn.close()
-        return aluno, notas
+            if ano.atual:
+                self._atualizar_resumo(cursor, 'id', [aluno_id])
+            conn.commit()
+        
+        self._invalidar_cache_alunos([matricula])
+        self._notificar_alteracao(aluno_id)
+        return aluno_id
+    
+    def listar_anos_letivos(self):
+        """Retorna os anos letivos cadastrados (AnoLetivo), do mais recente ao mais antigo"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {COLUNAS_ANO_LETIVO} FROM AnosLetivos ORDER BY ano DESC')
+            return [AnoLetivo(ano, periodos, bool(atual)) for ano, periodos, atual in cursor.fetchall()]
+    
+    def criar_ano_letivo(self, ano, periodos=2):
+        """Cadastra um ano letivo com ``periodos`` avaliações por disciplina
+
+        No PostgreSQL cria também as partições do ano em notas e avaliacoes.
+        Lança ValueError se o ano já existir ou se alguma regra de avaliação
+        não tiver peso para todos os períodos.
+        """
+        self.regras.verificar_periodos(periodos)
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+        
+            try:
+                if is_postgres:
+                    cursor.execute('INSERT INTO anosletivos (ano, periodos) VALUES (%s, %s)', (ano, periodos))
+                    cursor.execute('SELECT criar_particoes_ano(%s)', (ano,))
+                else:
+                    cursor.execute('INSERT INTO AnosLetivos (ano, periodos) VALUES (?, ?)', (ano, periodos))
+            except _erros_integridade() as e:
+                conn.rollback()
+                raise ValueError(f"Ano letivo {ano} já cadastrado ou inválido") from e
+            conn.commit()
+        return AnoLetivo(ano, periodos, False)
+    
+    def definir_ano_atual(self, ano):
+        """Torna ``ano`` o ano letivo corrente e recalcula o ResumoAlunos para ele"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+        
+            self._ano_letivo(cursor, ano)
+            # Em dois passos: o índice único de ``atual`` é conferido linha a linha
+            cursor.execute(f'UPDATE AnosLetivos SET atual = {marcador} WHERE atual', (False,))
+            cursor.execute(f'UPDATE AnosLetivos SET atual = {marcador} WHERE ano = {marcador}', (True, ano))
+            total = self._reconstruir_resumo(cursor)
+            # As notas exibidas de todos os alunos mudam de ano
+            cursor.execute(f'UPDATE Alunos SET versao = versao + 1, alterado_em = {marcador}', (_agora_iso(),))
+            conn.commit()
+        self._cache_alunos.limpar()
+        return total
     
     def calcular_estatisticas_gerais(self, aluno_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Retorna (total_disciplinas, media_geral, frequencia_media) do resumo do aluno"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        is_postgres = self.db_url and POSTGRES_AVAILABLE
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        if is_postgres:
-            cursor.execute('''
-                SELECT COUNT(*), AVG(media_final), AVG(frequencia_percentual)
-                FROM notas WHERE aluno_id = %s
-            ''', (aluno_id,))
-        else:
-            cursor.execute('''
-                SELECT COUNT(*), AVG(media_final), AVG(frequencia_percentual)
-                FROM Notas WHERE aluno_id = ?
-            ''', (aluno_id,))
+            if is_postgres:
+                cursor.execute('''
+                    SELECT total_disciplinas, media_geral, frequencia_media
+                    FROM resumoalunos WHERE aluno_id = %s
+                ''', (aluno_id,))
+            else:
+                cursor.execute('''
+                    SELECT total_disciplinas, media_geral, frequencia_media
+                    FROM ResumoAlunos WHERE aluno_id = ?
+                ''', (aluno_id,))
         
-        stats = cursor.fetchone()
-        conn.close()
-        return stats
+            stats = cursor.fetchone()
+            return stats or (0, None, None)
+
+    def buscar_resumos(self, aluno_ids):
+        """Busca o resumo de vários alunos; retorna um dicionário aluno_id -> ResumoAluno"""
+        if not aluno_ids:
+            return {}
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+        
+            if is_postgres:
+                cursor.execute(f'SELECT {COLUNAS_RESUMO} FROM resumoalunos WHERE aluno_id = ANY(%s)',
+                               (list(aluno_ids),))
+            else:
+                cursor.execute(f'''
+                    SELECT {COLUNAS_RESUMO} FROM ResumoAlunos
+                    WHERE aluno_id IN (SELECT value FROM json_each(?))
+                ''', (json.dumps(list(aluno_ids)),))
+            return {linha[0]: ResumoAluno._make(linha) for linha in cursor.fetchall()}
+
+    def _reconstruir_resumo(self, cursor):
+        cursor.execute('DELETE FROM ResumoAlunos')
+        cursor.execute(f'INSERT INTO ResumoAlunos ({COLUNAS_RESUMO}) {SELECT_RESUMO} GROUP BY a.id')
+        return cursor.rowcount
+
+    def reconstruir_resumo(self):
+        """Recalcula todo o ResumoAlunos a partir das notas; retorna o número de alunos"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+            total = self._reconstruir_resumo(cursor)
+            conn.commit()
+        return total
+
+    def verificar_resumo(self):
+        """Compara o ResumoAlunos com o cálculo a partir das notas
+
+        Retorna a lista de aluno_id divergentes (ausentes, sobrando ou com
+        valores diferentes). As médias são comparadas com tolerância.
+        """
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT c.aluno_id
+                FROM ({SELECT_RESUMO} GROUP BY a.id) c
+                LEFT JOIN ResumoAlunos r ON r.aluno_id = c.aluno_id
+                WHERE r.aluno_id IS NULL
+                   OR r.total_disciplinas <> c.total_disciplinas
+                   OR r.disciplinas_reprovadas <> c.disciplinas_reprovadas
+                   OR r.disciplinas_recuperacao <> c.disciplinas_recuperacao
+                   OR r.status_final <> c.status_final
+                   OR ABS(COALESCE(r.media_geral, -1) - COALESCE(c.media_geral, -1)) > 0.0001
+                   OR ABS(COALESCE(r.frequencia_media, -1) - COALESCE(c.frequencia_media, -1)) > 0.0001
+                UNION ALL
+                -- Resumos sobrando: o cálculo tem uma linha por aluno, então
+                -- basta procurar o aluno (sem FULL OUTER JOIN, que o SQLite
+                -- só aceita a partir da 3.39)
+                SELECT r.aluno_id
+                FROM ResumoAlunos r
+                WHERE NOT EXISTS (SELECT 1 FROM Alunos a WHERE a.id = r.aluno_id)
+                ORDER BY 1
+            ''')
+            return [linha[0] for linha in cursor.fetchall()]
 
     def get_disciplinas_padrao(self):
         """Retorna a lista de disciplinas padrão do sistema"""
@@ -239,75 +1153,151 @@ class Database:
             'Geografia', 'Inglês', 'Artes', 'Educação Física'
         ]
 
+    def alterado_em(self, aluno_id):
+        """Data (datetime) da última alteração dos dados ou das notas do aluno, ou None"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            marcador = '%s' if self.db_url and POSTGRES_AVAILABLE else '?'
+            cursor.execute(f'SELECT alterado_em FROM Alunos WHERE id = {marcador}', (aluno_id,))
+            linha = cursor.fetchone()
+        return datetime.fromisoformat(linha[0]) if linha and linha[0] else None
+
     def verificar_matricula_existe(self, matricula):
         """Verifica se uma matrícula já existe"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        is_postgres = self.db_url and POSTGRES_AVAILABLE
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        if is_postgres:
-            cursor.execute('SELECT id FROM alunos WHERE matricula = %s', (matricula,))
-        else:
-            cursor.execute('SELECT id FROM Alunos WHERE matricula = ?', (matricula,))
+            if is_postgres:
+                cursor.execute('SELECT id FROM alunos WHERE matricula = %s', (matricula,))
+            else:
+                cursor.execute('SELECT id FROM Alunos WHERE matricula = ?', (matricula,))
             
-        resultado = cursor.fetchone()
-        conn.close()
-        return resultado is not None
+            resultado = cursor.fetchone()
+            return resultado is not None
 
     def remover_aluno(self, matricula):
         """Remove um aluno e todas as suas notas"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        is_postgres = self.db_url and POSTGRES_AVAILABLE
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        try:
-            # Primeiro buscar o ID do aluno
-            if is_postgres:
-                cursor.execute('SELECT id FROM alunos WHERE matricula = %s', (matricula,))
-            else:
-                cursor.execute('SELECT id FROM Alunos WHERE matricula = ?', (matricula,))
+            try:
+                # Primeiro buscar o ID do aluno
+                if is_postgres:
+                    cursor.execute('SELECT id FROM alunos WHERE matricula = %s', (matricula,))
+                else:
+                    cursor.execute('SELECT id FROM Alunos WHERE matricula = ?', (matricula,))
                 
-            aluno = cursor.fetchone()
+                aluno = cursor.fetchone()
             
-            if not aluno:
-                conn.close()
-                return False, "Aluno não encontrado"
+                if not aluno:
+                    return False, "Aluno não encontrado"
             
-            aluno_id = aluno[0]
+                aluno_id = aluno[0]
             
-            # Remover notas do aluno
-            if is_postgres:
-                cursor.execute('DELETE FROM notas WHERE aluno_id = %s', (aluno_id,))
-                # Remover aluno
-                cursor.execute('DELETE FROM alunos WHERE id = %s', (aluno_id,))
-            else:
-                cursor.execute('DELETE FROM Notas WHERE aluno_id = ?', (aluno_id,))
-                # Remover aluno
-                cursor.execute('DELETE FROM Alunos WHERE id = ?', (aluno_id,))
+                # Remover notas do aluno
+                if is_postgres:
+                    cursor.execute('DELETE FROM resumoalunos WHERE aluno_id = %s', (aluno_id,))
+                    cursor.execute('DELETE FROM notas WHERE aluno_id = %s', (aluno_id,))
+                    # Remover aluno
+                    cursor.execute('DELETE FROM alunos WHERE id = %s', (aluno_id,))
+                else:
+                    cursor.execute('DELETE FROM ResumoAlunos WHERE aluno_id = ?', (aluno_id,))
+                    cursor.execute('DELETE FROM Notas WHERE aluno_id = ?', (aluno_id,))
+                    # Remover aluno
+                    cursor.execute('DELETE FROM Alunos WHERE id = ?', (aluno_id,))
             
-            conn.commit()
-            conn.close()
-            return True, "Aluno removido com sucesso"
+                conn.commit()
             
-        except Exception as e:
-            conn.rollback()
-            conn.close()
-            return False, f"Erro ao remover aluno: {e}"
+            except Exception as e:
+                conn.rollback()
+                return False, f"Erro ao remover aluno: {e}"
+        
+        self._cache_contagem.limpar()
+        self._invalidar_cache_alunos([matricula])
+        self._notificar_alteracao(aluno_id)
+        return True, "Aluno removido com sucesso"
 
     def buscar_aluno_por_id(self, aluno_id):
         """Busca aluno por ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.conexao() as conn:
+            cursor = conn.cursor()
         
-        is_postgres = self.db_url and POSTGRES_AVAILABLE
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
         
-        if is_postgres:
-            cursor.execute('SELECT * FROM alunos WHERE id = %s', (aluno_id,))
-        else:
-            cursor.execute('SELECT * FROM Alunos WHERE id = ?', (aluno_id,))
+            if is_postgres:
+                cursor.execute(f'SELECT {COLUNAS_ALUNO} FROM alunos WHERE id = %s', (aluno_id,))
+            else:
+                cursor.execute(f'SELECT {COLUNAS_ALUNO} FROM Alunos WHERE id = ?', (aluno_id,))
+            
+            aluno = cursor.fetchone()
+            return Aluno._make(aluno) if aluno else None
+
+    def buscar_usuario_por_email(self, email):
+        """Busca um usuário pelo e-mail (índice UNIQUE); retorna Usuario ou None"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+        
+            if is_postgres:
+                cursor.execute(f'SELECT {COLUNAS_USUARIO} FROM usuarios WHERE email = %s', (email,))
+            else:
+                cursor.execute(f'SELECT {COLUNAS_USUARIO} FROM Usuarios WHERE email = ?', (email,))
             
-        aluno = cursor.fetchone()
-        conn.close()
-        return aluno
\ No newline at end of file
+            usuario = cursor.fetchone()
+            if not usuario:
+                return None
+            return Usuario._make(usuario[:-1] + (bool(usuario[-1]),))
+
+    def salvar_usuario(self, email, nome, tipo, senha_hash, ativo=True):
+        """Cria o usuário ou, se o e-mail já existe, atualiza seus dados e senha"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+            marcador = '%s' if is_postgres else '?'
+        
+            cursor.execute(f'''
+                INSERT INTO Usuarios (email, nome, tipo, senha_hash, ativo)
+                VALUES ({marcador}, {marcador}, {marcador}, {marcador}, {marcador})
+                ON CONFLICT (email) DO UPDATE SET
+                    nome = excluded.nome, tipo = excluded.tipo,
+                    senha_hash = excluded.senha_hash, ativo = excluded.ativo
+            ''', (email, nome, tipo, senha_hash, ativo))
+            conn.commit()
+
+    def atualizar_senha_hash(self, usuario_id, senha_hash):
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+        
+            if is_postgres:
+                cursor.execute('UPDATE usuarios SET senha_hash = %s WHERE id = %s', (senha_hash, usuario_id))
+            else:
+                cursor.execute('UPDATE Usuarios SET senha_hash = ? WHERE id = ?', (senha_hash, usuario_id))
+            conn.commit()
+
+    def definir_usuario_ativo(self, email, ativo):
+        """Ativa ou desativa um usuário; retorna False se o e-mail não existe"""
+        with self.conexao() as conn:
+            cursor = conn.cursor()
+        
+            is_postgres = self.db_url and POSTGRES_AVAILABLE
+        
+            if is_postgres:
+                cursor.execute('UPDATE usuarios SET ativo = %s WHERE email = %s', (ativo, email))
+            else:
+                cursor.execute('UPDATE Usuarios SET ativo = ? WHERE email = ?', (ativo, email))
+            conn.commit()
+            return cursor.rowcount > 0
+
+# Tempo e erros de cada método público que consulta o banco
+for _nome, _metodo in list(vars(Database).items()):
+    if callable(_metodo) and not _nome.startswith('_') and _nome not in NAO_MEDIDOS:
+        setattr(Database, _nome, metricas.cronometrado(DURACAO_CONSULTAS, _nome, ERROS_CONSULTAS)(_metodo))
@@ -0,0 +1,362 @@
+"""Fila local de tarefas em segundo plano para a geração de boletins
+
+As tarefas ficam em um banco SQLite próprio (``fila.db``), então a fila não
+depende de nenhum serviço externo. As rotas apenas enfileiram; os workers
+(threads no próprio servidor ou um processo separado) executam as tarefas,
+registram o progresso e gravam o resultado em disco para download.
+
+Enquanto uma tarefa roda, uma thread do worker renova o seu batimento a
+cada quarto de FILA_BATIMENTO_LIMITE. Periodicamente os workers devolvem à
+fila as tarefas em execução cujo batimento tem mais que o limite (worker
+encerrado no meio, em qualquer processo) e apagam as tarefas terminadas há
+mais de FILA_RETENCAO_DIAS dias, junto com o arquivo do resultado. Cada
+execução grava num arquivo temporário próprio e só conclui a tarefa se ainda
+for a dona dela; uma execução que perdeu a tarefa descarta o que gerou.
+
+Uso pela linha de comando (workers fora do servidor web):
+
+    python fila_pdf.py --workers 2
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from lote_boletins import gerar_lote
+from logs import configurar_logs
+
+log = logging.getLogger(__name__)
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDA = 'concluida'
+ERRO = 'erro'
+
+# Intervalo mínimo entre gravações de progresso de uma mesma tarefa
+INTERVALO_PROGRESSO = 0.5
+
+# Intervalo entre as verificações de tarefas interrompidas e antigas
+INTERVALO_MANUTENCAO = 60.0
+
+
+def executar_boletins(db, parametros, destino, progresso):
+    """Gera o lote de boletins descrito em ``parametros`` no arquivo ``destino``"""
+    alunos_notas = db.buscar_alunos_com_notas(
+        serie=parametros.get('serie') or None,
+        matriculas=parametros.get('matriculas') or None,
+    )
+    if not alunos_notas:
+        raise ValueError("Nenhum aluno encontrado")
+    progresso(0, len(alunos_notas))
+    with open(destino, 'wb') as saida:
+        for parte in gerar_lote(alunos_notas, parametros.get('formato', 'zip'), progresso):
+            saida.write(parte)
+
+
+TIPOS = {
+    'boletins': executar_boletins,
+}
+
+
+class FilaTarefas:
+    def __init__(self, caminho_db, diretorio_resultados, limite_batimento=300.0, retencao_dias=7.0):
+        self.caminho_db = caminho_db
+        self.diretorio_resultados = diretorio_resultados
+        self.limite_batimento = limite_batimento
+        self.retencao_dias = retencao_dias
+        self._proxima_manutencao = 0.0
+        self._lock_manutencao = threading.Lock()
+        self._nova_tarefa = threading.Event()
+        self._parar = threading.Event()
+        self._workers = []
+        self._criar_tabela()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho_db, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _criar_tabela(self):
+        conn = self._conectar()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS tarefas (
+                    id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    parametros TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progresso INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    arquivo TEXT,
+                    erro TEXT,
+                    criada_em REAL NOT NULL,
+                    iniciada_em REAL,
+                    concluida_em REAL,
+                    batimento REAL,
+                    reivindicacao TEXT
+                )
+            ''')
+            # Bancos criados antes do batimento e da reivindicação
+            colunas = {linha['name'] for linha in conn.execute('PRAGMA table_info(tarefas)')}
+            for coluna, tipo in (('batimento', 'REAL'), ('reivindicacao', 'TEXT')):
+                if coluna not in colunas:
+                    conn.execute(f'ALTER TABLE tarefas ADD COLUMN {coluna} {tipo}')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status, criada_em)')
+        finally:
+            conn.close()
+
+    def enfileirar(self, tipo, parametros):
+        """Registra uma nova tarefa pendente e retorna o seu id"""
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de tarefa desconhecido: {tipo}")
+        tarefa_id = uuid.uuid4().hex
+        conn = self._conectar()
+        try:
+            conn.execute(
+                'INSERT INTO tarefas (id, tipo, parametros, status, criada_em) VALUES (?, ?, ?, ?, ?)',
+                (tarefa_id, tipo, json.dumps(parametros, ensure_ascii=False), PENDENTE, time.time())
+            )
+        finally:
+            conn.close()
+        self._nova_tarefa.set()
+        return tarefa_id
+
+    def obter(self, tarefa_id):
+        """Retorna a tarefa como dicionário ou None"""
+        conn = self._conectar()
+        try:
+            linha = conn.execute('SELECT * FROM tarefas WHERE id = ?', (tarefa_id,)).fetchone()
+        finally:
+            conn.close()
+        if linha is None:
+            return None
+        tarefa = dict(linha)
+        tarefa['parametros'] = json.loads(tarefa['parametros'])
+        return tarefa
+
+    def _reivindicar(self, conn):
+        # BEGIN IMMEDIATE garante que só um worker (de qualquer processo) pega a tarefa
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            linha = conn.execute(
+                'SELECT * FROM tarefas WHERE status = ? ORDER BY criada_em LIMIT 1', (PENDENTE,)
+            ).fetchone()
+            if linha is not None:
+                # Identifica esta execução; se a tarefa for devolvida à fila e
+                # pega por outro worker, esta deixa de ser a dona
+                linha = dict(linha, reivindicacao=f"{os.getpid()}-{uuid.uuid4().hex}")
+                agora = time.time()
+                conn.execute(
+                    'UPDATE tarefas SET status = ?, iniciada_em = ?, batimento = ?, reivindicacao = ? WHERE id = ?',
+                    (EXECUTANDO, agora, agora, linha['reivindicacao'], linha['id'])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return linha
+
+    def recuperar_interrompidas(self, limite_batimento=None):
+        """Devolve à fila tarefas em execução sem batimento recente (ex.: worker encerrado no meio)"""
+        limite = self.limite_batimento if limite_batimento is None else limite_batimento
+        conn = self._conectar()
+        try:
+            cursor = conn.execute(
+                'UPDATE tarefas SET status = ?, progresso = 0, reivindicacao = NULL '
+                'WHERE status = ? AND COALESCE(batimento, iniciada_em) < ?',
+                (PENDENTE, EXECUTANDO, time.time() - limite)
+            )
+            recuperadas = cursor.rowcount
+        finally:
+            conn.close()
+        if recuperadas:
+            log.warning("Tarefas interrompidas devolvidas à fila", extra={'tarefas': recuperadas})
+        return recuperadas
+
+    def limpar_antigas(self, retencao_dias=None):
+        """Apaga as tarefas terminadas há mais de ``retencao_dias`` dias e os seus arquivos"""
+        dias = self.retencao_dias if retencao_dias is None else retencao_dias
+        conn = self._conectar()
+        try:
+            antigas = conn.execute(
+                'SELECT id, arquivo FROM tarefas WHERE status IN (?, ?) AND concluida_em < ?',
+                (CONCLUIDA, ERRO, time.time() - dias * 86400)
+            ).fetchall()
+            for tarefa in antigas:
+                if tarefa['arquivo']:
+                    try:
+                        os.remove(tarefa['arquivo'])
+                    except FileNotFoundError:
+                        pass
+                conn.execute('DELETE FROM tarefas WHERE id = ?', (tarefa['id'],))
+        finally:
+            conn.close()
+        if antigas:
+            log.info("Tarefas antigas apagadas", extra={'tarefas': len(antigas), 'dias': dias})
+        return len(antigas)
+
+    def _manutencao(self):
+        """Recupera interrompidas e apaga antigas, no máximo uma vez por INTERVALO_MANUTENCAO neste processo"""
+        with self._lock_manutencao:
+            agora = time.monotonic()
+            if agora < self._proxima_manutencao:
+                return
+            self._proxima_manutencao = agora + INTERVALO_MANUTENCAO
+        try:
+            self.recuperar_interrompidas()
+            self.limpar_antigas()
+        except sqlite3.Error:
+            log.exception("Falha na manutenção da fila")
+
+    @contextmanager
+    def _batimento(self, tarefa_id, reivindicacao):
+        """Renova o batimento da tarefa em uma thread enquanto o bloco executa"""
+        parar = threading.Event()
+
+        def renovar():
+            conn = self._conectar()
+            try:
+                while not parar.wait(self.limite_batimento / 4):
+                    try:
+                        conn.execute('UPDATE tarefas SET batimento = ? WHERE id = ? AND reivindicacao = ?',
+                                     (time.time(), tarefa_id, reivindicacao))
+                    except sqlite3.Error:
+                        log.exception("Falha ao renovar o batimento", extra={'tarefa': tarefa_id})
+            finally:
+                conn.close()
+
+        thread = threading.Thread(target=renovar, name=f"batimento-{tarefa_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            parar.set()
+            thread.join()
+
+    def _finalizar(self, conn, tarefa_id, reivindicacao, colunas, valores, ao_confirmar=None):
+        """Grava o fim da tarefa se esta execução ainda for a dona; retorna True se gravou
+
+        ``ao_confirmar`` roda com a tarefa travada, antes do COMMIT.
+        """
+        atribuicoes = ', '.join(f'{coluna} = ?' for coluna in colunas)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                f'UPDATE tarefas SET {atribuicoes} WHERE id = ? AND status = ? AND reivindicacao = ?',
+                list(valores) + [tarefa_id, EXECUTANDO, reivindicacao]
+            )
+            dona = cursor.rowcount == 1
+            if dona and ao_confirmar is not None:
+                ao_confirmar()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if not dona:
+            log.warning("Tarefa devolvida à fila durante a execução; resultado descartado",
+                        extra={'tarefa': tarefa_id})
+        return dona
+
+    def _executar(self, conn, db, tarefa):
+        tarefa_id = tarefa['id']
+        reivindicacao = tarefa['reivindicacao']
+        parametros = json.loads(tarefa['parametros'])
+        extensao = parametros.get('formato', 'zip')
+        destino = os.path.join(self.diretorio_resultados, f"{tarefa_id}.{extensao}")
+        temporario = f"{destino}.{reivindicacao}.tmp"
+        ultima_gravacao = [0.0]
+
+        def progresso(feitos, total):
+            agora = time.monotonic()
+            if feitos < total and agora - ultima_gravacao[0] < INTERVALO_PROGRESSO:
+                return
+            ultima_gravacao[0] = agora
+            conn.execute('UPDATE tarefas SET progresso = ?, total = ?, batimento = ? '
+                         'WHERE id = ? AND reivindicacao = ?',
+                         (feitos, total, time.time(), tarefa_id, reivindicacao))
+
+        try:
+            os.makedirs(self.diretorio_resultados, exist_ok=True)
+            with self._batimento(tarefa_id, reivindicacao):
+                TIPOS[tarefa['tipo']](db, parametros, temporario, progresso)
+            # O arquivo só substitui o destino com a tarefa ainda nossa e travada
+            if self._finalizar(conn, tarefa_id, reivindicacao, ('status', 'arquivo', 'concluida_em'),
+                               (CONCLUIDA, destino, time.time()), lambda: os.replace(temporario, destino)):
+                log.info("Tarefa concluída", extra={'tarefa': tarefa_id, 'tipo': tarefa['tipo']})
+        except Exception as e:
+            log.exception("Tarefa falhou", extra={'tarefa': tarefa_id, 'tipo': tarefa['tipo']})
+            self._finalizar(conn, tarefa_id, reivindicacao, ('status', 'erro', 'concluida_em'),
+                            (ERRO, str(e), time.time()))
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def _loop_worker(self, db, intervalo):
+        conn = self._conectar()
+        try:
+            while not self._parar.is_set():
+                self._manutencao()
+                tarefa = self._reivindicar(conn)
+                if tarefa is None:
+                    # Acorda na hora para tarefas deste processo; consulta
+                    # periodicamente as enfileiradas por outros processos
+                    self._nova_tarefa.wait(intervalo)
+                    self._nova_tarefa.clear()
+                    continue
+                self._executar(conn, db, tarefa)
+        finally:
+            conn.close()
+
+    def iniciar_workers(self, quantidade, db, intervalo=1.0):
+        """Inicia ``quantidade`` threads que consomem a fila"""
+        for numero in range(quantidade):
+            worker = threading.Thread(
+                target=self._loop_worker, args=(db, intervalo),
+                name=f"fila-pdf-{numero}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def parar(self, timeout=None):
+        self._parar.set()
+        self._nova_tarefa.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+
+def criar_fila():
+    """Cria a fila com os caminhos configurados por variáveis de ambiente"""
+    return FilaTarefas(
+        os.environ.get('FILA_DB', 'fila.db'),
+        os.environ.get('FILA_RESULTADOS_DIR', 'resultados_tarefas'),
+        limite_batimento=float(os.environ.get('FILA_BATIMENTO_LIMITE', 300)),
+        retencao_dias=float(os.environ.get('FILA_RETENCAO_DIAS', 7)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Executa workers da fila de boletins')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+    configurar_logs()
+
+    from database import Database
+    fila = criar_fila()
+    fila.iniciar_workers(args.workers, Database())
+    print(f"🚀 {args.workers} workers aguardando tarefas em {fila.caminho_db}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fila.parar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Configuração do gunicorn, o servidor WSGI de produção
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Concorrência: WEB_WORKERS processos (padrão 2 × CPUs + 1), cada um com
+WEB_THREADS threads (padrão 4). As threads atendem bem as rotas que esperam
+o banco; os PDFs são renderizados no pool de processos de lote_boletins
+(BOLETIM_PROCESSOS por worker, BOLETIM_SIMULTANEOS pendentes no máximo), de
+modo que um pico de boletins não segura as rotas leves.
+
+Com WEB_WORKER_CLASS=uvicorn_worker.UvicornWorker e asgi:app, a busca de
+alunos e a verificação de matrícula rodam no laço de eventos de cada worker
+(ver api_assincrona) e o resto da aplicação continua no Flask.
+
+Recarga sem derrubar requisições:
+
+    kill -HUP <pid do mestre>    # workers novos; os antigos terminam o que estão atendendo
+
+Com preload_app o código é carregado no mestre, então o HUP não lê código
+novo. Para publicar uma versão: kill -USR2 <pid do mestre> (sobe um mestre
+novo com o código atual) e, quando ele estiver no ar, kill -QUIT no antigo.
+Para desativar o preload: WEB_PRELOAD=0.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+
+workers = int(os.environ.get('WEB_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get('WEB_THREADS', 4))
+# Com o asgi:app use WEB_WORKER_CLASS=uvicorn_worker.UvicornWorker
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+
+# Importa a aplicação (e aplica as migrações) uma vez só, antes do fork
+preload_app = os.environ.get('WEB_PRELOAD', '1') == '1'
+
+# Downloads de lotes grandes podem levar mais que o padrão de 30s
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recicla os workers de tempos em tempos (jitter evita reciclar todos juntos)
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+# WEB_ACCESSLOG vazio desliga o log de acesso
+accesslog = os.environ.get('WEB_ACCESSLOG', '-') or None
+
+
+def post_worker_init(worker):
+    # O pool de conexões detecta o fork sozinho; threads não sobrevivem ao
+    # fork e por isso a fila é iniciada aqui, em cada worker
+    import main
+    main.iniciar_workers_fila()
+
+
+def worker_exit(server, worker):
+    import main
+    main.encerrar()
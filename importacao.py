@@ -0,0 +1,269 @@
+"""Importação em massa de alunos e notas a partir de arquivos CSV ou XLSX
+
+Cada linha do arquivo traz os dados do aluno e, opcionalmente, as notas de
+uma disciplina. Um aluno com várias disciplinas aparece em várias linhas
+(os dados pessoais se repetem). Colunas esperadas:
+
+    matricula, nome_completo, data_nascimento, serie, nome_responsavel,
+    disciplina, nota_1, nota_2, frequencia
+
+Uso pela linha de comando:
+
+    python importacao.py alunos.csv [--lote 1000] [--relatorio erros.json]
+"""
+import argparse
+import csv
+import io
+import json
+import time
+import unicodedata
+from datetime import datetime
+from itertools import islice
+
+from database import Database
+
+COLUNAS_ALUNO = ('matricula', 'nome_completo', 'data_nascimento', 'serie', 'nome_responsavel')
+COLUNAS_NOTA = ('disciplina', 'nota_1', 'nota_2', 'frequencia')
+
+# Nomes alternativos aceitos no cabeçalho
+SINONIMOS = {
+    'nome': 'nome_completo',
+    'aluno': 'nome_completo',
+    'nascimento': 'data_nascimento',
+    'responsavel': 'nome_responsavel',
+    'nome_do_responsavel': 'nome_responsavel',
+    'nota1': 'nota_1',
+    'nota_1_bimestre': 'nota_1',
+    'nota2': 'nota_2',
+    'nota_2_bimestre': 'nota_2',
+    'frequencia_percentual': 'frequencia',
+}
+
+TAMANHO_LOTE_PADRAO = 1000
+
+
+class ErroImportacao(Exception):
+    """O arquivo não pode ser importado (formato ou cabeçalho inválido)"""
+
+
+def _normalizar_coluna(nome):
+    nome = unicodedata.normalize('NFKD', str(nome or '')).encode('ascii', 'ignore').decode()
+    nome = nome.strip().lower().replace(' ', '_')
+    return SINONIMOS.get(nome, nome)
+
+
+def _mapear_cabecalho(cabecalho):
+    colunas = [_normalizar_coluna(c) for c in cabecalho]
+    faltando = [c for c in COLUNAS_ALUNO if c not in colunas]
+    if faltando:
+        raise ErroImportacao(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+    return colunas
+
+
+def _linhas_csv(arquivo):
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    amostra = texto.readline()
+    delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+    leitor = csv.reader(texto, delimiter=delimitador)
+    colunas = _mapear_cabecalho(next(csv.reader([amostra], delimiter=delimitador), []))
+    for numero, valores in enumerate(leitor, start=2):
+        if any(v.strip() for v in valores):
+            yield numero, dict(zip(colunas, valores))
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErroImportacao("Para importar arquivos .xlsx instale o pacote openpyxl")
+    planilha = load_workbook(arquivo, read_only=True, data_only=True).active
+    linhas = planilha.iter_rows(values_only=True)
+    colunas = _mapear_cabecalho(next(linhas, ()))
+    for numero, valores in enumerate(linhas, start=2):
+        if any(v not in (None, '') for v in valores):
+            yield numero, dict(zip(colunas, ('' if v is None else v for v in valores)))
+
+
+def ler_linhas(arquivo, nome_arquivo):
+    """Lê o arquivo sob demanda, gerando (número da linha, dados) por linha"""
+    if nome_arquivo.lower().endswith('.xlsx'):
+        return _linhas_xlsx(arquivo)
+    if nome_arquivo.lower().endswith('.csv'):
+        return _linhas_csv(arquivo)
+    raise ErroImportacao("Formato não suportado: envie um arquivo .csv ou .xlsx")
+
+
+def _texto(dados, campo):
+    valor = dados.get(campo, '')
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d')
+    return str(valor).strip()
+
+
+def _numero(dados, campo, maximo):
+    valor = dados.get(campo, '')
+    if isinstance(valor, (int, float)):
+        numero = float(valor)
+    else:
+        try:
+            numero = float(str(valor).strip().replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"{campo} inválido: '{valor}'")
+    if not 0 <= numero <= maximo:
+        raise ValueError(f"{campo} fora do intervalo 0-{maximo}: {numero}")
+    return numero
+
+
+def _data(valor):
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError(f"data_nascimento inválida: '{valor}'")
+
+
+def validar_linha(dados):
+    """Valida uma linha e retorna (aluno, nota); nota é None se não houver disciplina"""
+    valores = {campo: _texto(dados, campo) for campo in COLUNAS_ALUNO}
+    vazios = [campo for campo, valor in valores.items() if not valor]
+    if vazios:
+        raise ValueError(f"Campos obrigatórios vazios: {', '.join(vazios)}")
+
+    aluno = (
+        valores['nome_completo'],
+        _data(valores['data_nascimento']),
+        valores['serie'],
+        valores['nome_responsavel'],
+        valores['matricula'],
+    )
+
+    disciplina = _texto(dados, 'disciplina')
+    if not disciplina:
+        return aluno, None
+    nota = (
+        valores['matricula'],
+        disciplina,
+        _numero(dados, 'nota_1', 10),
+        _numero(dados, 'nota_2', 10),
+        _numero(dados, 'frequencia', 100),
+    )
+    return aluno, nota
+
+
+def validar_correcao(dados):
+    """Valida uma correção de nota e retorna (matricula, disciplina, nota_1, nota_2, frequencia)"""
+    vazios = [campo for campo in ('matricula', 'disciplina') if not _texto(dados, campo)]
+    if vazios:
+        raise ValueError(f"Campos obrigatórios vazios: {', '.join(vazios)}")
+    return (
+        _texto(dados, 'matricula'),
+        _texto(dados, 'disciplina'),
+        _numero(dados, 'nota_1', 10),
+        _numero(dados, 'nota_2', 10),
+        _numero(dados, 'frequencia', 100),
+    )
+
+
+class _Lotes:
+    """Agrupa as linhas válidas em lotes e acumula os erros por linha"""
+
+    def __init__(self, linhas, tamanho_lote):
+        self.linhas = linhas
+        self.tamanho_lote = tamanho_lote
+        self.lidas = 0
+        self.erros = []
+        self.linhas_por_matricula = {}
+        self._alunos = {}
+        self._disciplinas = set()
+
+    def _processar(self, numero, dados):
+        aluno, nota = validar_linha(dados)
+        matricula = aluno[4]
+        primeiro = self._alunos.get(matricula)
+        if primeiro is not None and primeiro != aluno:
+            raise ValueError(f"Dados do aluno {matricula} divergem de uma linha anterior")
+        if nota is not None:
+            chave = (matricula, nota[1])
+            if chave in self._disciplinas:
+                raise ValueError(f"Disciplina '{nota[1]}' repetida para a matrícula {matricula}")
+            self._disciplinas.add(chave)
+        self.linhas_por_matricula.setdefault(matricula, []).append(numero)
+        novo = primeiro is None
+        self._alunos[matricula] = aluno
+        return (aluno if novo else None), nota
+
+    def __iter__(self):
+        while True:
+            bloco = list(islice(self.linhas, self.tamanho_lote))
+            if not bloco:
+                return
+            alunos, notas = [], []
+            for numero, dados in bloco:
+                self.lidas += 1
+                try:
+                    aluno, nota = self._processar(numero, dados)
+                except ValueError as e:
+                    self.erros.append({'linha': numero, 'erro': str(e)})
+                    continue
+                if aluno is not None:
+                    alunos.append(aluno)
+                if nota is not None:
+                    notas.append(nota)
+            yield alunos, notas
+
+
+def importar(db, arquivo, nome_arquivo, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Importa o arquivo em lotes e retorna o relatório da importação"""
+    inicio = time.perf_counter()
+    lotes = _Lotes(ler_linhas(arquivo, nome_arquivo), tamanho_lote)
+    alunos_inseridos, notas_inseridas, existentes = db.importar_lotes(lotes)
+
+    erros = lotes.erros
+    for matricula in existentes:
+        for numero in lotes.linhas_por_matricula.get(matricula, []):
+            erros.append({'linha': numero, 'erro': f"Matrícula {matricula} já cadastrada"})
+    erros.sort(key=lambda erro: erro['linha'])
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'linhas_lidas': lotes.lidas,
+        'alunos_inseridos': alunos_inseridos,
+        'notas_inseridas': notas_inseridas,
+        'linhas_com_erro': len(erros),
+        'erros': erros,
+        'segundos': round(segundos, 3),
+        'linhas_por_segundo': round(lotes.lidas / segundos, 1) if segundos > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa alunos e notas de um arquivo CSV ou XLSX')
+    parser.add_argument('arquivo')
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE_PADRAO, help='linhas por lote')
+    parser.add_argument('--relatorio', help='grava o relatório completo em JSON neste caminho')
+    args = parser.parse_args()
+
+    db = Database()
+    db.init_db()
+    with open(args.arquivo, 'rb') as arquivo:
+        try:
+            relatorio = importar(db, arquivo, args.arquivo, args.lote)
+        except ErroImportacao as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+
+    print(f"✅ {relatorio['alunos_inseridos']} alunos e {relatorio['notas_inseridas']} notas importados")
+    print(f"📊 {relatorio['linhas_lidas']} linhas em {relatorio['segundos']}s "
+          f"({relatorio['linhas_por_segundo']} linhas/s)")
+    for erro in relatorio['erros'][:20]:
+        print(f"⚠️  Linha {erro['linha']}: {erro['erro']}")
+    if relatorio['linhas_com_erro'] > 20:
+        print(f"⚠️  ... e mais {relatorio['linhas_com_erro'] - 20} linhas com erro")
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as saida:
+            json.dump(relatorio, saida, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,89 @@
 from database import Database
+import argparse
 import random
 
-def popular_banco_dados():
-    db = Database()
-    
+SERIES = [
+    '6º Ano - Fundamental II', '7º Ano - Fundamental II', '8º Ano - Fundamental II',
+    '9º Ano - Fundamental II', '1º Ano - Ensino Médio', '2º Ano - Ensino Médio', '3º Ano - Ensino Médio'
+]
+
+# Nomes combinados para gerar escolas sintéticas com buscas realistas
+PRENOMES = [
+    'Ana', 'Pedro', 'Mariana', 'Lucas', 'Juliana', 'Gabriel', 'Beatriz', 'Rafael', 'Larissa', 'Mateus',
+    'Camila', 'Gustavo', 'Fernanda', 'Thiago', 'Isabela', 'Felipe', 'Letícia', 'Bruno', 'Amanda', 'João',
+    'Maria', 'Carlos', 'Sofia', 'Daniel', 'Helena', 'Rodrigo', 'Vitória', 'André', 'Luíza', 'Eduardo'
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas'
+]
+
+def _lotes_sinteticos(quantidade, disciplinas, aleatorio, tamanho_lote, prefixo):
+    """Gera lotes (alunos, notas) no formato de Database.importar_lotes"""
+    for inicio in range(0, quantidade, tamanho_lote):
+        alunos, notas = [], []
+        for numero in range(inicio, min(inicio + tamanho_lote, quantidade)):
+            nome = (f"{aleatorio.choice(PRENOMES)} {aleatorio.choice(SOBRENOMES)} "
+                    f"{aleatorio.choice(SOBRENOMES)}")
+            matricula = f"{prefixo}{numero + 1:06d}"
+            alunos.append((
+                nome,
+                f"{aleatorio.randint(2006, 2013)}-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d}",
+                aleatorio.choice(SERIES),
+                f"{aleatorio.choice(PRENOMES)} {nome.rsplit(' ', 1)[1]}",
+                matricula
+            ))
+            for disciplina in disciplinas:
+                notas.append((
+                    matricula, disciplina,
+                    round(aleatorio.uniform(3.0, 10.0), 1),
+                    round(aleatorio.uniform(3.0, 10.0), 1),
+                    round(aleatorio.uniform(60.0, 100.0), 1)
+                ))
+        yield alunos, notas
+
+def _anos_anteriores(db, quantidade, disciplinas, aleatorio, tamanho_lote, prefixo, anos):
+    """Grava notas dos mesmos alunos nos ``anos - 1`` anos letivos anteriores ao corrente"""
+    ano_atual = next(ano.ano for ano in db.listar_anos_letivos() if ano.atual)
+    cadastrados = {ano.ano for ano in db.listar_anos_letivos()}
+    for ano in range(ano_atual - anos + 1, ano_atual):
+        if ano not in cadastrados:
+            db.criar_ano_letivo(ano)
+        for inicio in range(0, quantidade, tamanho_lote):
+            db.atualizar_notas([
+                (f"{prefixo}{numero + 1:06d}", disciplina,
+                 round(aleatorio.uniform(3.0, 10.0), 1), round(aleatorio.uniform(3.0, 10.0), 1),
+                 round(aleatorio.uniform(60.0, 100.0), 1))
+                for numero in range(inicio, min(inicio + tamanho_lote, quantidade))
+                for disciplina in disciplinas
+            ], ano_letivo=ano)
+
+def popular_banco_dados(db=None, quantidade=None, semente=None, tamanho_lote=2000, prefixo='S', anos=1):
+    """Popula o banco com os alunos de exemplo ou, com ``quantidade``, com uma escola sintética
+
+    A escola sintética tem ``quantidade`` alunos com matrículas ``S000001``,
+    ``S000002``..., espalhados pelas séries e com notas em todas as
+    disciplinas padrão no ano letivo corrente e, com ``anos`` > 1, nos
+    anteriores. Com a mesma ``semente`` os dados são sempre os mesmos, o
+    que permite comparar medições entre execuções. Retorna o número de
+    alunos inseridos.
+    """
+    db = db or Database()
+
+    if quantidade:
+        aleatorio = random.Random(semente)
+        disciplinas = db.get_disciplinas_padrao()
+        alunos_inseridos, notas_inseridas, _ = db.importar_lotes(
+            _lotes_sinteticos(quantidade, disciplinas, aleatorio, tamanho_lote, prefixo)
+        )
+        if anos > 1:
+            _anos_anteriores(db, quantidade, disciplinas, aleatorio, tamanho_lote, prefixo, anos)
+            notas_inseridas *= anos
+        print(f"📊 Escola sintética: {alunos_inseridos} alunos e {notas_inseridas} notas cadastrados"
+              f" em {anos} {'anos letivos' if anos > 1 else 'ano letivo'}")
+        return alunos_inseridos
+
     # Dados dos alunos
     alunos = [
         {
@@ -42,13 +122,13 @@ def popular_banco_dados():
             'matricula': '2024005'
         }
     ]
-    
+
     # Disciplinas
     disciplinas = [
-        'Matemática', 'Língua Portuguesa', 'Ciências', 'História', 
+        'Matemática', 'Língua Portuguesa', 'Ciências', 'História',
         'Geografia', 'Inglês', 'Artes', 'Educação Física'
     ]
-    
+
     for aluno_data in alunos:
         aluno_id = db.inserir_aluno(
             aluno_data['nome'],
@@ -57,17 +137,23 @@ def popular_banco_dados():
             aluno_data['responsavel'],
             aluno_data['matricula']
         )
-        
+
         # Gerar notas aleatórias para cada disciplina
         for disciplina in disciplinas:
             nota_1 = round(random.uniform(5.0, 10.0), 1)
             nota_2 = round(random.uniform(5.0, 10.0), 1)
             frequencia = round(random.uniform(70.0, 100.0), 1)
-            
+
             db.inserir_nota(aluno_id, disciplina, nota_1, nota_2, frequencia)
-    
+
     print("✅ Banco de dados populado com sucesso!")
     print(f"📊 Foram cadastrados {len(alunos)} alunos com {len(disciplinas)} disciplinas cada")
+    return len(alunos)
 
 if __name__ == '__main__':
-    popular_banco_dados()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Popula o banco com dados de exemplo')
+    parser.add_argument('--alunos', type=int, help='gera uma escola sintética com esta quantidade de alunos')
+    parser.add_argument('--semente', type=int, default=1, help='semente dos dados sintéticos')
+    parser.add_argument('--anos', type=int, default=1, help='anos letivos com notas na escola sintética')
+    args = parser.parse_args()
+    popular_banco_dados(quantidade=args.alunos, semente=args.semente, anos=args.anos)
@@ -0,0 +1,67 @@
+"""Logs estruturados com nível configurável
+
+Os módulos usam ``logging.getLogger(__name__)`` e passam os dados do evento
+em ``extra``, que viram campos do registro:
+
+    log.info("Aluno cadastrado", extra={'aluno_id': 42, 'matricula': '2024001'})
+
+configurar_logs() prepara a saída do processo (stderr):
+
+- LOG_NIVEL: DEBUG, INFO (padrão), WARNING ou ERROR;
+- LOG_FORMATO: 'texto' (padrão, ``campo=valor`` no fim da linha) ou 'json'
+  (um objeto por linha, para coletores de log).
+"""
+import json
+import logging
+import os
+import sys
+
+# Atributos que todo LogRecord tem; o que sobra veio de ``extra``
+_ATRIBUTOS_PADRAO = set(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+_configurado = False
+
+
+def _campos(registro):
+    return {chave: valor for chave, valor in registro.__dict__.items() if chave not in _ATRIBUTOS_PADRAO}
+
+
+class FormatoTexto(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def formatMessage(self, registro):
+        linha = super().formatMessage(registro)
+        campos = _campos(registro)
+        if campos:
+            linha += ' ' + ' '.join(f'{chave}={valor!r}' if isinstance(valor, str) and ' ' in valor
+                                    else f'{chave}={valor}' for chave, valor in campos.items())
+        return linha
+
+
+class FormatoJSON(logging.Formatter):
+    def format(self, registro):
+        dados = {
+            'hora': self.formatTime(registro),
+            'nivel': registro.levelname,
+            'origem': registro.name,
+            'mensagem': registro.getMessage(),
+        }
+        dados.update(_campos(registro))
+        if registro.exc_info:
+            dados['excecao'] = self.formatException(registro.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+def configurar_logs(nivel=None, formato=None):
+    """Configura o logger raiz uma única vez por processo"""
+    global _configurado
+    if _configurado:
+        return
+    _configurado = True
+    saida = logging.StreamHandler(sys.stderr)
+    formato = (formato or os.environ.get('LOG_FORMATO') or 'texto').lower()
+    saida.setFormatter(FormatoJSON() if formato == 'json' else FormatoTexto())
+    raiz = logging.getLogger()
+    raiz.addHandler(saida)
+    raiz.setLevel((nivel or os.environ.get('LOG_NIVEL') or 'INFO').upper())
@@ -0,0 +1,242 @@
+"""Geração de boletins em lote (turma inteira ou lista de matrículas)
+
+Os PDFs são renderizados em um pool de processos e entregues em partes,
+conforme ficam prontos, seja como um ZIP com um boletim por aluno ou como
+um único PDF com todas as páginas.
+
+Uso pela linha de comando:
+
+    python lote_boletins.py --serie "9º Ano - Fundamental II" --saida boletins.zip
+    python lote_boletins.py --matriculas 2024001 2024002 --formato pdf --saida boletins.pdf
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import metricas
+
+FORMATOS = ('zip', 'pdf')
+
+# Abaixo disso não compensa enviar o trabalho para outros processos
+MINIMO_PARA_POOL = 4
+
+TAMANHO_PARTE = 64 * 1024
+
+# Medidas feitas no processo que recebe o PDF (a renderização roda no pool)
+DURACAO_RENDERIZACAO = metricas.histograma(
+    'boletim_pdf_renderizacao_segundos', 'Tempo de renderização dos boletins em PDF', ('modo',))
+TAMANHO_PDF = metricas.histograma(
+    'boletim_pdf_bytes', 'Tamanho dos boletins em PDF gerados', ('modo',), metricas.FAIXAS_BYTES)
+
+_executor = None
+_executor_lock = threading.Lock()
+_vagas_isoladas = None
+
+
+class PDFOcupadoError(Exception):
+    """Todas as vagas de renderização estão em uso; tente de novo em instantes"""
+
+
+def numero_processos():
+    return int(os.environ.get('BOLETIM_PROCESSOS') or os.cpu_count() or 1)
+
+
+def executor_pdf():
+    """Pool de processos compartilhado para renderização de PDFs (criado sob demanda)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn evita herdar locks de threads do servidor web no fork
+            _executor = ProcessPoolExecutor(
+                max_workers=numero_processos(),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def encerrar_executor_pdf():
+    """Encerra o pool de processos, se tiver sido criado"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _vagas():
+    global _vagas_isoladas
+    with _executor_lock:
+        if _vagas_isoladas is None:
+            limite = int(os.environ.get('BOLETIM_SIMULTANEOS') or numero_processos() * 2)
+            _vagas_isoladas = threading.BoundedSemaphore(limite)
+        return _vagas_isoladas
+
+
+def renderizar_isolado(aluno, notas, emitido_em=None, tempo_espera=10.0):
+    """Renderiza um boletim no pool de processos, fora da thread que atende a requisição
+
+    A renderização usa CPU sem liberar o GIL; feita no pool, não atrasa as
+    rotas leves atendidas pelas outras threads do mesmo worker. Há no máximo
+    BOLETIM_SIMULTANEOS renderizações pendentes por processo; acima disso
+    espera até ``tempo_espera`` segundos e lança PDFOcupadoError.
+    """
+    vagas = _vagas()
+    if not vagas.acquire(timeout=tempo_espera):
+        raise PDFOcupadoError()
+    try:
+        _, conteudo, segundos = executor_pdf().submit(renderizar_boletim, (aluno, notas, emitido_em)).result()
+    finally:
+        vagas.release()
+    _registrar_renderizacao('individual', segundos, len(conteudo))
+    return conteudo
+
+
+def _registrar_renderizacao(modo, segundos, tamanho):
+    DURACAO_RENDERIZACAO.observar(segundos, modo)
+    TAMANHO_PDF.observar(tamanho, modo)
+
+
+def nome_arquivo_boletim(aluno):
+    return f"BOLETIM_{aluno.matricula}_{aluno.nome_completo.replace(' ', '_')}.pdf"
+
+
+def renderizar_boletim(item):
+    """Renderiza um boletim; executado nos processos do pool
+
+    ``item`` é (aluno, notas) ou (aluno, notas, emitido_em); sem a data de
+    emissão, vale a hora atual. Retorna (nome do arquivo, bytes do PDF, segundos de renderização).
+    """
+    # pdf_generator (e as tabelas de larguras de fonte do fpdf) só é importado
+    # por quem de fato gera PDFs
+    from pdf_generator import gerar_boletim_bytes
+    aluno, notas = item[:2]
+    emitido_em = item[2] if len(item) > 2 else None
+    inicio = time.perf_counter()
+    conteudo = gerar_boletim_bytes(aluno, notas, emitido_em)
+    return nome_arquivo_boletim(aluno), conteudo, time.perf_counter() - inicio
+
+
+def renderizar_pdf_unico(alunos_notas):
+    from pdf_generator import gerar_boletins_unico_pdf
+    inicio = time.perf_counter()
+    conteudo = gerar_boletins_unico_pdf(alunos_notas)
+    return conteudo, time.perf_counter() - inicio
+
+
+def _mapear_em_ordem(funcao, itens):
+    """Como executor.map, mas com no máximo algumas tarefas à frente do consumidor"""
+    if len(itens) < MINIMO_PARA_POOL:
+        for item in itens:
+            yield funcao(item)
+        return
+
+    executor = executor_pdf()
+    janela = numero_processos() * 2
+    pendentes = deque()
+    for item in itens:
+        pendentes.append(executor.submit(funcao, item))
+        if len(pendentes) >= janela:
+            yield pendentes.popleft().result()
+    while pendentes:
+        yield pendentes.popleft().result()
+
+
+class _SaidaEmPartes(io.RawIOBase):
+    """Destino não pesquisável do ZipFile que acumula os bytes até serem lidos"""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def retirar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def gerar_zip(alunos_notas, progresso=None):
+    """Gera o ZIP dos boletins em partes, à medida que cada PDF fica pronto"""
+    saida = _SaidaEmPartes()
+    total = len(alunos_notas)
+    with zipfile.ZipFile(saida, 'w', zipfile.ZIP_STORED) as arquivo_zip:
+        for feitos, (nome, conteudo, segundos) in enumerate(_mapear_em_ordem(renderizar_boletim, alunos_notas), start=1):
+            _registrar_renderizacao('lote', segundos, len(conteudo))
+            arquivo_zip.writestr(nome, conteudo)
+            if progresso:
+                progresso(feitos, total)
+            yield saida.retirar()
+    yield saida.retirar()
+
+
+def gerar_pdf_unico(alunos_notas, progresso=None):
+    """Gera um único PDF com todos os boletins e o entrega em partes
+
+    O documento precisa estar completo para ser escrito (a tabela de
+    referências fica no fim do arquivo), então a renderização é feita de uma
+    vez em um processo do pool e só a entrega é feita em partes.
+    """
+    if len(alunos_notas) < MINIMO_PARA_POOL:
+        conteudo, segundos = renderizar_pdf_unico(alunos_notas)
+    else:
+        conteudo, segundos = executor_pdf().submit(renderizar_pdf_unico, alunos_notas).result()
+    _registrar_renderizacao('pdf_unico', segundos, len(conteudo))
+    if progresso:
+        progresso(len(alunos_notas), len(alunos_notas))
+    visao = memoryview(conteudo)
+    for inicio in range(0, len(conteudo), TAMANHO_PARTE):
+        yield bytes(visao[inicio:inicio + TAMANHO_PARTE])
+
+
+def gerar_lote(alunos_notas, formato='zip', progresso=None):
+    """Retorna o gerador de partes do lote no formato pedido ('zip' ou 'pdf')"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+    if formato == 'zip':
+        return gerar_zip(alunos_notas, progresso)
+    return gerar_pdf_unico(alunos_notas, progresso)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera boletins em lote')
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument('--serie', help='gera os boletins de todos os alunos da série')
+    grupo.add_argument('--matriculas', nargs='+', help='gera os boletins destas matrículas')
+    parser.add_argument('--formato', choices=FORMATOS, default='zip')
+    parser.add_argument('--saida', required=True, help='arquivo de saída')
+    args = parser.parse_args()
+
+    from database import Database
+    db = Database()
+    alunos_notas = db.buscar_alunos_com_notas(serie=args.serie, matriculas=args.matriculas)
+    if not alunos_notas:
+        print("❌ Nenhum aluno encontrado")
+        raise SystemExit(1)
+
+    def mostrar_progresso(feitos, total):
+        print(f"📄 {feitos}/{total} boletins", end='\r')
+
+    with open(args.saida, 'wb') as saida:
+        for parte in gerar_lote(alunos_notas, args.formato, mostrar_progresso):
+            saida.write(parte)
+    print(f"\n✅ {len(alunos_notas)} boletins gravados em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,77 +1,165 @@
-from flask import Flask, render_template, request, send_file, jsonify, redirect, url_for, make_response
-from database import Database
-from pdf_generator import gerar_boletim_pdf
+from flask import Flask, Response, current_app, g, render_template, request, send_file, jsonify, redirect, url_for, make_response
+from database import Database, MatriculaDuplicadaError
+from cache_pdf import CachePDF, chave_boletim
+from lote_boletins import gerar_lote, renderizar_isolado, encerrar_executor_pdf, PDFOcupadoError, FORMATOS
+from fila_pdf import criar_fila, CONCLUIDA
+from analitica import Analitica, SECOES
+from autenticacao import CacheTokens, RepositorioUsuarios, VerificadorSenhas, SenhasOcupadasError, ALGORITMO
+from importacao import importar, validar_correcao, ErroImportacao, TAMANHO_LOTE_PADRAO
+from logs import configurar_logs
+import metricas
 import io
+import logging
 import os
+import time
 from datetime import datetime, timedelta
 import jwt
 from functools import wraps
-from werkzeug.security import check_password_hash, generate_password_hash
-
-# Configurar o Flask para encontrar os templates
-app = Flask(__name__, template_folder='templates')
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
-
-db = Database()
-
-print("=" * 50)
-print("🚀 SISTEMA DE BOLETIM ESCOLAR COM LOGIN")
-print("=" * 50)
-print(f"📁 Diretório atual: {os.getcwd()}")
-print(f"📁 Pasta templates existe: {os.path.exists('templates')}")
-
-if os.path.exists('templates'):
-    print(f"📄 Arquivos nos templates: {os.listdir('templates')}")
-else:
-    print("❌ ERRO: Pasta templates não encontrada!")
-
-# ==================== CONFIGURAÇÃO DE USUÁRIOS ====================
-users_db = {
-    'professor@escola.com': {
-        'password_hash': generate_password_hash('123456'),
-        'user_type': 'professor',
-        'name': 'Professor João Silva',
-        'active': True
-    },
-    'secretaria@escola.com': {
-        'password_hash': generate_password_hash('123456'),
-        'user_type': 'secretaria', 
-        'name': 'Secretária Maria Santos',
-        'active': True
-    }
-}
+
+TAMANHO_PAGINA_PADRAO = 50
+TAMANHO_PAGINA_MAXIMO = 200
+MAXIMO_CORRECOES = 10000
+
+log = logging.getLogger(__name__)
+
+DURACAO_REQUISICOES = metricas.histograma(
+    'boletim_http_segundos', 'Duração das requisições por rota', ('rota', 'metodo', 'status'))
+
+# Serviços da aplicação, criados por create_app (importar este módulo não
+# abre banco, não lê disco e não inicia threads)
+db = None
+cache_pdf = None
+analitica = None
+fila = None
+tokens = None
+usuarios = None
+
+# Rotas declaradas neste módulo e registradas na aplicação por create_app
+_rotas = []
+
+def rota(regra, **opcoes):
+    def registrar(funcao):
+        _rotas.append((regra, funcao, opcoes))
+        return funcao
+    return registrar
+
+def create_app(iniciar_workers=True):
+    """Cria a aplicação Flask e os serviços de que as rotas dependem"""
+    global db, cache_pdf, analitica, fila, tokens, usuarios
+
+    configurar_logs()
+    app = Flask(__name__, template_folder='templates')
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
+
+    db = Database()
+    db.init_db()
+
+    cache_pdf = CachePDF(
+        os.environ.get('CACHE_PDF_DIR', 'cache_pdf'),
+        int(os.environ.get('CACHE_PDF_MAX_MB', 200)) * 1024 * 1024
+    )
+    db.registrar_ao_alterar_aluno(cache_pdf.invalidar)
+
+    analitica = Analitica(db)
+
+    # Fila de tarefas em segundo plano; com FILA_WORKERS=0 os workers
+    # rodam em outro processo (python fila_pdf.py)
+    fila = criar_fila()
+    if iniciar_workers:
+        iniciar_workers_fila()
+
+    # Usuários ficam na tabela Usuarios; tokens verificados e usuários lidos
+    # ficam em cache para não repetir o trabalho a cada requisição
+    tokens = CacheTokens(
+        app.config['SECRET_KEY'],
+        tamanho_maximo=int(os.environ.get('CACHE_TOKENS_MAX', 1024)),
+        ttl_maximo=float(os.environ.get('CACHE_TOKENS_TTL', 300))
+    )
+    usuarios = RepositorioUsuarios(
+        db,
+        ttl=float(os.environ.get('CACHE_USUARIOS_TTL', 60)),
+        verificador=VerificadorSenhas(
+            int(os.environ.get('SENHA_VERIFICACOES_SIMULTANEAS', 0)) or None,
+            float(os.environ.get('SENHA_TEMPO_ESPERA', 5))
+        )
+    )
+
+    # Estatísticas lidas só quando /metrics é consultada
+    metricas.estatisticas('boletim_pool', 'Pool de conexões do banco', db.estatisticas_pool)
+    metricas.estatisticas('boletim_cache', 'Caches da aplicação', cache_pdf.estatisticas, cache='pdf')
+    metricas.estatisticas('boletim_cache', 'Caches da aplicação', tokens.estatisticas, cache='tokens')
+    metricas.estatisticas('boletim_cache', 'Caches da aplicação', usuarios.estatisticas, cache='usuarios')
+    metricas.estatisticas('boletim_cache', 'Caches da aplicação', db.estatisticas_cache_alunos, cache='alunos')
+
+    app.before_request(_iniciar_cronometro)
+    app.after_request(_medir_requisicao)
+    for regra, funcao, opcoes in _rotas:
+        app.add_url_rule(regra, view_func=funcao, **opcoes)
+    return app
+
+def _iniciar_cronometro():
+    g.inicio_requisicao = time.perf_counter()
+
+def _medir_requisicao(resposta):
+    # A regra (/sistema/aluno/<matricula>) e não o caminho, para não criar uma série por aluno
+    regra = request.url_rule.rule if request.url_rule else 'desconhecida'
+    DURACAO_REQUISICOES.observar(
+        time.perf_counter() - g.inicio_requisicao, regra, request.method, str(resposta.status_code)
+    )
+    return resposta
+
+def iniciar_workers_fila():
+    """Inicia as threads da fila neste processo (no gunicorn, em cada worker após o fork)"""
+    fila.iniciar_workers(int(os.environ.get('FILA_WORKERS', 2)), db)
+
+def encerrar():
+    """Para os workers da fila e libera conexões e processos deste processo"""
+    if fila:
+        fila.parar(timeout=5)
+    if db:
+        db.fechar()
+    encerrar_executor_pdf()
 
 # ==================== DECORATORS DE AUTENTICAÇÃO ====================
+USUARIO_INATIVO = '/login?error=Usuário inativo'
+
+def verificar_token(token):
+    """Retorna (payload, None) se o token do cookie vale, ou (None, página de login para onde redirecionar)"""
+    if not token:
+        return None, '/login'
+    try:
+        return tokens.verificar(token), None
+    except jwt.ExpiredSignatureError:
+        return None, '/login?error=Token expirado'
+    except jwt.InvalidTokenError:
+        return None, '/login?error=Token inválido'
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = request.cookies.get('token')
+        payload, destino = verificar_token(request.cookies.get('token'))
+        if destino:
+            return redirect(destino)
         
-        if not token:
-            return redirect('/login')
-        
-        try:
-            payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            request.user = payload
-        except jwt.ExpiredSignatureError:
-            return redirect('/login?error=Token expirado')
-        except jwt.InvalidTokenError:
-            return redirect('/login?error=Token inválido')
+        usuario = usuarios.obter(payload.get('email'))
+        if not usuario or not usuario.ativo:
+            return redirect(USUARIO_INATIVO)
+        request.user = payload
         
         return f(*args, **kwargs)
     return decorated_function
 
 # ==================== ROTAS DE AUTENTICAÇÃO ====================
-@app.route('/')
+@rota('/')
 def index():
     return redirect('/login')
 
-@app.route('/login')
+@rota('/login')
 def login_page():
     error = request.args.get('error', '')
     return render_template('login.html', error=error)
 
-@app.route('/api/auth/login', methods=['POST'])
+@rota('/api/auth/login', methods=['POST'])
 def login_api():
     try:
         data = request.get_json()
@@ -83,33 +171,34 @@ def login_api():
         if not email or not password:
             return jsonify({'success': False, 'message': 'E-mail e senha são obrigatórios'}), 400
 
-        # Verificar usuário
-        user = users_db.get(email)
-        if not user or not user['active']:
-            return jsonify({'success': False, 'message': 'Credenciais inválidas'}), 401
-
-        # Verificar senha
-        if not check_password_hash(user['password_hash'], password):
+        # Verificar usuário e senha
+        try:
+            user = usuarios.autenticar(email, password)
+        except SenhasOcupadasError:
+            resposta = jsonify({'success': False, 'message': 'Servidor ocupado, tente novamente'})
+            resposta.headers['Retry-After'] = '1'
+            return resposta, 503
+        if not user:
             return jsonify({'success': False, 'message': 'Credenciais inválidas'}), 401
 
         # Verificar tipo de usuário
-        if user['user_type'] != user_type:
+        if user.tipo != user_type:
             return jsonify({'success': False, 'message': 'Tipo de acesso incorreto'}), 403
 
         # Gerar token JWT
         token = jwt.encode({
             'email': email,
-            'user_type': user['user_type'],
-            'name': user['name'],
+            'user_type': user.tipo,
+            'name': user.nome,
             'exp': datetime.utcnow() + timedelta(hours=24)
-        }, app.config['SECRET_KEY'], algorithm='HS256')
+        }, current_app.config['SECRET_KEY'], algorithm=ALGORITMO)
 
         response = jsonify({
             'success': True,
             'user': {
                 'email': email,
-                'name': user['name'],
-                'user_type': user['user_type']
+                'name': user.nome,
+                'user_type': user.tipo
             }
         })
 
@@ -125,28 +214,46 @@ def login_api():
 
         return response
 
-    except Exception as e:
-        print(f'Erro no login: {str(e)}')
+    except Exception:
+        log.exception("Erro no login")
         return jsonify({'success': False, 'message': 'Erro interno do servidor'}), 500
 
-@app.route('/logout')
+@rota('/logout')
 def logout():
+    token = request.cookies.get('token')
+    if token:
+        tokens.revogar(token)
     response = redirect('/login')
     response.set_cookie('token', '', expires=0)
     return response
 
 # ==================== ROTAS DO SISTEMA (PROTEGIDAS) ====================
-@app.route('/sistema')
+def _parametros_pagina():
+    """Lê termo de busca, tamanho de página e cursor da query string"""
+    termo_busca = request.args.get('busca', '')
+    limite = request.args.get('limite', TAMANHO_PAGINA_PADRAO, type=int)
+    limite = max(1, min(limite, TAMANHO_PAGINA_MAXIMO))
+    cursor = request.args.get('cursor') or None
+    return termo_busca, limite, cursor
+
+@rota('/sistema')
 @login_required
 def sistema_index():
     try:
-        termo_busca = request.args.get('busca', '')
-        alunos = db.buscar_alunos(termo_busca)
-        print(f"✅ Dashboard carregado - {len(alunos)} alunos")
-        return render_template('index.html', alunos=alunos, termo_busca=termo_busca)
+        termo_busca, limite, cursor = _parametros_pagina()
+        try:
+            alunos, proximo_cursor = db.buscar_alunos_pagina(termo_busca, limite, cursor)
+        except ValueError:
+            return redirect(url_for('sistema_index', busca=termo_busca, limite=limite))
+        total = db.contar_alunos(termo_busca)
+        resumos = db.buscar_resumos([aluno.id for aluno in alunos])
+        log.debug("Dashboard carregado", extra={'alunos': len(alunos), 'total': total})
+        return render_template(
+            'index.html', alunos=alunos, resumos=resumos, termo_busca=termo_busca, total=total,
+            limite=limite, cursor=cursor, proximo_cursor=proximo_cursor
+        )
     except Exception as e:
-        error_msg = f"❌ ERRO: {str(e)}"
-        print(error_msg)
+        log.exception("Erro ao carregar o dashboard")
         return f"""
         <html>
             <body>
@@ -157,54 +264,88 @@ def sistema_index():
         </html>
         """
 
-@app.route('/sistema/aluno/<matricula>')
+@rota('/sistema/aluno/<matricula>')
 @login_required
 def detalhes_aluno(matricula):
     try:
         aluno, notas = db.buscar_aluno_por_matricula(matricula)
         if not aluno:
             return "Aluno não encontrado", 404
-        print(f"✅ Página do aluno carregada - {aluno[1]}")
         return render_template('aluno.html', aluno=aluno, notas=notas)
     except Exception as e:
         return f"Erro: {e}"
 
-@app.route('/sistema/gerar_boletim/<matricula>')
+class _LeitorBytes(io.RawIOBase):
+    """Leitura em partes de um bytes sem copiá-lo (io.BytesIO copia ao expor o buffer)"""
+
+    def __init__(self, dados):
+        self._dados = memoryview(dados)
+        self._posicao = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        parte = self._dados[self._posicao:self._posicao + len(destino)]
+        destino[:len(parte)] = parte
+        self._posicao += len(parte)
+        return len(parte)
+
+@rota('/sistema/gerar_boletim/<matricula>')
 @login_required
 def gerar_boletim(matricula):
     try:
-        print(f"🔍 Buscando aluno com matrícula: {matricula}")
         aluno, notas = db.buscar_aluno_por_matricula(matricula)
         
         if not aluno:
-            print("❌ Aluno não encontrado")
             return "Aluno não encontrado", 404
         
-        print(f"📊 Gerando PDF para: {aluno[1]} - {len(notas)} disciplinas")
+        # A data de emissão é a da última alteração dos dados, para que o
+        # PDF em cache seja o mesmo que seria renderizado agora; o hash do
+        # conteúdo serve como chave do cache e como ETag
+        emitido_em = db.alterado_em(aluno.id) or datetime.now()
+        chave = chave_boletim(aluno, notas, emitido_em)
+        if chave in request.if_none_match:
+            resposta = make_response('', 304)
+            resposta.set_etag(chave)
+            return resposta
         
-        # Gerar PDF
-        pdf = gerar_boletim_pdf(aluno, notas)
-        
-        # Criar arquivo em memória
-        pdf_output = pdf.output(dest='S')
+        # Do cache, o arquivo é enviado em partes direto do disco (ou por
+        # sendfile no gunicorn); renderizado agora, em partes do único buffer
+        arquivo = cache_pdf.abrir(aluno.id, chave)
+        if arquivo is not None:
+            tamanho = os.fstat(arquivo.fileno()).st_size
+        else:
+            try:
+                pdf_output = renderizar_isolado(aluno, notas, emitido_em)
+            except PDFOcupadoError:
+                log.warning("Boletim recusado: renderizações esgotadas", extra={'matricula': matricula})
+                resposta = make_response("Muitos boletins sendo gerados, tente novamente", 503)
+                resposta.headers['Retry-After'] = '2'
+                return resposta
+            cache_pdf.guardar(aluno.id, chave, pdf_output)
+            arquivo, tamanho = _LeitorBytes(pdf_output), len(pdf_output)
         
         # Nome do arquivo
-        nome_aluno = aluno[1].replace(' ', '_')
+        nome_aluno = aluno.nome_completo.replace(' ', '_')
         nome_arquivo = f"BOLETIM_{nome_aluno}.pdf"
         
-        print(f"📥 Enviando arquivo: {nome_arquivo}")
-        
-        return send_file(
-            io.BytesIO(pdf_output),
+        resposta = send_file(
+            arquivo,
             as_attachment=True,
             download_name=nome_arquivo,
-            mimetype='application/pdf'
+            mimetype='application/pdf',
+            etag=chave,
+            max_age=0
         )
+        # send_file só conhece o tamanho de caminhos e BytesIO
+        resposta.content_length = tamanho
+        resposta.cache_control.private = True
+        resposta.cache_control.no_cache = True
+        return resposta
         
     except Exception as e:
-        print(f"❌ ERRO na geração do PDF: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Erro na geração do boletim", extra={'matricula': matricula})
         return f"""
         <html>
             <body>
@@ -215,7 +356,96 @@ def gerar_boletim(matricula):
         </html>
         """, 500
 
-@app.route('/sistema/adicionar_aluno')
+@rota('/sistema/gerar_boletins')
+@login_required
+def gerar_boletins_lote():
+    """Gera os boletins de uma série ou lista de matrículas em ZIP ou PDF único"""
+    serie = request.args.get('serie', '').strip()
+    matriculas = [m.strip() for m in request.args.get('matriculas', '').split(',') if m.strip()]
+    formato = request.args.get('formato', 'zip')
+
+    if not serie and not matriculas:
+        return "Informe a série ou a lista de matrículas", 400
+    if formato not in FORMATOS:
+        return f"Formato inválido: {formato}", 400
+
+    alunos_notas = db.buscar_alunos_com_notas(serie=serie or None, matriculas=matriculas or None)
+    if not alunos_notas:
+        return "Nenhum aluno encontrado", 404
+
+    log.info("Gerando boletins em lote", extra={'boletins': len(alunos_notas), 'formato': formato})
+
+    nome_arquivo = f"BOLETINS_{(serie or 'selecionados').replace(' ', '_')}.{formato}"
+    return Response(
+        gerar_lote(alunos_notas, formato),
+        mimetype='application/zip' if formato == 'zip' else 'application/pdf',
+        headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'}
+    )
+
+@rota('/sistema/tarefas/boletins', methods=['POST'])
+@login_required
+def enfileirar_boletins():
+    """Enfileira a geração de boletins em lote e retorna o id da tarefa"""
+    dados = request.get_json(silent=True) or request.form
+    serie = (dados.get('serie') or '').strip()
+    matriculas = dados.get('matriculas') or []
+    if isinstance(matriculas, str):
+        matriculas = [m.strip() for m in matriculas.split(',') if m.strip()]
+    formato = dados.get('formato', 'zip')
+
+    if not serie and not matriculas:
+        return jsonify({'success': False, 'message': 'Informe a série ou a lista de matrículas'}), 400
+    if formato not in FORMATOS:
+        return jsonify({'success': False, 'message': f'Formato inválido: {formato}'}), 400
+
+    tarefa_id = fila.enfileirar('boletins', {'serie': serie, 'matriculas': matriculas, 'formato': formato})
+    log.info("Tarefa de boletins enfileirada", extra={'tarefa': tarefa_id, 'formato': formato})
+    return jsonify({
+        'success': True,
+        'tarefa': tarefa_id,
+        'status_url': f'/sistema/tarefas/{tarefa_id}'
+    }), 202
+
+@rota('/sistema/tarefas/<tarefa_id>')
+@login_required
+def status_tarefa(tarefa_id):
+    """Situação e progresso de uma tarefa em segundo plano"""
+    tarefa = fila.obter(tarefa_id)
+    if not tarefa:
+        return jsonify({'success': False, 'message': 'Tarefa não encontrada'}), 404
+
+    resposta = {
+        'tarefa': tarefa['id'],
+        'status': tarefa['status'],
+        'progresso': tarefa['progresso'],
+        'total': tarefa['total'],
+        'percentual': round(100 * tarefa['progresso'] / tarefa['total'], 1) if tarefa['total'] else 0,
+        'erro': tarefa['erro'],
+    }
+    if tarefa['status'] == CONCLUIDA:
+        resposta['download_url'] = f'/sistema/tarefas/{tarefa_id}/download'
+    return jsonify(resposta)
+
+@rota('/sistema/tarefas/<tarefa_id>/download')
+@login_required
+def download_tarefa(tarefa_id):
+    """Baixa o resultado de uma tarefa concluída"""
+    tarefa = fila.obter(tarefa_id)
+    if not tarefa:
+        return "Tarefa não encontrada", 404
+    if tarefa['status'] != CONCLUIDA or not os.path.exists(tarefa['arquivo']):
+        return "Resultado ainda não disponível", 409
+
+    formato = tarefa['parametros'].get('formato', 'zip')
+    serie = tarefa['parametros'].get('serie') or 'selecionados'
+    return send_file(
+        os.path.abspath(tarefa['arquivo']),
+        as_attachment=True,
+        download_name=f"BOLETINS_{serie.replace(' ', '_')}.{formato}",
+        mimetype='application/zip' if formato == 'zip' else 'application/pdf'
+    )
+
+@rota('/sistema/adicionar_aluno')
 @login_required
 def adicionar_aluno_form():
     """Exibe o formulário para adicionar novo aluno"""
@@ -225,7 +455,7 @@ def adicionar_aluno_form():
     except Exception as e:
         return f"Erro: {e}"
 
-@app.route('/sistema/adicionar_aluno', methods=['POST'])
+@rota('/sistema/adicionar_aluno', methods=['POST'])
 @login_required
 def adicionar_aluno():
     """Processa o formulário de adicionar aluno"""
@@ -237,8 +467,21 @@ def adicionar_aluno():
         serie = request.form['serie']
         nome_responsavel = request.form['nome_responsavel']
 
-        # Verificar se matrícula já existe
-        if db.verificar_matricula_existe(matricula):
+        # Notas de cada disciplina
+        disciplinas = db.get_disciplinas_padrao()
+        notas = []
+        for i, disciplina in enumerate(disciplinas):
+            nota1 = float(request.form.get(f'nota1_{i}', 0))
+            nota2 = float(request.form.get(f'nota2_{i}', 0))
+            frequencia = float(request.form.get(f'frequencia_{i}', 0))
+            notas.append((disciplina, nota1, nota2, frequencia))
+
+        # Inserir aluno e notas em uma única transação
+        try:
+            aluno_id = db.matricular_aluno(
+                nome_completo, data_nascimento, serie, nome_responsavel, matricula, notas
+            )
+        except MatriculaDuplicadaError:
             return f"""
             <html>
                 <body>
@@ -249,28 +492,12 @@ def adicionar_aluno():
             </html>
             """, 400
 
-        # Inserir aluno
-        aluno_id = db.inserir_aluno(
-            nome_completo, data_nascimento, serie, nome_responsavel, matricula
-        )
-
-        # Inserir notas para cada disciplina
-        disciplinas = db.get_disciplinas_padrao()
-        for i, disciplina in enumerate(disciplinas):
-            nota1 = float(request.form.get(f'nota1_{i}', 0))
-            nota2 = float(request.form.get(f'nota2_{i}', 0))
-            frequencia = float(request.form.get(f'frequencia_{i}', 0))
-            
-            db.inserir_nota(aluno_id, disciplina, nota1, nota2, frequencia)
-
-        print(f"✅ Novo aluno cadastrado: {nome_completo} (ID: {aluno_id})")
+        log.info("Aluno cadastrado", extra={'aluno_id': aluno_id, 'matricula': matricula})
         
         return redirect(f'/sistema/aluno/{matricula}')
 
     except Exception as e:
-        print(f"❌ Erro ao cadastrar aluno: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Erro ao cadastrar aluno")
         return f"""
         <html>
             <body>
@@ -281,7 +508,32 @@ def adicionar_aluno():
         </html>
         """, 500
 
-@app.route('/sistema/confirmar_remocao/<matricula>')
+@rota('/sistema/importar', methods=['POST'])
+@login_required
+def importar_alunos():
+    """Importa alunos e notas em massa a partir de um arquivo CSV ou XLSX"""
+    arquivo = request.files.get('arquivo')
+    if not arquivo or not arquivo.filename:
+        return jsonify({'success': False, 'message': 'Envie um arquivo no campo "arquivo"'}), 400
+
+    tamanho_lote = request.form.get('tamanho_lote', TAMANHO_LOTE_PADRAO, type=int)
+    tamanho_lote = max(1, min(tamanho_lote, 10000))
+
+    try:
+        relatorio = importar(db, arquivo.stream, arquivo.filename, tamanho_lote)
+    except ErroImportacao as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        log.exception("Erro na importação", extra={'arquivo': arquivo.filename})
+        return jsonify({'success': False, 'message': f'Erro na importação: {e}'}), 500
+
+    log.info("Importação concluída", extra={
+        'alunos': relatorio['alunos_inseridos'], 'notas': relatorio['notas_inseridas'],
+        'linhas_por_segundo': relatorio['linhas_por_segundo']
+    })
+    return jsonify({'success': True, **relatorio})
+
+@rota('/sistema/confirmar_remocao/<matricula>')
 @login_required
 def confirmar_remocao(matricula):
     """Página de confirmação para remover aluno"""
@@ -294,7 +546,7 @@ def confirmar_remocao(matricula):
     except Exception as e:
         return f"Erro: {e}"
 
-@app.route('/sistema/remover_aluno/<matricula>', methods=['POST'])
+@rota('/sistema/remover_aluno/<matricula>', methods=['POST'])
 @login_required
 def remover_aluno(matricula):
     """Remove um aluno do sistema"""
@@ -302,7 +554,7 @@ def remover_aluno(matricula):
         sucesso, mensagem = db.remover_aluno(matricula)
         
         if sucesso:
-            print(f"✅ Aluno removido: {matricula}")
+            log.info("Aluno removido", extra={'matricula': matricula})
             return redirect('/sistema')
         else:
             return f"""
@@ -316,29 +568,120 @@ def remover_aluno(matricula):
             """, 500
             
     except Exception as e:
-        print(f"❌ Erro ao remover aluno: {e}")
+        log.exception("Erro ao remover aluno", extra={'matricula': matricula})
         return f"Erro ao remover aluno: {e}", 500
 
 # ==================== APIs DO SISTEMA (PROTEGIDAS) ====================
-@app.route('/sistema/api/buscar_alunos')
+@rota('/sistema/api/buscar_alunos')
 @login_required
 def api_buscar_alunos():
-    termo_busca = request.args.get('busca', '')
-    alunos = db.buscar_alunos(termo_busca)
-    return jsonify({'alunos': alunos})
-
-@app.route('/sistema/api/verificar_matricula/<matricula>')
+    termo_busca, limite, cursor = _parametros_pagina()
+    try:
+        alunos, proximo_cursor = db.buscar_alunos_pagina(termo_busca, limite, cursor)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    resposta = {'alunos': alunos, 'proximo_cursor': proximo_cursor}
+    # O total custa uma contagem extra; só é calculado quando pedido
+    if request.args.get('incluir_total') == '1':
+        resposta['total'] = db.contar_alunos(termo_busca)
+    return jsonify(resposta)
+
+@rota('/sistema/api/verificar_matricula/<matricula>')
 @login_required
 def api_verificar_matricula(matricula):
     existe = db.verificar_matricula_existe(matricula)
     return jsonify({'existe': existe})
 
-# ==================== ROTA DE SAÚDE ====================
-@app.route('/health')
+@rota('/sistema/api/historico/<matricula>')
+@login_required
+def api_historico(matricula):
+    """Histórico do aluno por ano letivo, com a nota de cada período (?de=2022&ate=2024)"""
+    aluno, historico = db.buscar_historico(
+        matricula, request.args.get('de', type=int), request.args.get('ate', type=int))
+    if not aluno:
+        return jsonify({'success': False, 'message': 'Aluno não encontrado'}), 404
+    return jsonify({
+        'aluno': aluno._asdict(),
+        'anos': [{
+            'ano_letivo': ano,
+            'notas': [dict(nota._asdict(), avaliacoes=list(avaliacoes)) for nota, avaliacoes in notas],
+        } for ano, notas in historico.items()],
+    })
+
+@rota('/sistema/api/notas', methods=['POST'])
+@login_required
+def api_atualizar_notas():
+    """Correção de notas em massa: {"notas": [{matricula, disciplina, nota_1, nota_2, frequencia}]}"""
+    dados = request.get_json(silent=True) or {}
+    itens = dados.get('notas')
+    if not isinstance(itens, list) or not itens:
+        return jsonify({'success': False, 'message': 'Envie a lista "notas"'}), 400
+    if len(itens) > MAXIMO_CORRECOES:
+        return jsonify({'success': False, 'message': f'Máximo de {MAXIMO_CORRECOES} notas por envio'}), 400
+
+    correcoes = []
+    erros = []
+    for indice, item in enumerate(itens):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Cada nota deve ser um objeto")
+            correcoes.append(validar_correcao(item))
+        except ValueError as e:
+            erros.append({'indice': indice, 'erro': str(e)})
+    # Tudo ou nada: com qualquer item inválido, nada é gravado
+    if erros:
+        return jsonify({'success': False, 'message': 'Notas inválidas', 'erros': erros}), 400
+
+    alunos, alteradas, nao_encontradas = db.atualizar_notas(correcoes)
+    log.info("Notas corrigidas", extra={'notas': alteradas, 'alunos': len(alunos)})
+    return jsonify({
+        'success': True,
+        'notas_alteradas': alteradas,
+        'alunos_alterados': len(alunos),
+        'matriculas_nao_encontradas': sorted(nao_encontradas),
+    })
+
+@rota('/sistema/api/analitica')
+@login_required
+def api_analitica():
+    """Painel de indicadores de uma série ou, sem série, da escola inteira"""
+    serie = request.args.get('serie') or None
+    limite_ranking = max(1, min(request.args.get('ranking', 10, type=int), 100))
+    return jsonify(analitica.painel(serie, limite_ranking))
+
+@rota('/sistema/api/analitica/<secao>')
+@login_required
+def api_analitica_secao(secao):
+    """Um indicador do painel: resumo, disciplinas, frequencia, ranking ou series"""
+    if secao not in SECOES:
+        return jsonify({'success': False, 'message': f'Indicador desconhecido: {secao}'}), 404
+    serie = request.args.get('serie') or None
+    limite_ranking = max(1, min(request.args.get('ranking', 10, type=int), 100))
+    return jsonify({secao: analitica.secao(secao, serie, limite_ranking)})
+
+# ==================== SAÚDE E MÉTRICAS ====================
+@rota('/health')
 def health():
-    return jsonify({'status': 'healthy', 'service': 'Sistema de Boletim Escolar'})
+    return jsonify({
+        'status': 'healthy',
+        'service': 'Sistema de Boletim Escolar',
+        'pool_conexoes': db.estatisticas_pool(),
+        'cache_pdf': cache_pdf.estatisticas(),
+        'cache_tokens': tokens.estatisticas(),
+        'cache_usuarios': usuarios.estatisticas(),
+        'cache_alunos': db.estatisticas_cache_alunos()
+    })
+
+@rota('/metrics')
+def metrics():
+    """Métricas deste processo no formato de texto do Prometheus"""
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    app = create_app()
+    print("=" * 50)
+    print("🚀 SISTEMA DE BOLETIM ESCOLAR COM LOGIN")
+    print("=" * 50)
     print("🌐 Servidor iniciado!")
     print("🔐 Página de login: http://localhost:5000/login")
     print("📊 Sistema principal: http://localhost:5000/sistema")
@@ -0,0 +1,180 @@
+"""Métricas do processo no formato de texto do Prometheus (rota /metrics)
+
+Três tipos de métrica:
+
+- Contador: total que só cresce (ex.: erros por método do banco);
+- Histograma: distribuição de durações ou tamanhos em faixas fixas;
+- estatísticas coletadas na hora da leitura: dicionários de números, como
+  os de Database.estatisticas_pool() e CacheLRU.estatisticas(), exportados
+  como gauges sem custo nenhum nas requisições.
+
+Registrar uma observação custa uma busca binária nas faixas e um lock curto;
+nada é formatado até alguém ler /metrics. Os valores são do processo: com
+vários workers do gunicorn, cada um tem os seus.
+"""
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Faixas em segundos para durações de requisições e consultas
+FAIXAS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Faixas em bytes para tamanhos de PDF
+FAIXAS_BYTES = (1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144, 1048576)
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _texto_rotulos(nomes, valores):
+    if not nomes:
+        return ''
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nome}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *rotulos, valor=1):
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def amostras(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        return [(self.nome, _texto_rotulos(self.rotulos, chave), valor) for chave, valor in valores]
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), faixas=FAIXAS_SEGUNDOS):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.faixas = tuple(sorted(faixas))
+        # valores dos rótulos -> [contagem de cada faixa..., acima da última, soma]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *rotulos):
+        indice = bisect_left(self.faixas, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [0] * (len(self.faixas) + 1) + [0.0]
+            serie[indice] += 1
+            serie[-1] += valor
+
+    def amostras(self):
+        with self._lock:
+            series = [(chave, list(serie)) for chave, serie in self._series.items()]
+        linhas = []
+        nomes_faixa = self.rotulos + ('le',)
+        for chave, serie in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.faixas + ('+Inf',), serie):
+                acumulado += quantidade
+                linhas.append((f'{self.nome}_bucket', _texto_rotulos(nomes_faixa, chave + (_numero(limite),)), acumulado))
+            rotulos = _texto_rotulos(self.rotulos, chave)
+            linhas.append((f'{self.nome}_sum', rotulos, serie[-1]))
+            linhas.append((f'{self.nome}_count', rotulos, acumulado))
+        return linhas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = {}
+        self._estatisticas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), faixas=FAIXAS_SEGUNDOS):
+        return self._registrar(Histograma(nome, ajuda, rotulos, faixas))
+
+    def estatisticas(self, prefixo, ajuda, funcao, **rotulos):
+        """Exporta cada número do dicionário retornado por ``funcao`` como ``prefixo_chave``
+
+        Registrar de novo o mesmo prefixo com os mesmos rótulos substitui a função.
+        """
+        with self._lock:
+            self._estatisticas[(prefixo, tuple(sorted(rotulos.items())))] = (ajuda, funcao)
+
+    def exportar(self):
+        """Texto de todas as métricas no formato de exposição do Prometheus"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+            estatisticas = list(self._estatisticas.items())
+
+        linhas = []
+        for metrica in metricas:
+            linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            for nome, rotulos, valor in metrica.amostras():
+                linhas.append(f'{nome}{rotulos} {_numero(valor)}')
+
+        # Famílias de gauges agrupadas por nome (vários caches com o mesmo prefixo)
+        familias = {}
+        for (prefixo, rotulos), (ajuda, funcao) in estatisticas:
+            nomes = tuple(nome for nome, _ in rotulos)
+            valores = tuple(valor for _, valor in rotulos)
+            for chave, valor in funcao().items():
+                if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    continue
+                familia = familias.setdefault(f'{prefixo}_{chave}', (ajuda, []))
+                familia[1].append(f'{prefixo}_{chave}{_texto_rotulos(nomes, valores)} {_numero(valor)}')
+        for nome, (ajuda, amostras) in familias.items():
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} gauge')
+            linhas.extend(amostras)
+        return '\n'.join(linhas) + '\n'
+
+
+# Registro do processo, usado por todos os módulos
+REGISTRO = Registro()
+
+contador = REGISTRO.contador
+histograma = REGISTRO.histograma
+estatisticas = REGISTRO.estatisticas
+exportar = REGISTRO.exportar
+
+
+def cronometrado(duracoes, rotulo, erros=None):
+    """Decorador que observa a duração de cada chamada em ``duracoes`` (e conta as exceções em ``erros``)"""
+    def decorar(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            except Exception:
+                if erros is not None:
+                    erros.incrementar(rotulo)
+                raise
+            finally:
+                duracoes.observar(time.perf_counter() - inicio, rotulo)
+        return medida
+    return decorar
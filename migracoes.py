@@ -0,0 +1,572 @@
+"""Migrações versionadas do esquema do banco (SQLite e PostgreSQL)
+
+Cada migração tem um número de versão e a lista de comandos de cada dialeto.
+As versões aplicadas ficam na tabela schema_version; ao iniciar, só as
+pendentes são executadas, em ordem. Várias instâncias podem iniciar ao mesmo
+tempo: a aplicação é serializada (BEGIN IMMEDIATE no SQLite, advisory lock no
+PostgreSQL) e a versão é conferida de novo depois de obter o lock.
+
+Uso pela linha de comando:
+
+    python migracoes.py            # aplica as pendentes
+    python migracoes.py --status   # só mostra a situação
+"""
+import argparse
+import logging
+from collections import namedtuple
+from datetime import datetime
+
+from logs import configurar_logs
+
+log = logging.getLogger(__name__)
+
+# ``transacional=False`` roda os comandos do PostgreSQL fora de transação,
+# necessário para CREATE INDEX CONCURRENTLY (que não bloqueia escritas).
+# ``relatorio`` é uma consulta opcional (dos dois dialetos) que retorna um
+# número, registrado no log junto com a migração aplicada
+Migracao = namedtuple('Migracao', 'versao descricao sqlite postgres transacional relatorio', defaults=(None,))
+
+# Chave do advisory lock usado pelas migrações no PostgreSQL
+CHAVE_LOCK = 7310201
+
+MIGRACOES = [
+    Migracao(1, 'Tabelas Alunos e Notas', [
+        '''
+        CREATE TABLE IF NOT EXISTS Alunos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome_completo TEXT NOT NULL,
+            data_nascimento TEXT NOT NULL,
+            serie TEXT NOT NULL,
+            nome_do_responsavel TEXT NOT NULL,
+            matricula TEXT UNIQUE NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS Notas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            aluno_id INTEGER NOT NULL,
+            disciplina TEXT NOT NULL,
+            nota_1_bimestre REAL NOT NULL,
+            nota_2_bimestre REAL NOT NULL,
+            media_final REAL NOT NULL,
+            frequencia_percentual REAL NOT NULL,
+            status TEXT NOT NULL,
+            FOREIGN KEY (aluno_id) REFERENCES Alunos (id)
+        )
+        ''',
+    ], [
+        '''
+        CREATE TABLE IF NOT EXISTS alunos (
+            id SERIAL PRIMARY KEY,
+            nome_completo TEXT NOT NULL,
+            data_nascimento TEXT NOT NULL,
+            serie TEXT NOT NULL,
+            nome_do_responsavel TEXT NOT NULL,
+            matricula TEXT UNIQUE NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS notas (
+            id SERIAL PRIMARY KEY,
+            aluno_id INTEGER NOT NULL,
+            disciplina TEXT NOT NULL,
+            nota_1_bimestre REAL NOT NULL,
+            nota_2_bimestre REAL NOT NULL,
+            media_final REAL NOT NULL,
+            frequencia_percentual REAL NOT NULL,
+            status TEXT NOT NULL,
+            FOREIGN KEY (aluno_id) REFERENCES alunos (id) ON DELETE CASCADE
+        )
+        ''',
+    ], True),
+
+    Migracao(2, 'Índice da paginação de alunos por (nome_completo, id)', [
+        'CREATE INDEX IF NOT EXISTS idx_alunos_nome_id ON Alunos (nome_completo, id)',
+    ], [
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alunos_nome_id ON alunos (nome_completo, id)',
+    ], False),
+
+    Migracao(3, 'Índices de busca por nome e matrícula sem acentos', [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS alunos_busca USING fts5(
+            nome_completo, matricula,
+            content='Alunos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''',
+        # Gatilhos que mantêm o índice sincronizado com Alunos
+        '''
+        CREATE TRIGGER IF NOT EXISTS alunos_busca_ai AFTER INSERT ON Alunos BEGIN
+            INSERT INTO alunos_busca (rowid, nome_completo, matricula)
+            VALUES (new.id, new.nome_completo, new.matricula);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS alunos_busca_ad AFTER DELETE ON Alunos BEGIN
+            INSERT INTO alunos_busca (alunos_busca, rowid, nome_completo, matricula)
+            VALUES ('delete', old.id, old.nome_completo, old.matricula);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS alunos_busca_au AFTER UPDATE ON Alunos BEGIN
+            INSERT INTO alunos_busca (alunos_busca, rowid, nome_completo, matricula)
+            VALUES ('delete', old.id, old.nome_completo, old.matricula);
+            INSERT INTO alunos_busca (rowid, nome_completo, matricula)
+            VALUES (new.id, new.nome_completo, new.matricula);
+        END
+        ''',
+        "INSERT INTO alunos_busca (alunos_busca) VALUES ('rebuild')",
+    ], [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE EXTENSION IF NOT EXISTS unaccent',
+        # unaccent() não é IMMUTABLE e por isso não pode ir direto no índice
+        '''
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS
+        $$ SELECT public.unaccent('public.unaccent', $1) $$
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        ''',
+        '''
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alunos_nome_trgm
+        ON alunos USING gin (f_unaccent(lower(nome_completo)) gin_trgm_ops)
+        ''',
+        '''
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alunos_matricula_trgm
+        ON alunos USING gin (matricula gin_trgm_ops)
+        ''',
+    ], False),
+
+    Migracao(4, 'Índices de Notas por aluno e de Alunos por série', [
+        'CREATE INDEX IF NOT EXISTS idx_notas_aluno ON Notas (aluno_id)',
+        'CREATE INDEX IF NOT EXISTS idx_alunos_serie ON Alunos (serie, nome_completo, id)',
+    ], [
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notas_aluno ON notas (aluno_id)',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alunos_serie ON alunos (serie, nome_completo, id)',
+    ], False),
+
+    # As notas removidas ficam em NotasDuplicadas (com a data da remoção) para
+    # conferência ou para desfazer a limpeza
+    Migracao(5, 'Remove notas repetidas por (aluno_id, disciplina), mantendo a mais recente', [
+        '''
+        CREATE TABLE IF NOT EXISTS NotasDuplicadas AS
+        SELECT n.*, datetime('now', 'localtime') AS removida_em FROM Notas n
+        WHERE n.id NOT IN (SELECT MAX(id) FROM Notas GROUP BY aluno_id, disciplina)
+        ''',
+        'DELETE FROM Notas WHERE id IN (SELECT id FROM NotasDuplicadas)',
+    ], [
+        '''
+        CREATE TABLE IF NOT EXISTS notasduplicadas AS
+        SELECT n.*, localtimestamp AS removida_em FROM notas n
+        WHERE n.id NOT IN (SELECT MAX(id) FROM notas GROUP BY aluno_id, disciplina)
+        ''',
+        'DELETE FROM notas WHERE id IN (SELECT id FROM notasduplicadas)',
+    ], True, 'SELECT COUNT(*) FROM NotasDuplicadas'),
+
+    Migracao(6, 'UNIQUE (aluno_id, disciplina) em Notas', [
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_notas_aluno_disciplina ON Notas (aluno_id, disciplina)',
+    ], [
+        'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_notas_aluno_disciplina ON notas (aluno_id, disciplina)',
+    ], False),
+
+    Migracao(7, 'Tabela de resumo por aluno (ResumoAlunos)', [
+        '''
+        CREATE TABLE IF NOT EXISTS ResumoAlunos (
+            aluno_id INTEGER PRIMARY KEY,
+            total_disciplinas INTEGER NOT NULL,
+            media_geral REAL,
+            frequencia_media REAL,
+            disciplinas_reprovadas INTEGER NOT NULL,
+            disciplinas_recuperacao INTEGER NOT NULL,
+            status_final TEXT NOT NULL,
+            FOREIGN KEY (aluno_id) REFERENCES Alunos (id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_resumo_status ON ResumoAlunos (status_final)',
+        'CREATE INDEX IF NOT EXISTS idx_resumo_media ON ResumoAlunos (media_geral)',
+        # Preenche a partir das notas existentes
+        '''
+        INSERT INTO ResumoAlunos
+        SELECT a.id, COUNT(n.id), AVG(n.media_final), AVG(n.frequencia_percentual),
+               SUM(CASE WHEN n.status = 'Reprovado' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN n.status = 'Recuperação' THEN 1 ELSE 0 END),
+               CASE WHEN COUNT(n.id) = 0 THEN 'Sem notas'
+                    WHEN SUM(CASE WHEN n.status = 'Reprovado' THEN 1 ELSE 0 END) > 0 THEN 'Reprovado'
+                    WHEN SUM(CASE WHEN n.status = 'Recuperação' THEN 1 ELSE 0 END) > 0 THEN 'Recuperação'
+                    ELSE 'Aprovado' END
+        FROM Alunos a LEFT JOIN Notas n ON n.aluno_id = a.id
+        GROUP BY a.id
+        ''',
+    ], [
+        '''
+        CREATE TABLE IF NOT EXISTS resumoalunos (
+            aluno_id INTEGER PRIMARY KEY REFERENCES alunos (id) ON DELETE CASCADE,
+            total_disciplinas INTEGER NOT NULL,
+            media_geral REAL,
+            frequencia_media REAL,
+            disciplinas_reprovadas INTEGER NOT NULL,
+            disciplinas_recuperacao INTEGER NOT NULL,
+            status_final TEXT NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_resumo_status ON resumoalunos (status_final)',
+        'CREATE INDEX IF NOT EXISTS idx_resumo_media ON resumoalunos (media_geral)',
+        '''
+        INSERT INTO resumoalunos
+        SELECT a.id, COUNT(n.id), AVG(n.media_final), AVG(n.frequencia_percentual),
+               SUM(CASE WHEN n.status = 'Reprovado' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN n.status = 'Recuperação' THEN 1 ELSE 0 END),
+               CASE WHEN COUNT(n.id) = 0 THEN 'Sem notas'
+                    WHEN SUM(CASE WHEN n.status = 'Reprovado' THEN 1 ELSE 0 END) > 0 THEN 'Reprovado'
+                    WHEN SUM(CASE WHEN n.status = 'Recuperação' THEN 1 ELSE 0 END) > 0 THEN 'Recuperação'
+                    ELSE 'Aprovado' END
+        FROM alunos a LEFT JOIN notas n ON n.aluno_id = a.id
+        GROUP BY a.id
+        ''',
+    ], True),
+
+    Migracao(8, 'Tabela de usuários com os acessos iniciais', [
+        '''
+        CREATE TABLE IF NOT EXISTS Usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            nome TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            senha_hash TEXT NOT NULL,
+            ativo INTEGER NOT NULL DEFAULT 1
+        )
+        ''',
+        # Senha inicial 123456 (hash já calculado: nada é gerado ao iniciar)
+        '''
+        INSERT INTO Usuarios (email, nome, tipo, senha_hash, ativo) VALUES
+            ('professor@escola.com', 'Professor João Silva', 'professor',
+             'pbkdf2:sha256:600000$umvauLNEKqNHtg6b$35dfb0c1bbcaf708d0b3181bde142c5cfe7b038e8534494201a60e2a2589b3f0', 1),
+            ('secretaria@escola.com', 'Secretária Maria Santos', 'secretaria',
+             'pbkdf2:sha256:600000$Oy6x09rHdoeYAlIm$120f00db1ba10dfa2b9fc52401e4b5e0175b71e3923745c3d3cabc91f2ec5840', 1)
+        ON CONFLICT (email) DO NOTHING
+        ''',
+    ], [
+        '''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id SERIAL PRIMARY KEY,
+            email TEXT UNIQUE NOT NULL,
+            nome TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            senha_hash TEXT NOT NULL,
+            ativo BOOLEAN NOT NULL DEFAULT TRUE
+        )
+        ''',
+        '''
+        INSERT INTO usuarios (email, nome, tipo, senha_hash, ativo) VALUES
+            ('professor@escola.com', 'Professor João Silva', 'professor',
+             'pbkdf2:sha256:600000$umvauLNEKqNHtg6b$35dfb0c1bbcaf708d0b3181bde142c5cfe7b038e8534494201a60e2a2589b3f0', TRUE),
+            ('secretaria@escola.com', 'Secretária Maria Santos', 'secretaria',
+             'pbkdf2:sha256:600000$Oy6x09rHdoeYAlIm$120f00db1ba10dfa2b9fc52401e4b5e0175b71e3923745c3d3cabc91f2ec5840', TRUE)
+        ON CONFLICT (email) DO NOTHING
+        ''',
+    ], True),
+
+    # Notas passa a ter uma linha por (aluno, ano letivo, disciplina) e a nota
+    # de cada período vai para Avaliacoes. nota_1_bimestre e nota_2_bimestre
+    # ficam em Notas como cópia dos dois primeiros períodos (mantida pelos
+    # gatilhos), para o boletim do ano corrente continuar lendo uma linha por
+    # disciplina sem juntar Avaliacoes. As notas existentes vão para o ano
+    # corrente.
+    Migracao(9, 'Anos letivos, Notas por ano letivo e Avaliacoes por período', [
+        '''
+        CREATE TABLE IF NOT EXISTS AnosLetivos (
+            ano INTEGER PRIMARY KEY,
+            periodos INTEGER NOT NULL DEFAULT 2 CHECK (periodos BETWEEN 2 AND 12),
+            atual INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_anos_letivos_atual ON AnosLetivos (atual) WHERE atual = 1',
+        "INSERT INTO AnosLetivos (ano, periodos, atual) VALUES (CAST(strftime('%Y', 'now') AS INTEGER), 2, 1)",
+        'ALTER TABLE Notas ADD COLUMN ano_letivo INTEGER NOT NULL DEFAULT 0',
+        'UPDATE Notas SET ano_letivo = (SELECT ano FROM AnosLetivos WHERE atual = 1)',
+        # (aluno_id, ano_letivo, ...) atende o boletim do ano corrente e o
+        # histórico de um intervalo de anos; em (ano_letivo, aluno_id) cada
+        # ano é um trecho contíguo do índice, o equivalente a uma partição
+        'DROP INDEX IF EXISTS uq_notas_aluno_disciplina',
+        'DROP INDEX IF EXISTS idx_notas_aluno',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_notas_aluno_ano_disciplina ON Notas (aluno_id, ano_letivo, disciplina)',
+        'CREATE INDEX IF NOT EXISTS idx_notas_ano ON Notas (ano_letivo, aluno_id)',
+        '''
+        CREATE TABLE IF NOT EXISTS Avaliacoes (
+            nota_id INTEGER NOT NULL,
+            periodo INTEGER NOT NULL CHECK (periodo >= 1),
+            valor REAL NOT NULL,
+            PRIMARY KEY (nota_id, periodo),
+            FOREIGN KEY (nota_id) REFERENCES Notas (id)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO Avaliacoes (nota_id, periodo, valor)
+        SELECT id, 1, nota_1_bimestre FROM Notas
+        UNION ALL
+        SELECT id, 2, nota_2_bimestre FROM Notas
+        ''',
+        # Gatilhos que mantêm os dois primeiros períodos iguais às colunas de Notas
+        '''
+        CREATE TRIGGER IF NOT EXISTS notas_avaliacoes_ai AFTER INSERT ON Notas BEGIN
+            INSERT INTO Avaliacoes (nota_id, periodo, valor)
+            VALUES (new.id, 1, new.nota_1_bimestre), (new.id, 2, new.nota_2_bimestre)
+            ON CONFLICT (nota_id, periodo) DO UPDATE SET valor = excluded.valor;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS notas_avaliacoes_au
+        AFTER UPDATE OF nota_1_bimestre, nota_2_bimestre ON Notas BEGIN
+            INSERT INTO Avaliacoes (nota_id, periodo, valor)
+            VALUES (new.id, 1, new.nota_1_bimestre), (new.id, 2, new.nota_2_bimestre)
+            ON CONFLICT (nota_id, periodo) DO UPDATE SET valor = excluded.valor;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS notas_avaliacoes_ad AFTER DELETE ON Notas BEGIN
+            DELETE FROM Avaliacoes WHERE nota_id = old.id;
+        END
+        ''',
+    ], [
+        '''
+        CREATE TABLE IF NOT EXISTS anosletivos (
+            ano INTEGER PRIMARY KEY,
+            periodos INTEGER NOT NULL DEFAULT 2 CHECK (periodos BETWEEN 2 AND 12),
+            atual BOOLEAN NOT NULL DEFAULT FALSE
+        )
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_anos_letivos_atual ON anosletivos (atual) WHERE atual',
+        'INSERT INTO anosletivos (ano, periodos, atual) VALUES (EXTRACT(YEAR FROM CURRENT_DATE)::integer, 2, TRUE)',
+        # notas e avaliacoes são particionadas por ano letivo: uma partição
+        # por ano (criar_particoes_ano) mais a padrão, para anos sem partição
+        'ALTER TABLE notas RENAME TO notas_sem_ano',
+        'ALTER TABLE notas_sem_ano RENAME CONSTRAINT notas_pkey TO notas_sem_ano_pkey',
+        'ALTER SEQUENCE notas_id_seq OWNED BY NONE',
+        '''
+        CREATE TABLE notas (
+            id INTEGER NOT NULL DEFAULT nextval('notas_id_seq'),
+            aluno_id INTEGER NOT NULL REFERENCES alunos (id) ON DELETE CASCADE,
+            disciplina TEXT NOT NULL,
+            nota_1_bimestre REAL NOT NULL,
+            nota_2_bimestre REAL NOT NULL,
+            media_final REAL NOT NULL,
+            frequencia_percentual REAL NOT NULL,
+            status TEXT NOT NULL,
+            ano_letivo INTEGER NOT NULL,
+            PRIMARY KEY (id, ano_letivo)
+        ) PARTITION BY LIST (ano_letivo)
+        ''',
+        'CREATE UNIQUE INDEX uq_notas_aluno_ano_disciplina ON notas (aluno_id, ano_letivo, disciplina)',
+        '''
+        CREATE TABLE avaliacoes (
+            nota_id INTEGER NOT NULL,
+            ano_letivo INTEGER NOT NULL,
+            periodo INTEGER NOT NULL CHECK (periodo >= 1),
+            valor REAL NOT NULL,
+            PRIMARY KEY (nota_id, ano_letivo, periodo),
+            FOREIGN KEY (nota_id, ano_letivo) REFERENCES notas (id, ano_letivo) ON DELETE CASCADE
+        ) PARTITION BY LIST (ano_letivo)
+        ''',
+        'CREATE TABLE notas_padrao PARTITION OF notas DEFAULT',
+        'CREATE TABLE avaliacoes_padrao PARTITION OF avaliacoes DEFAULT',
+        '''
+        CREATE OR REPLACE FUNCTION criar_particoes_ano(ano INTEGER) RETURNS void AS $$
+        BEGIN
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF notas FOR VALUES IN (%s)',
+                           'notas_' || ano, ano);
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF avaliacoes FOR VALUES IN (%s)',
+                           'avaliacoes_' || ano, ano);
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        'SELECT criar_particoes_ano(ano) FROM anosletivos',
+        '''
+        INSERT INTO notas (id, aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre,
+                           media_final, frequencia_percentual, status, ano_letivo)
+        SELECT id, aluno_id, disciplina, nota_1_bimestre, nota_2_bimestre,
+               media_final, frequencia_percentual, status, (SELECT ano FROM anosletivos WHERE atual)
+        FROM notas_sem_ano
+        ''',
+        'DROP TABLE notas_sem_ano',
+        'ALTER SEQUENCE notas_id_seq OWNED BY notas.id',
+        '''
+        INSERT INTO avaliacoes (nota_id, ano_letivo, periodo, valor)
+        SELECT id, ano_letivo, 1, nota_1_bimestre FROM notas
+        UNION ALL
+        SELECT id, ano_letivo, 2, nota_2_bimestre FROM notas
+        ''',
+        '''
+        CREATE OR REPLACE FUNCTION notas_sincronizar_avaliacoes() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO avaliacoes (nota_id, ano_letivo, periodo, valor)
+            VALUES (NEW.id, NEW.ano_letivo, 1, NEW.nota_1_bimestre),
+                   (NEW.id, NEW.ano_letivo, 2, NEW.nota_2_bimestre)
+            ON CONFLICT (nota_id, ano_letivo, periodo) DO UPDATE SET valor = excluded.valor;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        '''
+        CREATE TRIGGER notas_avaliacoes_aiu
+        AFTER INSERT OR UPDATE OF nota_1_bimestre, nota_2_bimestre ON notas
+        FOR EACH ROW EXECUTE FUNCTION notas_sincronizar_avaliacoes()
+        ''',
+    ], True),
+
+    # Incrementada na mesma transação de toda gravação dos dados do aluno; o
+    # cache de alunos de cada processo compara a versão antes de usar o item
+    Migracao(10, 'Versão dos dados de cada aluno (Alunos.versao) para o cache entre processos', [
+        'ALTER TABLE Alunos ADD COLUMN versao INTEGER NOT NULL DEFAULT 0',
+        # Só nome e matrícula estão no índice de busca: mudar a versão não o reescreve
+        'DROP TRIGGER IF EXISTS alunos_busca_au',
+        '''
+        CREATE TRIGGER IF NOT EXISTS alunos_busca_au AFTER UPDATE OF nome_completo, matricula ON Alunos BEGIN
+            INSERT INTO alunos_busca (alunos_busca, rowid, nome_completo, matricula)
+            VALUES ('delete', old.id, old.nome_completo, old.matricula);
+            INSERT INTO alunos_busca (rowid, nome_completo, matricula)
+            VALUES (new.id, new.nome_completo, new.matricula);
+        END
+        ''',
+    ], [
+        'ALTER TABLE alunos ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 0',
+    ], True),
+
+    # Gravado junto com a versão; é a data de emissão impressa no boletim, de
+    # modo que o PDF em cache só muda quando os dados mudam. Alunos já
+    # cadastrados ficam com a data da migração
+    Migracao(11, 'Data da última alteração dos dados de cada aluno (Alunos.alterado_em)', [
+        'ALTER TABLE Alunos ADD COLUMN alterado_em TEXT',
+        "UPDATE Alunos SET alterado_em = strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')",
+    ], [
+        'ALTER TABLE alunos ADD COLUMN IF NOT EXISTS alterado_em TEXT',
+        '''UPDATE alunos SET alterado_em = to_char(localtimestamp, 'YYYY-MM-DD"T"HH24:MI:SS') WHERE alterado_em IS NULL''',
+    ], True),
+]
+
+
+def _versoes_aplicadas(conn):
+    cursor = conn.cursor()
+    cursor.execute('SELECT versao FROM schema_version')
+    versoes = {linha[0] for linha in cursor.fetchall()}
+    conn.rollback()
+    return versoes
+
+
+def _registrar(cursor, migracao, is_postgres):
+    marcador = '%s' if is_postgres else '?'
+    cursor.execute(
+        f'INSERT INTO schema_version (versao, descricao, aplicada_em) VALUES ({marcador}, {marcador}, {marcador})',
+        (migracao.versao, migracao.descricao, datetime.now().isoformat(timespec='seconds'))
+    )
+
+
+def _aplicar_sqlite(conn, migracao):
+    # BEGIN IMMEDIATE serializa as migrações entre processos; com WAL as
+    # leituras continuam enquanto a migração roda
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if migracao.versao in {v for (v,) in conn.execute('SELECT versao FROM schema_version')}:
+            conn.rollback()
+            return False
+        for comando in migracao.sqlite:
+            conn.execute(comando)
+        _registrar(conn, migracao, False)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _aplicar_postgres(conn, migracao):
+    cursor = conn.cursor()
+    if migracao.transacional:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)', (CHAVE_LOCK,))
+        cursor.execute('SELECT 1 FROM schema_version WHERE versao = %s', (migracao.versao,))
+        if cursor.fetchone():
+            conn.rollback()
+            return False
+        for comando in migracao.postgres:
+            cursor.execute(comando)
+        _registrar(cursor, migracao, True)
+        conn.commit()
+        return True
+
+    conn.autocommit = True
+    try:
+        cursor.execute('SELECT pg_advisory_lock(%s)', (CHAVE_LOCK,))
+        try:
+            cursor.execute('SELECT 1 FROM schema_version WHERE versao = %s', (migracao.versao,))
+            if cursor.fetchone():
+                return False
+            for comando in migracao.postgres:
+                cursor.execute(comando)
+            _registrar(cursor, migracao, True)
+            return True
+        finally:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', (CHAVE_LOCK,))
+    finally:
+        conn.autocommit = False
+
+
+def aplicar_migracoes(conexao, is_postgres):
+    """Aplica as migrações pendentes; retorna as versões aplicadas agora
+
+    ``conexao`` é uma função que empresta uma conexão (ex.: Database.conexao).
+    Quando não há pendências, custa apenas uma consulta a schema_version.
+    """
+    aplicadas = []
+    with conexao() as conn:
+        cursor = conn.cursor()
+        if not is_postgres:
+            cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                versao INTEGER PRIMARY KEY,
+                descricao TEXT NOT NULL,
+                aplicada_em TEXT NOT NULL
+            )
+        ''')
+        conn.commit()
+
+        existentes = _versoes_aplicadas(conn)
+        for migracao in MIGRACOES:
+            if migracao.versao in existentes:
+                continue
+            aplicar = _aplicar_postgres if is_postgres else _aplicar_sqlite
+            if aplicar(conn, migracao):
+                extra = {'versao': migracao.versao, 'descricao': migracao.descricao}
+                if migracao.relatorio:
+                    cursor.execute(migracao.relatorio)
+                    extra['linhas'] = cursor.fetchone()[0]
+                    conn.commit()
+                log.info("Migração aplicada", extra=extra)
+                aplicadas.append(migracao.versao)
+    return aplicadas
+
+
+def situacao(conexao):
+    """Retorna [(versao, descricao, aplicada)] de todas as migrações conhecidas"""
+    with conexao() as conn:
+        try:
+            existentes = _versoes_aplicadas(conn)
+        except Exception:
+            conn.rollback()
+            existentes = set()
+    return [(m.versao, m.descricao, m.versao in existentes) for m in MIGRACOES]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrações do banco de dados')
+    parser.add_argument('--status', action='store_true', help='só mostra as migrações aplicadas e pendentes')
+    args = parser.parse_args()
+    configurar_logs()
+
+    from database import Database
+    db = Database()
+    if not args.status:
+        db.init_db()
+    for versao, descricao, aplicada in situacao(db.conexao):
+        print(f"{'✅' if aplicada else '⏳'} {versao:03d} {descricao}")
+
+
+if __name__ == '__main__':
+    main()
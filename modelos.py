@@ -0,0 +1,25 @@
+"""Registros tipados devolvidos pela classe Database
+
+São namedtuples (sem __dict__ por instância) para continuar aceitando acesso
+por posição, serialização em JSON como lista e envio entre processos.
+"""
+from collections import namedtuple
+
+Aluno = namedtuple('Aluno', 'id nome_completo data_nascimento serie nome_do_responsavel matricula')
+
+# nota_1_bimestre e nota_2_bimestre são os dois primeiros períodos do ano
+# letivo; todas as notas de cada período ficam na tabela Avaliacoes
+Nota = namedtuple('Nota', 'id aluno_id disciplina nota_1_bimestre nota_2_bimestre '
+                          'media_final frequencia_percentual status ano_letivo', defaults=(None,))
+
+AnoLetivo = namedtuple('AnoLetivo', 'ano periodos atual')
+
+ResumoAluno = namedtuple('ResumoAluno', 'aluno_id total_disciplinas media_geral frequencia_media '
+                                        'disciplinas_reprovadas disciplinas_recuperacao status_final')
+
+Usuario = namedtuple('Usuario', 'id email nome tipo senha_hash ativo')
+
+
+def colunas(registro, prefixo=''):
+    """Lista de colunas para o SELECT, na ordem dos campos do registro"""
+    return ', '.join(f'{prefixo}{campo}' for campo in registro._fields)
@@ -1,77 +1,281 @@
-from fpdf import FPDF
+"""Geração dos boletins em PDF
+
+O boletim é desenhado por ModeloBoletim: o layout fixo (cabeçalho, rótulos,
+cabeçalho da tabela, fontes e objetos do documento) é montado uma única vez
+por processo e cada boletim só preenche os dados do aluno e as linhas de
+notas. O PDF não tem data de criação nem identificador aleatório, então o
+mesmo aluno, as mesmas notas e a mesma data de emissão geram sempre os mesmos
+bytes.
+
+Do fpdf só são usadas as tabelas de largura das fontes padrão (para centralizar
+e quebrar o texto).
+"""
+import logging
+import zlib
+from fpdf.fonts import CORE_FONTS_CHARWIDTHS
 from datetime import datetime
 
-class BoletimPDF(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 16)
-        self.cell(0, 10, 'ESCOLA MODELO DE TECNOLOGIA', 0, 1, 'C')
-        self.set_font('Arial', 'B', 14)
-        self.cell(0, 10, 'BOLETIM ESCOLAR', 0, 1, 'C')
-        self.ln(5)
-    
-    def create_boletim(self, aluno_data, notas_data):
-        self.add_page()
-        
-        # Dados do Aluno
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'DADOS DO ALUNO', 0, 1)
-        self.set_font('Arial', '', 10)
-        
-        info_aluno = f"""Nome: {aluno_data[1]}
-Matrícula: {aluno_data[5]}
-Série: {aluno_data[3]}
-Data de Nascimento: {aluno_data[2]}
-Responsável: {aluno_data[4]}"""
-        
-        self.multi_cell(0, 8, info_aluno)
-        self.ln(10)
-        
-        # Tabela de Notas
-        self.set_font('Arial', 'B', 12)
-        self.cell(0, 10, 'DESEMPENHO ACADÊMICO', 0, 1)
-        
-        # Cabeçalho da tabela
-        self.set_fill_color(200, 200, 200)
-        self.set_font('Arial', 'B', 10)
-        
-        self.cell(60, 10, 'Disciplina', 1, 0, 'C', True)
-        self.cell(25, 10, '1º Bim.', 1, 0, 'C', True)
-        self.cell(25, 10, '2º Bim.', 1, 0, 'C', True)
-        self.cell(25, 10, 'Média', 1, 0, 'C', True)
-        self.cell(25, 10, 'Freq. %', 1, 0, 'C', True)
-        self.cell(30, 10, 'Status', 1, 1, 'C', True)
-        
-        # Dados das notas
-        self.set_font('Arial', '', 9)
-        for nota in notas_data:
-            disciplina = str(nota[2])[:25] if len(str(nota[2])) > 25 else str(nota[2])
-            nota_1 = float(nota[3])
-            nota_2 = float(nota[4])
-            media = float(nota[5])
-            frequencia = float(nota[6])
-            status = str(nota[7])
-            
-            self.cell(60, 8, disciplina, 1)
-            self.cell(25, 8, f"{nota_1:.1f}", 1, 0, 'C')
-            self.cell(25, 8, f"{nota_2:.1f}", 1, 0, 'C')
-            self.cell(25, 8, f"{media:.1f}", 1, 0, 'C')
-            self.cell(25, 8, f"{frequencia:.1f}%", 1, 0, 'C')
-            self.cell(30, 8, status, 1, 1, 'C')
-        
-        self.ln(10)
-        
-        # Rodapé
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Emitido em: {datetime.now().strftime("%d/%m/%Y %H:%M")}', 0, 0, 'C')
-
-def gerar_boletim_pdf(aluno_data, notas_data):
-    """Gera um boletim em PDF para o aluno"""
-    try:
-        print(f"📄 Iniciando geração de PDF para: {aluno_data[1]}")
-        pdf = BoletimPDF()
-        pdf.create_boletim(aluno_data, notas_data)
-        print("✅ PDF gerado com sucesso")
-        return pdf
-    except Exception as e:
-        print(f"❌ Erro na geração do PDF: {e}")
-        raise
\ No newline at end of file
+log = logging.getLogger(__name__)
+
+# Altere sempre que o layout do boletim mudar (invalida os PDFs em cache)
+VERSAO_TEMPLATE = '3'
+
+# ==================== MODELO PRÉ-CALCULADO ====================
+# Medidas do layout em mm (A4, margens de 10 mm, células com 1 mm de recuo)
+ESCALA = 72 / 25.4
+ALTURA_PAGINA = 297.0
+MARGEM = 10.0
+LARGURA_UTIL = 190.0
+LIMITE_QUEBRA = ALTURA_PAGINA - 20.0
+INICIO_CONTEUDO = 35.0
+INICIO_DADOS = 45.0
+ALTURA_LINHA_DADOS = 8.0
+RECUO = 1.0
+COLUNAS_TABELA = (60, 25, 25, 25, 25, 30)
+ALTURA_LINHA_NOTA = 8.0
+
+# Apelido de cada fonte no documento: (nome no PDF, tabela de larguras)
+FONTES = {
+    'negrito': ('/F1', 'Helvetica-Bold', 'helveticaB'),
+    'normal': ('/F2', 'Helvetica', 'helvetica'),
+    'italico': ('/F3', 'Helvetica-Oblique', 'helveticaI'),
+}
+
+
+def _winansi(texto):
+    """Texto em WinAnsi (cp1252), um caractere por byte, como str latin-1"""
+    return str(texto).encode('cp1252', 'replace').decode('latin-1')
+
+
+def _escapar(texto):
+    return texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class ModeloBoletim:
+    """Layout do boletim montado uma vez e reaproveitado a cada renderização"""
+
+    def __init__(self):
+        self._larguras = {
+            apelido: [CORE_FONTS_CHARWIDTHS[tabela][chr(codigo)] for codigo in range(256)]
+            for apelido, (_, _, tabela) in FONTES.items()
+        }
+        self._cabecalho = (
+            '2 J\n0.57 w\n'
+            + self._fonte('negrito', 16) + self._texto_celula('ESCOLA MODELO DE TECNOLOGIA', 'negrito', 16, MARGEM, 10, LARGURA_UTIL, 10, 'C')
+            + self._fonte('negrito', 14) + self._texto_celula('BOLETIM ESCOLAR', 'negrito', 14, MARGEM, 20, LARGURA_UTIL, 10, 'C')
+        )
+        self._rotulo_dados = self._fonte('negrito', 12) + self._texto_celula('DADOS DO ALUNO', 'negrito', 12, MARGEM, 35, LARGURA_UTIL, 10)
+        # Linhas de "DADOS DO ALUNO", 8 mm cada a partir de y = 45; o texto
+        # que não cabe na largura continua na linha seguinte
+        self._rotulos_dados = ('Nome', 'Matrícula', 'Série', 'Data de Nascimento', 'Responsável')
+        self._largura_dados = (LARGURA_UTIL - 2 * RECUO) * ESCALA
+        self._linhas_dados = {}
+        # Título e cabeçalho da tabela por posição (o caso comum, sem quebras, é montado aqui)
+        self._tabelas = {}
+        self._tabela(INICIO_DADOS + ALTURA_LINHA_DADOS * len(self._rotulos_dados) + 10)
+        self._fonte_notas = self._fonte('normal', 9)
+        self._objetos_fixos, self._deslocamentos_fixos = self._montar_objetos_fixos()
+
+    # ---------- geometria (mesmas fórmulas do fpdf) ----------
+    @staticmethod
+    def _posicoes():
+        x = MARGEM
+        for largura in COLUNAS_TABELA:
+            yield x
+            x += largura
+
+    @staticmethod
+    def _base(y, altura, tamanho):
+        """Linha de base do texto de uma célula no topo ``y`` (mm), em pontos"""
+        return (ALTURA_PAGINA - y - altura / 2) * ESCALA - 0.3 * tamanho
+
+    @staticmethod
+    def _fonte(apelido, tamanho):
+        return f'BT {FONTES[apelido][0]} {tamanho:.2f} Tf ET\n'
+
+    def _largura(self, texto, apelido, tamanho):
+        larguras = self._larguras[apelido]
+        return sum(larguras[byte] for byte in texto.encode('latin-1')) * tamanho / 1000
+
+    def _x_texto(self, texto, apelido, tamanho, x, largura, alinhamento):
+        if alinhamento == 'C':
+            return x * ESCALA + (largura * ESCALA - self._largura(texto, apelido, tamanho)) / 2
+        return (x + 1) * ESCALA
+
+    def _texto_celula(self, texto, apelido, tamanho, x, y, largura, altura, alinhamento='L'):
+        texto = _winansi(texto)
+        return (f'BT {self._x_texto(texto, apelido, tamanho, x, largura, alinhamento):.2f} '
+                f'{self._base(y, altura, tamanho):.2f} Td ({_escapar(texto)}) Tj ET\n')
+
+    def _quebrar(self, texto, apelido, tamanho, largura):
+        """Divide o texto (WinAnsi) em linhas de até ``largura`` pontos, nos espaços
+
+        Uma palavra maior que a linha inteira é quebrada entre caracteres.
+        """
+        if self._largura(texto, apelido, tamanho) <= largura:
+            return [texto]
+        linhas, atual = [], ''
+        for palavra in texto.split(' '):
+            candidata = f'{atual} {palavra}' if atual else palavra
+            if self._largura(candidata, apelido, tamanho) <= largura:
+                atual = candidata
+                continue
+            if atual:
+                linhas.append(atual)
+            atual = ''
+            for caractere in palavra:
+                if atual and self._largura(atual + caractere, apelido, tamanho) > largura:
+                    linhas.append(atual)
+                    atual = ''
+                atual += caractere
+        linhas.append(atual)
+        return linhas
+
+    def _linha_dados(self, indice):
+        """Início do comando de texto da linha ``indice`` de DADOS DO ALUNO"""
+        prefixo = self._linhas_dados.get(indice)
+        if prefixo is None:
+            y = INICIO_DADOS + ALTURA_LINHA_DADOS * indice
+            prefixo = f'BT {(MARGEM + RECUO) * ESCALA:.2f} {self._base(y, ALTURA_LINHA_DADOS, 10):.2f} Td ('
+            self._linhas_dados[indice] = prefixo
+        return prefixo
+
+    def _tabela(self, y):
+        """Título "DESEMPENHO ACADÊMICO" no topo ``y`` e o cabeçalho da tabela logo abaixo"""
+        tabela = self._tabelas.get(y)
+        if tabela is None:
+            titulos = ('Disciplina', '1º Bim.', '2º Bim.', 'Média', 'Freq. %', 'Status')
+            tabela = (
+                self._fonte('negrito', 12) + self._texto_celula('DESEMPENHO ACADÊMICO', 'negrito', 12, MARGEM, y, LARGURA_UTIL, 10)
+                + '0.7843 0.7843 0.7843 rg\n' + self._fonte('negrito', 10)
+                + ''.join(self._celula(titulo, 'negrito', 10, x, y + 10, largura, 10, 'C', 'B')
+                          for titulo, x, largura in zip(titulos, self._posicoes(), COLUNAS_TABELA))
+            )
+            self._tabelas[y] = tabela
+        return tabela
+
+    def _celula(self, texto, apelido, tamanho, x, y, largura, altura, alinhamento, estilo):
+        texto = _winansi(texto)
+        return (f'q {x * ESCALA:.2f} {(ALTURA_PAGINA - y) * ESCALA:.2f} {largura * ESCALA:.2f} {-altura * ESCALA:.2f} re {estilo} '
+                f'BT {self._x_texto(texto, apelido, tamanho, x, largura, alinhamento):.2f} '
+                f'{self._base(y, altura, tamanho):.2f} Td 0 g ({_escapar(texto)}) Tj ET Q\n')
+
+    # ---------- conteúdo das páginas ----------
+    def paginas(self, aluno, notas, emitido_em):
+        """Conteúdo (str latin-1) de cada página do boletim de um aluno"""
+        partes = [self._cabecalho, self._rotulo_dados, self._fonte('normal', 10)]
+        valores = (aluno.nome_completo, aluno.matricula, aluno.serie, aluno.data_nascimento, aluno.nome_do_responsavel)
+        indice = 0
+        for rotulo, valor in zip(self._rotulos_dados, valores):
+            linhas = self._quebrar(_winansi(f"{rotulo}: {valor}"), 'normal', 10, self._largura_dados)
+            for numero, linha in enumerate(linhas, start=1):
+                espacos = linha.count(' ')
+                if numero < len(linhas) and espacos:
+                    # Linha quebrada: justificada pelo espaçamento entre palavras
+                    folga = (self._largura_dados - self._largura(linha, 'normal', 10)) / espacos
+                    partes.append(f'q {self._linha_dados(indice)[:-1]}{folga:.3f} Tw ({_escapar(linha)}) Tj ET Q\n')
+                else:
+                    partes.append(f'{self._linha_dados(indice)}{_escapar(linha)}) Tj ET\n')
+                indice += 1
+        y = INICIO_DADOS + ALTURA_LINHA_DADOS * indice + 10
+        partes.append(self._tabela(y))
+        partes.append(self._fonte_notas)
+
+        paginas = []
+        y += 20
+        posicoes = tuple(self._posicoes())
+        celula = self._celula
+        for nota in notas:
+            if y + ALTURA_LINHA_NOTA > LIMITE_QUEBRA:
+                paginas.append(''.join(partes))
+                partes = [self._cabecalho, self._fonte_notas]
+                y = INICIO_CONTEUDO
+            textos = (
+                str(nota.disciplina)[:25],
+                f"{float(nota.nota_1_bimestre):.1f}",
+                f"{float(nota.nota_2_bimestre):.1f}",
+                f"{float(nota.media_final):.1f}",
+                f"{float(nota.frequencia_percentual):.1f}%",
+                str(nota.status),
+            )
+            for indice, (texto, x, largura) in enumerate(zip(textos, posicoes, COLUNAS_TABELA)):
+                partes.append(celula(texto, 'normal', 9, x, y, largura, ALTURA_LINHA_NOTA, 'C' if indice else 'L', 'S'))
+            y += ALTURA_LINHA_NOTA
+
+        y += 10
+        if y + 10 > LIMITE_QUEBRA:
+            paginas.append(''.join(partes))
+            partes = [self._cabecalho]
+            y = INICIO_CONTEUDO
+        rodape = _winansi(f'Emitido em: {emitido_em.strftime("%d/%m/%Y %H:%M")}')
+        partes.append(self._fonte('italico', 8))
+        partes.append(f'q BT {self._x_texto(rodape, "italico", 8, MARGEM, LARGURA_UTIL, "C"):.2f} '
+                      f'{self._base(y, 10, 8):.2f} Td 0 g ({_escapar(rodape)}) Tj ET Q\n')
+        paginas.append(''.join(partes))
+        return paginas
+
+    # ---------- documento ----------
+    def _montar_objetos_fixos(self):
+        """Catálogo, fontes e recursos: objetos 1 a 5, iguais em todo documento"""
+        objetos = [
+            '<</Type /Catalog /Pages 6 0 R /PageLayout /OneColumn /OpenAction [7 0 R /FitH null]>>',
+        ]
+        for apelido, nome, _ in FONTES.values():
+            objetos.append(f'<</Type /Font /Subtype /Type1 /BaseFont /{nome} /Encoding /WinAnsiEncoding>>')
+        objetos.append('<</Font <<' + ' '.join(f'{apelido} {numero} 0 R' for numero, (apelido, _, _) in enumerate(FONTES.values(), start=2))
+                       + '>> /ProcSet [/PDF /Text]>>')
+        saida = bytearray(b'%PDF-1.3\n')
+        deslocamentos = []
+        for numero, objeto in enumerate(objetos, start=1):
+            deslocamentos.append(len(saida))
+            saida += f'{numero} 0 obj\n{objeto}\nendobj\n'.encode('latin-1')
+        return bytes(saida), deslocamentos
+
+    def documento(self, paginas):
+        """Monta o PDF (bytes) com o conteúdo de cada página"""
+        saida = bytearray(self._objetos_fixos)
+        deslocamentos = list(self._deslocamentos_fixos)
+        filhos = ' '.join(f'{7 + 2 * indice} 0 R' for indice in range(len(paginas)))
+        deslocamentos.append(len(saida))
+        saida += (f'6 0 obj\n<</Type /Pages /Kids [{filhos}] /Count {len(paginas)} '
+                  f'/MediaBox [0 0 595.28 841.89]>>\nendobj\n').encode('latin-1')
+        for indice, conteudo in enumerate(paginas):
+            numero = 7 + 2 * indice
+            deslocamentos.append(len(saida))
+            saida += f'{numero} 0 obj\n<</Type /Page /Parent 6 0 R /Resources 5 0 R /Contents {numero + 1} 0 R>>\nendobj\n'.encode('latin-1')
+            fluxo = zlib.compress(conteudo.encode('latin-1'), 6)
+            deslocamentos.append(len(saida))
+            saida += f'{numero + 1} 0 obj\n<</Filter /FlateDecode /Length {len(fluxo)}>>\nstream\n'.encode('latin-1')
+            saida += fluxo
+            saida += b'\nendstream\nendobj\n'
+        inicio_xref = len(saida)
+        saida += f'xref\n0 {len(deslocamentos) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+        saida += ''.join(f'{deslocamento:010d} 00000 n \n' for deslocamento in deslocamentos).encode('latin-1')
+        saida += f'trailer\n<</Size {len(deslocamentos) + 1} /Root 1 0 R>>\nstartxref\n{inicio_xref}\n%%EOF\n'.encode('latin-1')
+        return bytes(saida)
+
+
+_modelo = None
+
+
+def modelo_boletim():
+    """ModeloBoletim deste processo (criado no primeiro uso)"""
+    global _modelo
+    if _modelo is None:
+        _modelo = ModeloBoletim()
+    return _modelo
+
+
+def gerar_boletim_bytes(aluno_data, notas_data, emitido_em=None):
+    """Gera o boletim e retorna o conteúdo do PDF em bytes"""
+    modelo = modelo_boletim()
+    return modelo.documento(modelo.paginas(aluno_data, notas_data, emitido_em or datetime.now()))
+
+def gerar_boletins_unico_pdf(alunos_notas, emitido_em=None):
+    """Gera um único PDF com as páginas do boletim de cada aluno"""
+    modelo = modelo_boletim()
+    emitido_em = emitido_em or datetime.now()
+    paginas = []
+    for aluno_data, notas_data in alunos_notas:
+        paginas.extend(modelo.paginas(aluno_data, notas_data, emitido_em))
+    return modelo.documento(paginas)
@@ -0,0 +1,347 @@
+"""Pools de conexões reutilizáveis usados pela classe Database"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolEsgotadoError(Exception):
+    """Nenhuma conexão ficou disponível dentro do tempo de espera"""
+
+
+class EstatisticasPool:
+    """Contadores de uso de um pool (acertos, faltas, esperas e descartes)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.esperas = 0
+        self.tempo_espera_total = 0.0
+        self.tempo_espera_maximo = 0.0
+        self.esgotamentos = 0
+        self.falhas_verificacao = 0
+        self.remocoes_ociosas = 0
+        self.excedentes = 0
+
+    def incrementar(self, campo, valor=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + valor)
+
+    def registrar_espera(self, segundos):
+        with self._lock:
+            self.esperas += 1
+            self.tempo_espera_total += segundos
+            if segundos > self.tempo_espera_maximo:
+                self.tempo_espera_maximo = segundos
+
+    def como_dict(self):
+        with self._lock:
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'esperas': self.esperas,
+                'tempo_espera_total': round(self.tempo_espera_total, 6),
+                'tempo_espera_maximo': round(self.tempo_espera_maximo, 6),
+                'esgotamentos': self.esgotamentos,
+                'falhas_verificacao': self.falhas_verificacao,
+                'remocoes_ociosas': self.remocoes_ociosas,
+                'excedentes': self.excedentes,
+            }
+
+
+def _fechar_silenciosamente(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class PoolConexoes:
+    """Pool compartilhado entre threads, usado com o PostgreSQL.
+
+    Mantém no máximo ``tamanho_maximo`` conexões abertas. Quando todas estão
+    em uso, quem pede uma conexão espera até ``tempo_espera`` segundos.
+    Conexões paradas há mais de ``intervalo_verificacao`` segundos passam por
+    ``verificar`` antes de serem entregues, e as paradas há mais de
+    ``tempo_ocioso_maximo`` são fechadas (respeitando ``tamanho_minimo``).
+    """
+
+    def __init__(self, fabrica, verificar, tamanho_minimo=1, tamanho_maximo=10,
+                 tempo_espera=30.0, tempo_ocioso_maximo=300.0, intervalo_verificacao=30.0):
+        if tamanho_maximo < 1:
+            raise ValueError("tamanho_maximo deve ser pelo menos 1")
+        self._fabrica = fabrica
+        self._verificar = verificar
+        self.tamanho_minimo = min(tamanho_minimo, tamanho_maximo)
+        self.tamanho_maximo = tamanho_maximo
+        self.tempo_espera = tempo_espera
+        self.tempo_ocioso_maximo = tempo_ocioso_maximo
+        self.intervalo_verificacao = intervalo_verificacao
+        self.estatisticas = EstatisticasPool()
+        self._cond = threading.Condition()
+        self._reiniciar_estado()
+
+    def _reiniciar_estado(self):
+        self._livres = deque()  # (conexão, instante do último uso)
+        self._total = 0
+        self._pid = os.getpid()
+
+    def _verificar_fork(self):
+        # Conexões herdadas de outro processo (ex.: fork de workers) não podem
+        # ser reutilizadas nem fechadas aqui; apenas descartamos as referências.
+        if self._pid != os.getpid():
+            self._reiniciar_estado()
+
+    def _remover_ociosas(self, agora):
+        while (self._livres and self._total > self.tamanho_minimo
+               and agora - self._livres[0][1] > self.tempo_ocioso_maximo):
+            conn, _ = self._livres.popleft()
+            self._total -= 1
+            self.estatisticas.incrementar('remocoes_ociosas')
+            _fechar_silenciosamente(conn)
+
+    def adquirir(self):
+        inicio = time.monotonic()
+        esperou = False
+        while True:
+            with self._cond:
+                self._verificar_fork()
+                self._remover_ociosas(time.monotonic())
+                while not self._livres and self._total >= self.tamanho_maximo:
+                    restante = self.tempo_espera - (time.monotonic() - inicio)
+                    if restante <= 0:
+                        self.estatisticas.incrementar('esgotamentos')
+                        raise PoolEsgotadoError(
+                            f"Nenhuma conexão livre após {self.tempo_espera}s "
+                            f"(máximo de {self.tamanho_maximo})"
+                        )
+                    esperou = True
+                    self._cond.wait(restante)
+                if self._livres:
+                    conn, ultimo_uso = self._livres.pop()
+                    criar = False
+                else:
+                    self._total += 1
+                    criar = True
+
+            if esperou:
+                self.estatisticas.registrar_espera(time.monotonic() - inicio)
+                esperou = False
+
+            if criar:
+                try:
+                    conn = self._fabrica()
+                except Exception:
+                    self._liberar_vaga()
+                    raise
+                self.estatisticas.incrementar('faltas')
+                return conn
+
+            if time.monotonic() - ultimo_uso > self.intervalo_verificacao and not self._verificar(conn):
+                self.estatisticas.incrementar('falhas_verificacao')
+                _fechar_silenciosamente(conn)
+                self._liberar_vaga()
+                continue
+
+            self.estatisticas.incrementar('acertos')
+            return conn
+
+    def _liberar_vaga(self):
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def devolver(self, conn, descartar=False):
+        if not descartar:
+            try:
+                # Encerra qualquer transação aberta antes de reaproveitar
+                conn.rollback()
+            except Exception:
+                descartar = True
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            if descartar:
+                _fechar_silenciosamente(conn)
+                self._total -= 1
+            else:
+                self._livres.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def conexao(self):
+        conn = self.adquirir()
+        descartar = False
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                descartar = True
+            raise
+        finally:
+            self.devolver(conn, descartar)
+
+    def fechar(self):
+        with self._cond:
+            while self._livres:
+                conn, _ = self._livres.popleft()
+                self._total -= 1
+                _fechar_silenciosamente(conn)
+            self._cond.notify_all()
+
+    def como_dict(self):
+        with self._cond:
+            dados = {
+                'tipo': 'compartilhado',
+                'abertas': self._total,
+                'livres': len(self._livres),
+                'em_uso': self._total - len(self._livres),
+                'tamanho_maximo': self.tamanho_maximo,
+            }
+        dados.update(self.estatisticas.como_dict())
+        return dados
+
+
+class _ConexaoDaThread:
+    __slots__ = ('conn', 'ultimo_uso', 'em_uso', 'fechada')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.ultimo_uso = time.monotonic()
+        self.em_uso = False
+        self.fechada = False
+
+
+class PoolConexoesPorThread:
+    """Pool com uma conexão reutilizável por thread, usado com o SQLite.
+
+    Cada thread mantém sua própria conexão entre chamadas. Se o número de
+    threads com conexão passar de ``tamanho_maximo`` (mesmo após descartar as
+    de threads encerradas), a conexão extra é temporária e fechada ao final.
+    """
+
+    def __init__(self, fabrica, verificar, tamanho_maximo=32,
+                 tempo_ocioso_maximo=300.0, intervalo_verificacao=30.0):
+        self._fabrica = fabrica
+        self._verificar = verificar
+        self.tamanho_maximo = tamanho_maximo
+        self.tempo_ocioso_maximo = tempo_ocioso_maximo
+        self.intervalo_verificacao = intervalo_verificacao
+        self.estatisticas = EstatisticasPool()
+        self._lock = threading.Lock()
+        self._reiniciar_estado()
+
+    def _reiniciar_estado(self):
+        self._local = threading.local()
+        self._registro = {}  # ident da thread -> _ConexaoDaThread
+        self._pid = os.getpid()
+
+    def _remover_ociosas(self, agora):
+        vivas = {t.ident for t in threading.enumerate()}
+        for ident, entrada in list(self._registro.items()):
+            if entrada.em_uso:
+                continue
+            if ident not in vivas or agora - entrada.ultimo_uso > self.tempo_ocioso_maximo:
+                del self._registro[ident]
+                entrada.fechada = True
+                self.estatisticas.incrementar('remocoes_ociosas')
+                _fechar_silenciosamente(entrada.conn)
+
+    def _adquirir(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reiniciar_estado()
+            agora = time.monotonic()
+            self._remover_ociosas(agora)
+            entrada = getattr(self._local, 'entrada', None)
+            if entrada is not None and not entrada.fechada and not entrada.em_uso:
+                entrada.em_uso = True
+                verificar = agora - entrada.ultimo_uso > self.intervalo_verificacao
+            elif entrada is not None and entrada.em_uso:
+                # Uso aninhado na mesma thread: conexão avulsa
+                entrada = None
+                verificar = False
+            else:
+                entrada = None
+                verificar = False
+                self._local.entrada = None
+
+        if entrada is not None:
+            if verificar and not self._verificar(entrada.conn):
+                self.estatisticas.incrementar('falhas_verificacao')
+                with self._lock:
+                    self._registro.pop(threading.get_ident(), None)
+                    entrada.fechada = True
+                _fechar_silenciosamente(entrada.conn)
+                return self._adquirir()
+            self.estatisticas.incrementar('acertos')
+            return entrada
+
+        conn = self._fabrica()
+        self.estatisticas.incrementar('faltas')
+        nova = _ConexaoDaThread(conn)
+        nova.em_uso = True
+        with self._lock:
+            ident = threading.get_ident()
+            if getattr(self._local, 'entrada', None) is None and len(self._registro) < self.tamanho_maximo:
+                self._registro[ident] = nova
+                self._local.entrada = nova
+                return nova
+        self.estatisticas.incrementar('excedentes')
+        nova.fechada = True
+        return nova
+
+    def _devolver(self, entrada, descartar):
+        if not descartar:
+            try:
+                entrada.conn.rollback()
+            except Exception:
+                descartar = True
+        with self._lock:
+            entrada.em_uso = False
+            entrada.ultimo_uso = time.monotonic()
+            if descartar and not entrada.fechada:
+                self._registro.pop(threading.get_ident(), None)
+                entrada.fechada = True
+                self._local.entrada = None
+            fechar = entrada.fechada
+        if fechar:
+            _fechar_silenciosamente(entrada.conn)
+
+    @contextmanager
+    def conexao(self):
+        entrada = self._adquirir()
+        descartar = False
+        try:
+            yield entrada.conn
+        except BaseException:
+            try:
+                entrada.conn.rollback()
+            except Exception:
+                descartar = True
+            raise
+        finally:
+            self._devolver(entrada, descartar)
+
+    def fechar(self):
+        with self._lock:
+            for entrada in self._registro.values():
+                entrada.fechada = True
+                if not entrada.em_uso:
+                    _fechar_silenciosamente(entrada.conn)
+            self._registro.clear()
+
+    def como_dict(self):
+        with self._lock:
+            dados = {
+                'tipo': 'por_thread',
+                'abertas': len(self._registro),
+                'em_uso': sum(1 for e in self._registro.values() if e.em_uso),
+                'tamanho_maximo': self.tamanho_maximo,
+            }
+        dados.update(self.estatisticas.como_dict())
+        return dados
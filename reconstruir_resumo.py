@@ -0,0 +1,34 @@
+"""Recalcula a tabela ResumoAlunos a partir das notas
+
+Uso pela linha de comando:
+
+    python reconstruir_resumo.py              # reconstrói do zero
+    python reconstruir_resumo.py --verificar  # só confere divergências
+"""
+import argparse
+
+from database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstrói o resumo por aluno')
+    parser.add_argument('--verificar', action='store_true',
+                        help='só compara o resumo com as notas, sem alterar nada')
+    args = parser.parse_args()
+
+    db = Database()
+    db.init_db()
+    divergentes = db.verificar_resumo()
+    if args.verificar:
+        if divergentes:
+            print(f"❌ {len(divergentes)} alunos com resumo divergente: {divergentes[:20]}")
+            raise SystemExit(1)
+        print("✅ Resumo consistente com as notas")
+        return
+
+    total = db.reconstruir_resumo()
+    print(f"✅ Resumo reconstruído para {total} alunos ({len(divergentes)} estavam divergentes)")
+
+
+if __name__ == '__main__':
+    main()
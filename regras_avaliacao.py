@@ -0,0 +1,242 @@
+"""Regras de aprovação por série, compiladas para Python e para SQL
+
+Cada regra define os pesos das notas de cada período do ano letivo, a média
+mínima para aprovação e para recuperação e a frequência mínima. A média é a
+média ponderada dos períodos já lançados; sem pesos, a média simples. Ao ser
+criada, a regra é compilada uma única vez em:
+
+- uma função Python ``avaliar(nota_1, nota_2, frequencia) -> (media, status)``
+  para os dois primeiros períodos, usada ao gravar notas novas, e
+  ``avaliar_periodos(valores, frequencia)`` para qualquer número de períodos;
+- expressões SQL equivalentes, usadas nas correções em massa e para
+  reavaliar todas as notas direto no banco quando uma regra muda.
+
+As regras vêm de um arquivo JSON indicado em REGRAS_AVALIACAO; sem ele vale a
+regra padrão (média simples, 7 para aprovação, 5 para recuperação, 75% de
+frequência). Formato do arquivo:
+
+    {
+        "padrao": {"media_aprovacao": 7, "media_recuperacao": 5, "frequencia_minima": 75},
+        "series": {
+            "3º Ano - Ensino Médio": {"pesos": [2, 3, 2, 3], "media_aprovacao": 6}
+        }
+    }
+
+Uso pela linha de comando:
+
+    python regras_avaliacao.py                       # mostra as regras em vigor
+    python regras_avaliacao.py --reavaliar [--serie S] [--ano 2024]
+"""
+import argparse
+import json
+import os
+import time
+
+APROVADO = 'Aprovado'
+RECUPERACAO = 'Recuperação'
+REPROVADO = 'Reprovado'
+
+# Casas decimais da média comparada com as médias de aprovação e recuperação:
+# 6.999999999999999 (erro de ponto flutuante) conta como 7
+CASAS_MEDIA = 2
+
+
+def _literal(texto):
+    return "'" + texto.replace("'", "''") + "'"
+
+
+class RegraAvaliacao:
+    def __init__(self, pesos=None, media_aprovacao=7.0, media_recuperacao=5.0, frequencia_minima=75.0):
+        # pesos=None: todos os períodos valem o mesmo
+        if pesos is not None:
+            if len(pesos) < 2:
+                raise ValueError("A regra deve ter um peso por período (ao menos 2)")
+            # Zero não: a média dos períodos já lançados divide pela soma dos seus pesos
+            if any(peso <= 0 for peso in pesos):
+                raise ValueError("Os pesos devem ser maiores que zero")
+            # Guardados como vieram: a média divide pela soma no fim, e
+            # pesos já normalizados somariam erro de arredondamento
+            pesos = tuple(float(peso) for peso in pesos)
+        if media_recuperacao > media_aprovacao:
+            raise ValueError("A média de recuperação não pode passar a de aprovação")
+        self.pesos = pesos
+        self.media_aprovacao = float(media_aprovacao)
+        self.media_recuperacao = float(media_recuperacao)
+        self.frequencia_minima = float(frequencia_minima)
+        self.avaliar = self._compilar()
+
+    def _compilar(self):
+        # Os parâmetros ficam em variáveis locais da closure: sem consultas a
+        # atributos ou dicionários por nota avaliada
+        peso_1, peso_2 = self._pesos_bimestres()
+        media_aprovacao = self.media_aprovacao
+        media_recuperacao = self.media_recuperacao
+        frequencia_minima = self.frequencia_minima
+
+        soma = peso_1 + peso_2
+
+        def avaliar(nota_1, nota_2, frequencia):
+            media = (nota_1 * peso_1 + nota_2 * peso_2) / soma
+            if frequencia >= frequencia_minima:
+                comparada = round(media, CASAS_MEDIA)
+                if comparada >= media_aprovacao:
+                    return media, APROVADO
+                if comparada >= media_recuperacao:
+                    return media, RECUPERACAO
+            return media, REPROVADO
+
+        return avaliar
+
+    def _pesos_bimestres(self):
+        """Pesos dos dois primeiros períodos (a média divide pela soma deles)"""
+        if self.pesos is None:
+            return 1.0, 1.0
+        return self.pesos[0], self.pesos[1]
+
+    def verificar_periodos(self, periodos):
+        """Lança ValueError se a regra não tiver peso para todos os ``periodos``"""
+        if self.pesos is not None and len(self.pesos) < periodos:
+            raise ValueError(f"A regra tem {len(self.pesos)} pesos e o ano letivo tem {periodos} períodos")
+
+    def avaliar_periodos(self, valores, frequencia):
+        """Avalia as notas dos períodos lançados (1º, 2º, ...); retorna (media, status)"""
+        self.verificar_periodos(len(valores))
+        pesos = self.pesos or (1.0,) * len(valores)
+        media = sum(valor * peso for valor, peso in zip(valores, pesos)) / sum(pesos[:len(valores)])
+        return media, self._status(media, frequencia)
+
+    def _status(self, media, frequencia):
+        if frequencia >= self.frequencia_minima:
+            media = round(media, CASAS_MEDIA)
+            if media >= self.media_aprovacao:
+                return APROVADO
+            if media >= self.media_recuperacao:
+                return RECUPERACAO
+        return REPROVADO
+
+    def avaliar_lote(self, linhas):
+        """Avalia uma lista de (nota_1, nota_2, frequencia); retorna [(media, status)]"""
+        avaliar = self.avaliar
+        return [avaliar(nota_1, nota_2, frequencia) for nota_1, nota_2, frequencia in linhas]
+
+    def expressoes_sql(self, nota_1, nota_2, frequencia):
+        """Expressões SQL (media, status) sobre as colunas ou expressões dadas"""
+        peso_1, peso_2 = self._pesos_bimestres()
+        media = f'((({nota_1}) * {peso_1!r} + ({nota_2}) * {peso_2!r}) / {peso_1 + peso_2!r})'
+        return media, self.expressao_status_sql(media, frequencia)
+
+    def expressao_status_sql(self, media, frequencia):
+        """Expressão SQL do status a partir da média e da frequência"""
+        # Arredondada como em _status; o CAST é para o ROUND(numeric, int) do PostgreSQL
+        media = f'ROUND(CAST({media} AS NUMERIC), {CASAS_MEDIA})'
+        return (f"CASE WHEN {frequencia} >= {self.frequencia_minima!r} AND {media} >= {self.media_aprovacao!r} "
+                f"THEN '{APROVADO}' "
+                f"WHEN {frequencia} >= {self.frequencia_minima!r} AND {media} >= {self.media_recuperacao!r} "
+                f"THEN '{RECUPERACAO}' ELSE '{REPROVADO}' END")
+
+    def expressao_peso_sql(self, periodo):
+        """Expressão SQL do peso do período; a média é SUM(valor * peso) / SUM(peso)"""
+        if self.pesos is None:
+            return '1.0'
+        casos = ' '.join(f'WHEN {numero} THEN {peso!r}' for numero, peso in enumerate(self.pesos, 1))
+        return f'(CASE {periodo} {casos} END)'
+
+    def como_dict(self):
+        return {
+            'pesos': list(self.pesos) if self.pesos is not None else None,
+            'media_aprovacao': self.media_aprovacao,
+            'media_recuperacao': self.media_recuperacao,
+            'frequencia_minima': self.frequencia_minima,
+        }
+
+
+class RegrasAvaliacao:
+    """Regra padrão mais as regras específicas de cada série"""
+
+    def __init__(self, padrao=None, por_serie=None):
+        self.padrao = padrao or RegraAvaliacao()
+        self.por_serie = dict(por_serie or {})
+
+    @classmethod
+    def de_dict(cls, dados):
+        return cls(
+            RegraAvaliacao(**dados.get('padrao', {})),
+            {serie: RegraAvaliacao(**regra) for serie, regra in dados.get('series', {}).items()},
+        )
+
+    def para_serie(self, serie):
+        return self.por_serie.get(serie, self.padrao)
+
+    def expressoes_sql(self, nota_1, nota_2, frequencia, serie):
+        """Expressões SQL (media, status) que escolhem a regra pela coluna ``serie``"""
+        media_padrao, status_padrao = self.padrao.expressoes_sql(nota_1, nota_2, frequencia)
+        if not self.por_serie:
+            return media_padrao, status_padrao
+        medias, status = [], []
+        for nome, regra in self.por_serie.items():
+            media_serie, status_serie = regra.expressoes_sql(nota_1, nota_2, frequencia)
+            medias.append(f'WHEN {_literal(nome)} THEN {media_serie}')
+            status.append(f'WHEN {_literal(nome)} THEN {status_serie}')
+        return (f"CASE {serie} {' '.join(medias)} ELSE {media_padrao} END",
+                f"CASE {serie} {' '.join(status)} ELSE {status_padrao} END")
+
+    def _por_coluna_serie(self, serie, expressao):
+        """CASE sobre a coluna ``serie`` com ``expressao(regra)`` de cada regra"""
+        padrao = expressao(self.padrao)
+        if not self.por_serie:
+            return padrao
+        casos = ' '.join(f'WHEN {_literal(nome)} THEN {expressao(regra)}' for nome, regra in self.por_serie.items())
+        return f"CASE {serie} {casos} ELSE {padrao} END"
+
+    def expressao_peso_sql(self, periodo, serie):
+        return self._por_coluna_serie(serie, lambda regra: regra.expressao_peso_sql(periodo))
+
+    def expressao_status_sql(self, media, frequencia, serie):
+        return self._por_coluna_serie(serie, lambda regra: regra.expressao_status_sql(media, frequencia))
+
+    def verificar_periodos(self, periodos):
+        """Lança ValueError se alguma regra não tiver peso para todos os ``periodos``"""
+        for nome, regra in [('padrão', self.padrao)] + list(self.por_serie.items()):
+            try:
+                regra.verificar_periodos(periodos)
+            except ValueError as e:
+                raise ValueError(f"Regra {nome}: {e}") from e
+
+    def como_dict(self):
+        return {
+            'padrao': self.padrao.como_dict(),
+            'series': {serie: regra.como_dict() for serie, regra in self.por_serie.items()},
+        }
+
+
+def carregar_regras(caminho=None):
+    """Lê as regras do arquivo JSON (REGRAS_AVALIACAO); sem arquivo, só a regra padrão"""
+    caminho = caminho or os.environ.get('REGRAS_AVALIACAO')
+    if not caminho:
+        return RegrasAvaliacao()
+    with open(caminho, encoding='utf-8') as arquivo:
+        return RegrasAvaliacao.de_dict(json.load(arquivo))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regras de avaliação por série')
+    parser.add_argument('--reavaliar', action='store_true',
+                        help='recalcula média e status de todas as notas com as regras em vigor')
+    parser.add_argument('--serie', help='reavalia só esta série')
+    parser.add_argument('--ano', type=int, help='ano letivo a reavaliar (padrão: o ano corrente)')
+    args = parser.parse_args()
+
+    from database import Database
+    db = Database()
+    print(json.dumps(db.regras.como_dict(), ensure_ascii=False, indent=2))
+    if not args.reavaliar:
+        return
+
+    db.init_db()
+    inicio = time.perf_counter()
+    alunos, notas = db.reavaliar_notas(args.serie, args.ano)
+    print(f"✅ {notas} notas de {len(alunos)} alunos reavaliadas em {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 from database import Database
-from pdf_generator import gerar_boletim_pdf
+from pdf_generator import gerar_boletim_bytes
 
 def testar_geracao_pdf():
     db = Database()
@@ -8,12 +8,12 @@ def testar_geracao_pdf():
     aluno, notas = db.buscar_aluno_por_matricula('2024001')
     
     if aluno and notas:
-        print(f"📊 Testando PDF para: {aluno[1]}")
+        print(f"📊 Testando PDF para: {aluno.nome_completo}")
         print(f"📚 {len(notas)} disciplinas encontradas")
         
         try:
-            pdf = gerar_boletim_pdf(aluno, notas)
-            pdf.output("teste_boletim.pdf")
+            with open("teste_boletim.pdf", "wb") as arquivo:
+                arquivo.write(gerar_boletim_bytes(aluno, notas))
             print("✅ PDF gerado com sucesso: teste_boletim.pdf")
         except Exception as e:
             print(f"❌ Erro ao gerar PDF: {e}")
@@ -21,4 +21,4 @@ def testar_geracao_pdf():
         print("❌ Aluno não encontrado para teste")
 
 if __name__ == '__main__':
-    testar_geracao_pdf()
\ No newline at end of file
+    testar_geracao_pdf()
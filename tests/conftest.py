@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Os módulos do projeto ficam na raiz, sem pacote
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LOG_NIVEL', 'WARNING')
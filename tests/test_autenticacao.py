@@ -0,0 +1,51 @@
+from werkzeug.security import generate_password_hash
+
+from autenticacao import RepositorioUsuarios, VerificadorSenhas, precisa_rehash
+from modelos import Usuario
+
+
+class BancoUsuarios:
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self.gravados = []
+
+    def buscar_usuario_por_email(self, email):
+        return self.usuario
+
+    def atualizar_senha_hash(self, usuario_id, senha_hash):
+        self.gravados.append(senha_hash)
+        self.usuario = self.usuario._replace(senha_hash=senha_hash)
+
+
+def _repositorio(monkeypatch, verificador):
+    monkeypatch.setenv('SENHA_ITERACOES', '1000')
+    antigo = generate_password_hash('segredo', method='pbkdf2:sha256:2000')
+    banco = BancoUsuarios(Usuario(1, 'a@escola.com', 'A', 'secretaria', antigo, True))
+    return banco, RepositorioUsuarios(banco, verificador=verificador)
+
+
+def test_rehash_no_login(monkeypatch):
+    banco, usuarios = _repositorio(monkeypatch, VerificadorSenhas(1, tempo_espera=0.1))
+    assert usuarios.autenticar('a@escola.com', 'segredo') is not None
+    assert len(banco.gravados) == 1 and not precisa_rehash(banco.gravados[0])
+
+
+def test_rehash_respeita_o_limite_de_hashes_simultaneos(monkeypatch):
+    verificador = VerificadorSenhas(1, tempo_espera=0.1)
+    banco, usuarios = _repositorio(monkeypatch, verificador)
+    chamadas = []
+
+    def gerar(senha):
+        chamadas.append(senha)
+        # Outro login ocupou a única vaga depois da verificação desta senha
+        verificador._semaforo.acquire()
+        try:
+            return VerificadorSenhas.gerar(verificador, senha)
+        finally:
+            verificador._semaforo.release()
+
+    monkeypatch.setattr(verificador, 'gerar', gerar)
+    assert usuarios.autenticar('a@escola.com', 'segredo') is not None
+    assert chamadas == ['segredo']
+    # Sem vaga o hash antigo fica; será refeito no próximo login
+    assert banco.gravados == []
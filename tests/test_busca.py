@@ -0,0 +1,46 @@
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'escola.db'))
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    banco = Database()
+    banco.init_db()
+    for nome, matricula in [('João da Silva', 'A-001'), ('Maria Silveira', 'A-002'),
+                            ('Ana Souza', 'B_003'), ('Juliana Costa', 'B-004')]:
+        banco.inserir_aluno(nome, '2010-01-01', '1º Ano', 'Responsável', matricula)
+    yield banco
+    banco.fechar()
+
+
+def _nomes(alunos):
+    return sorted(aluno.nome_completo for aluno in alunos)
+
+
+@pytest.mark.parametrize('termo, esperados', [
+    # Início de palavra, pelo índice FTS, sem acentos
+    ('sil', ['João da Silva', 'Maria Silveira']),
+    ('joao', ['João da Silva']),
+    ('ana', ['Ana Souza']),
+    # Meio de palavra, como o LIKE '%termo%' do PostgreSQL
+    ('ilva', ['João da Silva']),
+    ('liana', ['Juliana Costa']),
+    ('04', ['Juliana Costa']),
+    ('_', ['Ana Souza']),
+    ('xyz', []),
+])
+def test_busca_por_nome_ou_matricula(db, termo, esperados):
+    assert _nomes(db.buscar_alunos(termo)) == esperados
+    assert db.contar_alunos(termo) == len(esperados)
+    alunos, _ = db.buscar_alunos_pagina(termo, limite=10)
+    assert _nomes(alunos) == esperados
+
+
+def test_paginacao_da_busca_em_qualquer_posicao(db):
+    alunos, cursor = db.buscar_alunos_pagina('ilv', limite=1)
+    seguintes, fim = db.buscar_alunos_pagina('ilv', limite=1, cursor=cursor)
+    assert fim is None
+    assert _nomes(alunos + seguintes) == ['João da Silva', 'Maria Silveira']
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import fila_pdf
+from fila_pdf import CONCLUIDA, EXECUTANDO, FilaTarefas
+
+
+def _executar_devagar(liberar, inicios):
+    def executar(db, parametros, destino, progresso):
+        inicios.append(destino)
+        progresso(0, 1)
+        with open(destino, 'wb') as saida:
+            saida.write(destino.encode())
+            liberar.wait(10)
+        progresso(1, 1)
+    return executar
+
+
+def test_batimento_renovado_sem_progresso(tmp_path, monkeypatch):
+    liberar, inicios = threading.Event(), []
+    monkeypatch.setitem(fila_pdf.TIPOS, 'boletins', _executar_devagar(liberar, inicios))
+    fila = FilaTarefas(str(tmp_path / 'fila.db'), str(tmp_path / 'resultados'), limite_batimento=0.4)
+    tarefa_id = fila.enfileirar('boletins', {'formato': 'pdf'})
+    fila.iniciar_workers(1, None, intervalo=0.05)
+    try:
+        # A tarefa roda por várias vezes o limite sem registrar progresso
+        time.sleep(1.5)
+        assert fila.recuperar_interrompidas() == 0
+        assert fila.obter(tarefa_id)['status'] == EXECUTANDO
+        liberar.set()
+        for _ in range(100):
+            if fila.obter(tarefa_id)['status'] == CONCLUIDA:
+                break
+            time.sleep(0.05)
+    finally:
+        fila.parar(timeout=5)
+    tarefa = fila.obter(tarefa_id)
+    assert tarefa['status'] == CONCLUIDA
+    assert len(inicios) == 1
+    assert sorted(p.name for p in (tmp_path / 'resultados').iterdir()) == [f"{tarefa_id}.pdf"]
+
+
+def test_execucao_que_perdeu_a_tarefa_nao_conclui(tmp_path, monkeypatch):
+    liberar, inicios = threading.Event(), []
+    monkeypatch.setitem(fila_pdf.TIPOS, 'boletins', _executar_devagar(liberar, inicios))
+    fila = FilaTarefas(str(tmp_path / 'fila.db'), str(tmp_path / 'resultados'))
+    tarefa_id = fila.enfileirar('boletins', {'formato': 'pdf'})
+    fila.iniciar_workers(1, None, intervalo=0.05)
+    try:
+        while not inicios:
+            time.sleep(0.01)
+        # Como se o worker tivesse ficado sem batimento: a tarefa volta à fila
+        assert fila.recuperar_interrompidas(limite_batimento=-1) == 1
+        liberar.set()
+        for _ in range(100):
+            if fila.obter(tarefa_id)['status'] == CONCLUIDA:
+                break
+            time.sleep(0.05)
+    finally:
+        fila.parar(timeout=5)
+    # A primeira execução descartou o que gerou; a tarefa foi concluída pela
+    # segunda, que gravou em outro arquivo temporário
+    assert fila.obter(tarefa_id)['status'] == CONCLUIDA
+    assert len(inicios) == 2 and inicios[0] != inicios[1]
+    resultado = tmp_path / 'resultados' / f"{tarefa_id}.pdf"
+    assert sorted((tmp_path / 'resultados').iterdir()) == [resultado]
+    assert resultado.read_bytes() == inicios[1].encode()
@@ -0,0 +1,37 @@
+import io
+
+import pytest
+
+import importacao
+from database import Database
+
+CSV = '''matricula,nome_completo,data_nascimento,serie,nome_responsavel,disciplina,nota_1,nota_2,frequencia
+M1,Ana Silva,01/02/2010,1º Ano,Maria,Matemática,8,9,90
+M2,Bruno Souza,03/04/2010,1º Ano,José,Matemática,7,7,90
+M1,Ana Silva,01/02/2010,1º Ano,Maria,Português,2,3,90
+M2,Bruno Souza,03/04/2010,1º Ano,José,Português,8,8,90
+M1,Ana Silva,01/02/2010,1º Ano,Maria,História,9,9,90
+'''
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'escola.db'))
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+    monkeypatch.delenv('REGRAS_AVALIACAO', raising=False)
+    banco = Database()
+    banco.init_db()
+    yield banco
+    banco.fechar()
+
+
+@pytest.mark.parametrize('tamanho_lote', [1, 2, 1000])
+def test_resumo_consistente_em_varios_lotes(db, tamanho_lote):
+    arquivo = io.BytesIO(CSV.encode('utf-8'))
+    importacao.importar(db, arquivo, 'alunos.csv', tamanho_lote=tamanho_lote)
+
+    assert db.verificar_resumo() == []
+    aluno, notas = db.buscar_aluno_por_matricula('M1')
+    assert len(notas) == 3
+    resumo = db.buscar_resumos([aluno.id])[aluno.id]
+    assert (resumo.total_disciplinas, resumo.disciplinas_reprovadas) == (3, 1)
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from regras_avaliacao import APROVADO, RECUPERACAO, RegraAvaliacao
+
+
+def _sql(expressao, **colunas):
+    conn = sqlite3.connect(':memory:')
+    nomes = ', '.join(f'? AS {nome}' for nome in colunas)
+    return conn.execute(f'SELECT {expressao} FROM (SELECT {nomes})', list(colunas.values())).fetchone()
+
+
+@pytest.mark.parametrize('pesos', [[1, 2], [1, 2, 3, 4], [0.1, 0.2], [2, 3, 2, 3]])
+def test_media_na_aprovacao_com_pesos_diferentes(pesos):
+    regra = RegraAvaliacao(pesos)
+    media, status = regra.avaliar(7.0, 7.0, 80.0)
+    assert status == APROVADO
+    assert media == pytest.approx(7.0)
+
+    media_sql, status_sql = regra.expressoes_sql('n1', 'n2', 'f')
+    assert _sql(f'{media_sql}, {status_sql}', n1=7.0, n2=7.0, f=80.0) == (pytest.approx(7.0), APROVADO)
+
+
+@pytest.mark.parametrize('pesos', [None, [1, 1, 1], [1, 2, 3], [0.1, 0.2, 0.3]])
+def test_media_dos_periodos_na_aprovacao(pesos):
+    regra = RegraAvaliacao(pesos)
+    assert regra.avaliar_periodos([7.0, 7.0, 7.0], 80.0)[1] == APROVADO
+    # Mesma conta do _reavaliar_por_periodos: SUM(valor * peso) / SUM(peso)
+    conn = sqlite3.connect(':memory:')
+    peso = regra.expressao_peso_sql('periodo')
+    media, = conn.execute(f'''
+        SELECT SUM(valor * {peso}) / SUM({peso})
+        FROM (SELECT 1 AS periodo, 7.0 AS valor UNION ALL SELECT 2, 7.0 UNION ALL SELECT 3, 7.0)
+    ''').fetchone()
+    assert _sql(regra.expressao_status_sql('m', 'f'), m=media, f=80.0) == (APROVADO,)
+
+
+def test_media_na_recuperacao_com_pesos_diferentes():
+    regra = RegraAvaliacao([1, 2], media_recuperacao=5.0)
+    assert regra.avaliar(5.0, 5.0, 80.0)[1] == RECUPERACAO
+    assert regra.avaliar(6.9, 7.0, 80.0)[1] == RECUPERACAO
+    assert regra.avaliar_periodos([5.0, 5.0], 80.0)[1] == RECUPERACAO
+
+
+def test_pesos_guardados_como_informados():
+    assert RegraAvaliacao([2, 3, 2, 3]).como_dict()['pesos'] == [2.0, 3.0, 2.0, 3.0]
@@ -0,0 +1,11 @@
+"""Ponto de entrada WSGI de produção
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Com preload_app (padrão em gunicorn.conf.py) este módulo é importado uma vez
+no processo mestre, antes do fork; as threads da fila de tarefas são
+iniciadas depois, em cada worker (hook post_worker_init).
+"""
+from main import create_app
+
+app = create_app(iniciar_workers=False)